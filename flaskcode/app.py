@@ -1,17 +1,171 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, make_response, stream_with_context, has_app_context
+from flask.json.provider import DefaultJSONProvider, JSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
+from werkzeug.test import EnvironBuilder
+from werkzeug.wsgi import get_input_stream
+from urllib.parse import parse_qsl
 import psycopg2
 import psycopg2.extras
+import psycopg2.extensions
 from psycopg2 import sql
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+import threading
 import bcrypt
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+import hashlib
 import json
+import logging
+import logging.handlers
+import queue
+import atexit
+import copy
 import uuid
+import time
+import select
 import os
 import sys
+import io
+import zlib
+
+try:
+    import orjson
+except ImportError:  # optional, see JSON_PROVIDER
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only without it
+    brotli = None
+if brotli is not None and not hasattr(brotli.Decompressor, 'can_accept_more_data'):
+    brotli = None  # < 1.1 cannot cap decompressed output, see _decompress
 
 app = Flask(__name__)
 CORS(app)
 
+# ---------------- LOGGING ----------------
+
+# Handlers only put records on a queue; a listener thread formats and writes
+# them, so request threads never block on stdout/journald. Levels per area,
+# e.g. LOG_LEVELS="gew.stock=DEBUG,gew.db=WARNING" (debug dumps whole payloads).
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')  # json or text
+
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line; `extra={...}` fields become top-level keys
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Resolve message and traceback now; formatting happens on the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_log_queue = queue.SimpleQueue()
+_log_listener = None
+_log_listener_pid = None
+_log_lock = threading.Lock()
+
+def ensure_log_listener():
+    # Started per process: a listener thread does not survive a fork
+    global _log_listener, _log_listener_pid
+    if _log_listener_pid == os.getpid():
+        return
+    with _log_lock:
+        if _log_listener_pid == os.getpid():
+            return
+        stream = logging.StreamHandler(sys.stdout)
+        if LOG_FORMAT == 'json':
+            stream.setFormatter(JsonFormatter())
+        else:
+            stream.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        _log_listener = logging.handlers.QueueListener(_log_queue, stream)
+        _log_listener.start()
+        _log_listener_pid = os.getpid()
+
+
+def _configure_logging():
+    root = logging.getLogger('gew')
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+    root.addHandler(_QueueHandler(_log_queue))
+    for item in filter(None, (part.strip() for part in LOG_LEVELS.split(','))):
+        name, _, level = item.partition('=')
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+    ensure_log_listener()
+    atexit.register(lambda: _log_listener.stop() if _log_listener_pid == os.getpid() else None)
+
+
+_configure_logging()
+app.before_request(ensure_log_listener)
+
+http_log = logging.getLogger('gew.http')
+db_log = logging.getLogger('gew.db')
+cache_log = logging.getLogger('gew.cache')
+stock_log = logging.getLogger('gew.stock')
+indent_log = logging.getLogger('gew.indents')
+
+# ---------------- JSON ----------------
+
+# app.json parses request bodies, builds jsonify() responses and encodes /
+# decodes the stored `data` blobs in the handlers. JSON_PROVIDER=auto uses
+# orjson when it is installed; 'stdlib' forces Flask's default provider.
+JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'auto')
+
+
+class OrjsonProvider(JSONProvider):
+    # Keys are not sorted and non-ASCII is written as UTF-8. Types orjson
+    # does not handle natively (Decimal, ...) go through Flask's default(),
+    # and so do dates, to keep Flask's HTTP-date format rather than ISO 8601.
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=self.option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Skip the bytes -> str -> bytes round trip of the base class
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=DefaultJSONProvider.default, option=self.option)
+        return self._app.response_class(body, mimetype='application/json')
+
+
+if JSON_PROVIDER == 'orjson' and orjson is None:
+    logging.getLogger('gew').warning('JSON_PROVIDER=orjson but orjson is not installed, using stdlib json')
+if JSON_PROVIDER in ('auto', 'orjson') and orjson is not None:
+    app.json = OrjsonProvider(app)
+
 # DATABASE CONNECTION SETUP
 DB_HOST = os.getenv('DB_HOST', 'localhost')
 DB_NAME = os.getenv('DB_NAME', 'gew_erp')
@@ -19,11 +173,968 @@ DB_USER = os.getenv('DB_USER', 'postgres')
 DB_PASS = os.getenv('DB_PASS', 'gew@1973')
 DB_PORT = os.getenv('DB_PORT', 5432)
 
+# `data` columns are JSONB (migrations/002-004). Have psycopg2 hand them back as
+# the raw JSON text so handlers keep decoding them exactly as before.
+psycopg2.extras.register_default_jsonb(globally=True, loads=lambda s: s)
+
+# Pool sizing is per worker process (gunicorn -w N opens up to N * DB_POOL_MAX).
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+# Idle connections older than this many seconds get a 'SELECT 1' before reuse
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30))
+
+
+class QueryStats:
+    # DB work done on behalf of one request, filled in by the timed cursors
+    def __init__(self, keep_sql):
+        self.queries = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.statements = [] if keep_sql else None
+
+    def add(self, elapsed, rows, statement):
+        # rows: returned by a read, or affected by a write
+        self.queries += 1
+        self.seconds += elapsed
+        if rows > 0:
+            self.rows += rows
+        if self.statements is not None and len(self.statements) < 50 and statement:
+            self.statements.append((elapsed, statement[:1000]))
+
+    def record(self, cur, elapsed):
+        query = cur.query if self.statements is not None else None
+        self.add(elapsed, cur.rowcount, query.decode('utf-8', 'replace') if query else None)
+
+
+def _query_stats():
+    return g.get('query_stats') if has_app_context() else None
+
+
+class _TimedCursorMixin:
+    def execute(self, query, vars=None):
+        stats = _query_stats()
+        if stats is None:
+            return super().execute(query, vars)
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            stats.record(self, time.perf_counter() - start)
+
+    def executemany(self, query, vars_list):
+        stats = _query_stats()
+        if stats is None:
+            return super().executemany(query, vars_list)
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            stats.record(self, time.perf_counter() - start)
+
+
+_timed_cursor_classes = {}
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    # Every cursor is timed, whatever cursor_factory the handler asks for.
+    # Named (streaming) cursors only count the DECLARE, not later fetches.
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        timed = _timed_cursor_classes.get(factory)
+        if timed is None:
+            timed = type('Timed' + factory.__name__, (_TimedCursorMixin, factory), {})
+            _timed_cursor_classes[factory] = timed
+        kwargs['cursor_factory'] = timed
+        return super().cursor(*args, **kwargs)
+
+
+def _connect():
+    return psycopg2.connect(
+        host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASS, port=DB_PORT,
+        connection_factory=InstrumentedConnection
+    )
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, minconn, maxconn, timeout, health_check_interval):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = []  # list of (conn, returned_at)
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        for _ in range(minconn):
+            self._idle.append((_connect(), time.monotonic()))
+
+    def _size(self):
+        return len(self._idle) + self._in_use
+
+    def _healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        self._discarded += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._idle and self._size() >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            'No database connection available within %.1fs' % self.timeout
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            # Reserve the slot here; health check / connect happen outside the lock
+            conn, returned_at = self._idle.pop() if self._idle else (None, None)
+            self._in_use += 1
+
+        try:
+            if conn is not None and not self._healthy(conn, returned_at):
+                with self._cond:
+                    self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = _connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def putconn(self, conn):
+        reusable = not conn.closed
+        if reusable:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                reusable = False
+        with self._cond:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                conn.close()
+            self._idle = []
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size(),
+                'min': self.minconn,
+                'max': self.maxconn,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'discarded': self._discarded,
+                'wait_total_ms': round(self._wait_total * 1000, 3),
+                'wait_avg_ms': round(self._wait_total * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                'wait_max_ms': round(self._wait_max * 1000, 3),
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    # Created lazily and re-created after fork so each worker owns its sockets
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool(
+                    DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT, DB_POOL_HEALTH_CHECK_INTERVAL
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+@contextmanager
+def pooled_connection():
+    # For code running outside a request (scripts, background threads)
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
 def get_db_connection():
-    conn = psycopg2.connect(
-        host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASS, port=DB_PORT
+    # One pooled connection per request, handed back in teardown_db()
+    if 'db_conn' not in g:
+        g.db_conn = get_pool().getconn()
+    return g.db_conn
+
+def release_db_connection():
+    # Hand the request's connection back early, before slow non-DB work
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        get_pool().putconn(conn)
+
+@app.teardown_appcontext
+def teardown_db(exc):
+    release_db_connection()
+
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(e):
+    db_log.warning('pool checkout timed out', extra={'path': request.path, 'pool': get_pool().stats()})
+    return jsonify({'error': str(e)}), 503
+
+# ---------------- METRICS ----------------
+
+# Per-route request and DB metrics, served in Prometheus text format at
+# /metrics. Counters are per worker process; scrape each worker or sum them.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+# Requests slower than this are logged with the SQL they ran (0 = off)
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 0))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.queries = 0
+        self.rows = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.statuses = {}
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    def __init__(self):
+        self._routes = {}  # (method, route) -> RouteMetrics
+        self._lock = threading.Lock()
+
+    def observe(self, method, route, status, seconds, request_bytes, response_bytes, stats):
+        with self._lock:
+            m = self._routes.get((method, route))
+            if m is None:
+                m = self._routes[(method, route)] = RouteMetrics()
+            m.latency.observe(seconds)
+            m.db_time.observe(stats.seconds)
+            m.queries += stats.queries
+            m.rows += stats.rows
+            m.request_bytes += request_bytes
+            m.response_bytes += response_bytes
+            m.statuses[status] = m.statuses.get(status, 0) + 1
+
+    def render(self, pool):
+        # pool: stats of the app's connection pool; absent keys are skipped
+        out = []
+
+        def histogram(name, help_text, attr):
+            out.append('# HELP %s %s' % (name, help_text))
+            out.append('# TYPE %s histogram' % name)
+            for labels, m in routes:
+                h = getattr(m, attr)
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    out.append('%s_bucket{%s,le="%s"} %d' % (name, labels, bound, cumulative))
+                out.append('%s_bucket{%s,le="+Inf"} %d' % (name, labels, h.count))
+                out.append('%s_sum{%s} %.6f' % (name, labels, h.sum))
+                out.append('%s_count{%s} %d' % (name, labels, h.count))
+
+        def counter(name, help_text, attr):
+            out.append('# HELP %s %s' % (name, help_text))
+            out.append('# TYPE %s counter' % name)
+            for labels, m in routes:
+                out.append('%s{%s} %d' % (name, labels, getattr(m, attr)))
+
+        with self._lock:
+            routes = [
+                ('method="%s",route="%s"' % (_label(method), _label(route)), m)
+                for (method, route), m in sorted(self._routes.items())
+            ]
+            out.append('# HELP gew_http_requests_total Requests handled, by status')
+            out.append('# TYPE gew_http_requests_total counter')
+            for labels, m in routes:
+                for status, count in sorted(m.statuses.items()):
+                    out.append('gew_http_requests_total{%s,status="%d"} %d' % (labels, status, count))
+            histogram('gew_http_request_duration_seconds', 'Time to build the response', 'latency')
+            histogram('gew_db_time_seconds', 'Time spent in DB queries per request', 'db_time')
+            counter('gew_db_queries_total', 'DB queries executed', 'queries')
+            counter('gew_db_rows_total', 'Rows returned or affected by DB queries', 'rows')
+            counter('gew_http_request_bytes_total', 'Request body bytes received', 'request_bytes')
+            counter('gew_http_response_bytes_total', 'Response body bytes sent (streamed bodies excluded)', 'response_bytes')
+
+        out.append('# TYPE gew_db_pool_connections gauge')
+        out.append('gew_db_pool_connections{state="in_use"} %d' % pool['in_use'])
+        out.append('gew_db_pool_connections{state="idle"} %d' % pool['idle'])
+        if 'waiting' in pool:
+            out.append('# TYPE gew_db_pool_waiting gauge')
+            out.append('gew_db_pool_waiting %d' % pool['waiting'])
+        if 'timeouts' in pool:
+            out.append('# TYPE gew_db_pool_timeouts_total counter')
+            out.append('gew_db_pool_timeouts_total %d' % pool['timeouts'])
+        if 'wait_total_ms' in pool:
+            out.append('# TYPE gew_db_pool_wait_seconds_total counter')
+            out.append('gew_db_pool_wait_seconds_total %.6f' % (pool['wait_total_ms'] / 1000))
+        return '\n'.join(out) + '\n'
+
+
+request_metrics = Metrics()
+
+@app.before_request
+def start_request_metrics():
+    if METRICS_ENABLED or SLOW_REQUEST_MS > 0:
+        g.request_started = time.perf_counter()
+        g.query_stats = QueryStats(keep_sql=SLOW_REQUEST_MS > 0)
+
+@app.after_request
+def record_request_metrics(response):
+    # Runs once the body is built; a streamed body is still being sent
+    stats = g.pop('query_stats', None)
+    if stats is None:
+        return response
+    finish_request_metrics(
+        request_metrics, request, response.status_code, time.perf_counter() - g.request_started,
+        0 if response.is_streamed else response.calculate_content_length() or 0, stats
     )
-    return conn
+    return response
+
+
+def finish_request_metrics(metrics, req, status, elapsed, response_bytes, stats):
+    # Shared with asgi_app: records the request and logs it if slow
+    route = req.url_rule.rule if req.url_rule else 'unmatched'
+    if METRICS_ENABLED:
+        metrics.observe(req.method, route, status, elapsed, req.content_length or 0, response_bytes, stats)
+    if SLOW_REQUEST_MS > 0 and elapsed * 1000 >= SLOW_REQUEST_MS:
+        http_log.warning('slow request', extra={
+            'method': req.method, 'path': req.full_path, 'status': status,
+            'ms': round(elapsed * 1000, 1), 'queries': stats.queries, 'db_ms': round(stats.seconds * 1000, 1),
+            'sql': [{'ms': round(seconds * 1000, 1), 'query': ' '.join(statement.split())}
+                    for seconds, statement in stats.statements],
+        })
+
+# ---------------- COMPRESSION ----------------
+
+# JSON/text responses of at least COMPRESS_MIN_SIZE bytes are gzip- or
+# brotli-compressed when Accept-Encoding allows (brotli preferred, if
+# installed); streamed lists are compressed on the fly. Routes can override
+# the levels with @compression(...).
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/csv', 'text/html'}
+# Compressed request bodies larger than this as sent, or once inflated, get a 413
+MAX_COMPRESSED_BODY = int(os.getenv('MAX_COMPRESSED_BODY', 16 * 1024 * 1024))
+MAX_DECOMPRESSED_BODY = int(os.getenv('MAX_DECOMPRESSED_BODY', 64 * 1024 * 1024))
+
+
+def compression(gzip=None, br=None, min_size=None):
+    def decorator(f):
+        f.compression = {'gzip': gzip, 'br': br, 'min_size': min_size}
+        return f
+    return decorator
+
+def accepts_compressed_body(f):
+    # Lets bulk uploads be sent with Content-Encoding: gzip (or br)
+    f.accepts_compressed_body = True
+    return f
+
+def _view_attr(name, default=None):
+    return getattr(app.view_functions.get(request.endpoint), name, default)
+
+def _compressor(encoding, level):
+    # (compress, finish) for one response body
+    if encoding == 'br':
+        compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=level)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip framing
+    return compressor.compress, compressor.flush
+
+def _compress_chunks(chunks, encoding, level):
+    compress, finish = _compressor(encoding, level)
+    try:
+        for chunk in chunks:
+            out = compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            if out:
+                yield out
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def _decompress(body, encoding):
+    # Inflate a bit at a time so a small bomb cannot exhaust memory
+    out = []
+    size = 0
+    if encoding == 'gzip':
+        d = zlib.decompressobj(31)
+        data = body
+        while size <= MAX_DECOMPRESSED_BODY:
+            chunk = d.decompress(data, 1024 * 1024)
+            size += len(chunk)
+            out.append(chunk)
+            data = d.unconsumed_tail
+            if d.eof or not (data or chunk):
+                break
+        if size <= MAX_DECOMPRESSED_BODY and not d.eof:
+            raise zlib.error('truncated gzip body')
+    else:
+        d = brotli.Decompressor()
+        data = body
+        while size <= MAX_DECOMPRESSED_BODY:
+            # One byte over the cap is enough to know the body is too big
+            chunk = d.process(data, output_buffer_limit=MAX_DECOMPRESSED_BODY - size + 1)
+            size += len(chunk)
+            out.append(chunk)
+            data = b''
+            if d.is_finished() or (d.can_accept_more_data() and not chunk):
+                break
+        if size <= MAX_DECOMPRESSED_BODY and not d.is_finished():
+            raise brotli.error('truncated brotli body')
+    return None if size > MAX_DECOMPRESSED_BODY else b''.join(out)
+
+@app.before_request
+def decompress_request_body():
+    encoding = request.headers.get('Content-Encoding', 'identity').strip().lower()
+    if encoding == 'identity' or not _view_attr('accepts_compressed_body', False):
+        return None
+    if encoding not in ('gzip', 'br') or (encoding == 'br' and brotli is None):
+        return jsonify({'error': 'Unsupported Content-Encoding %s' % encoding}), 415
+    try:
+        body = _decompress(get_input_stream(request.environ, max_content_length=MAX_COMPRESSED_BODY).read(), encoding)
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'Request body too large'}), 413
+    except Exception:
+        return jsonify({'error': 'Request body is not valid %s' % encoding}), 400
+    if body is None:
+        return jsonify({'error': 'Request body too large'}), 413
+    # Swap in the inflated body before anything reads request.stream
+    request.environ['wsgi.input'] = io.BytesIO(body)
+    request.environ['CONTENT_LENGTH'] = str(len(body))
+    request.environ.pop('wsgi.input_terminated', None)
+    request.environ.pop('HTTP_CONTENT_ENCODING', None)
+    return None
+
+def _accepted_encoding(accept_encodings):
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+@app.after_request
+def compress_response(response):
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _accepted_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    settings = _view_attr('compression', {})
+    level = settings.get(encoding)
+    if level is None:
+        level = COMPRESS_BROTLI_QUALITY if encoding == 'br' else COMPRESS_GZIP_LEVEL
+    if response.is_streamed:
+        response.response = _compress_chunks(response.response, encoding, level)
+    else:
+        data = response.get_data()
+        if len(data) < (settings.get('min_size') or COMPRESS_MIN_SIZE):
+            return response
+        response.set_data(b''.join(_compress_chunks((data,), encoding, level)))
+    response.headers['Content-Encoding'] = encoding
+    # Each encoding is its own representation, so it needs its own ETag
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag('%s-%s' % (etag, encoding), weak)
+    return response
+
+# ---------------- PAGINATION ----------------
+
+MAX_PAGE_LIMIT = int(os.getenv('MAX_PAGE_LIMIT', 1000))
+# Unpaginated lists can be streamed from a server-side cursor (?stream=true,
+# or on by default with STREAM_RESPONSES=true); rows per round trip:
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', 'false').lower() == 'true'
+STREAM_ITERSIZE = int(os.getenv('STREAM_ITERSIZE', 2000))
+
+
+class InvalidParam(Exception):
+    pass
+
+@app.errorhandler(InvalidParam)
+def handle_invalid_param(e):
+    return jsonify({'error': str(e)}), 400
+
+
+class Page:
+    # Opt-in keyset pagination (?limit=&after=) and projection (?fields=a,b).
+    # Without ?limit the routes keep returning a bare JSON array as before;
+    # with it they return {'items': [...], 'next': <cursor or null>}.
+    response_class = Response
+
+    def __init__(self, limit=None, after=None, fields=None, stream=False):
+        self.limit = limit
+        self.after = after
+        self.fields = fields
+        self.stream = stream and limit is None
+        self.next = None
+
+    @classmethod
+    def from_request(cls, args=None):
+        args = request.args if args is None else args
+        limit = args.get('limit')
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                raise InvalidParam('limit must be an integer')
+            if limit < 1:
+                raise InvalidParam('limit must be positive')
+            limit = min(limit, MAX_PAGE_LIMIT)
+        fields = args.get('fields')
+        if fields is not None:
+            fields = [f.strip() for f in fields.split(',') if f.strip()]
+        stream = args.get('stream')
+        stream = STREAM_RESPONSES if stream is None else stream.lower() == 'true'
+        return cls(limit, args.get('after'), fields, stream)
+
+    def run(self, select, order_col, **kwargs):
+        # Fetch a list route's rows and build the response, streamed or
+        # buffered. `select` returns (order_col, item JSON); kwargs go to fetch().
+        conn = get_db_connection()
+        if self.stream:
+            return self.stream_response(conn, select, order_col, **kwargs)
+        cur = conn.cursor()
+        rows = self.fetch(cur, select, order_col, **kwargs)
+        cur.close()
+        return self.response(rows)
+
+    def _query(self, select, order_col, where, params, descending, after_type):
+        conditions = [where] if where else []
+        params = list(params)
+        if self.limit is not None and self.after is not None:
+            try:
+                params.append(after_type(self.after))
+            except ValueError:
+                raise InvalidParam('invalid after cursor')
+            conditions.append('%s %s %%s' % (order_col, '<' if descending else '>'))
+        query = select
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY %s%s' % (order_col, ' DESC' if descending else '')
+        return query, params
+
+    def fetch(self, cur, select, order_col, where=None, params=(), descending=False, after_type=str):
+        # `select` must return the ORDER BY column first; it becomes the cursor
+        query, params = self._query(select, order_col, where, params, descending, after_type)
+        if self.limit is None:
+            cur.execute(query, params)
+            return cur.fetchall()
+
+        # One extra row tells us whether there is a next page
+        cur.execute(query + ' LIMIT %s', params + [self.limit + 1])
+        rows = cur.fetchall()
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            self.next = rows[-1][0]
+        return rows
+
+    def project(self, item):
+        if self.fields is None:
+            return item
+        return {f: item[f] for f in self.fields if f in item}
+
+    def encode(self, row):
+        # The stored JSON text is spliced into the body as-is; only a
+        # ?fields= projection needs the decode/encode round trip.
+        if self.fields is None:
+            return row[1]
+        return app.json.dumps(self.project(app.json.loads(row[1])), separators=(',', ':'))
+
+    def response(self, rows):
+        body = '[' + ','.join(self.encode(row) for row in rows) + ']'
+        if self.limit is not None:
+            body = '{"items":%s,"next":%s}' % (body, json.dumps(self.next))
+        return self.response_class(body, mimetype='application/json')
+
+    def stream_response(self, conn, select, order_col, where=None, params=(),
+                        descending=False, after_type=str):
+        # Named cursor: Postgres holds the result set and we pull STREAM_ITERSIZE
+        # rows at a time, so memory stays flat however large the table is.
+        query, params = self._query(select, order_col, where, params, descending, after_type)
+
+        def generate():
+            cur = conn.cursor(name='stream_%s' % uuid.uuid4().hex)
+            cur.itersize = STREAM_ITERSIZE
+            cur.execute(query, params)
+            yield '['
+            chunk = []
+            first = True
+            for row in cur:
+                item = self.encode(row)
+                chunk.append(item if first else ',' + item)
+                first = False
+                if len(chunk) >= STREAM_ITERSIZE:
+                    yield ''.join(chunk)
+                    chunk = []
+            chunk.append(']')
+            yield ''.join(chunk)
+            cur.close()
+
+        # stream_with_context keeps the request (and its pooled connection)
+        # alive until the generator finishes
+        return Response(stream_with_context(generate()), mimetype='application/json')
+
+# ---------------- ETAGS ----------------
+
+def matching_etag(etag, if_none_match):
+    # The If-None-Match tag for `etag` in any of its encodings (see COMPRESSION)
+    for candidate in (etag, etag + '-gzip', etag + '-br'):
+        if candidate in if_none_match:
+            return candidate
+    return None
+
+# Added to the versions query for by_day ETags: the database's date, as 'day'
+TABLE_VERSIONS_DAY = " UNION ALL SELECT 'day', to_char(current_date, 'YYYYMMDD')::bigint"
+
+def table_versions(tables, by_day=False):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(
+        'SELECT table_name, version FROM table_versions WHERE table_name = ANY(%s)'
+        + (TABLE_VERSIONS_DAY if by_day else ''),
+        (list(tables),)
+    )
+    versions = dict(cur.fetchall())
+    cur.close()
+    return versions
+
+def version_etag(tables, versions, by_day=False):
+    etag = '-'.join('%s.%s' % (t, versions.get(t, 0)) for t in tables)
+    return etag + '-day.%s' % versions['day'] if by_day else etag
+
+def versioned(*tables, by_day=False):
+    # Strong ETag from the per-table change versions (migrations/006, 017). The
+    # version is read before the data, so a concurrent write can only make
+    # the ETag older than the body, never newer. A matching If-None-Match
+    # is answered with 304 without reading the tables themselves.
+    # by_day: the body also depends on the date (e.g. a window of recent
+    # days), so the ETag changes at midnight too.
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            versions = table_versions(tables, by_day)
+            etag = version_etag(tables, versions, by_day)
+            matched = matching_etag(etag, request.if_none_match)
+            if matched:
+                resp = make_response('', 304)
+                resp.set_etag(matched)
+                return resp
+            resp = make_response(f(*args, **kwargs))
+            if resp.status_code == 200:
+                resp.set_etag(etag)
+            return resp
+        return wrapper
+    return decorator
+
+# ---------------- REFERENCE DATA CACHE ----------------
+
+# Near-static master data (/materials, /users) is served from memory. Every
+# worker LISTENs for the NOTIFYs fired on writes (migrations/009); while that
+# listener is down the cache is bypassed, so no worker serves stale lists.
+# The same listener feeds the /changes stream (see CHANGE FEED).
+CACHE_TTL = float(os.getenv('CACHE_TTL', 300))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 256))
+
+
+class ReferenceCache:
+    def __init__(self, ttl, max_entries, requires_listener=True):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Without a listener, entries are only as fresh as the TTL
+        self.requires_listener = requires_listener
+        self._entries = OrderedDict()  # (table, path) -> (expires_at, value)
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.listening = False
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def enabled(self):
+        return (self.listening or not self.requires_listener) and self.ttl > 0
+
+    def generation(self, table):
+        with self._lock:
+            return self._generations.get(table, 0)
+
+    def get(self, table, path):
+        with self._lock:
+            entry = self._entries.get((table, path))
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end((table, path))
+                self.hits += 1
+                return entry[1]
+            self._entries.pop((table, path), None)
+            self.misses += 1
+            return None
+
+    def put(self, table, path, value, generation):
+        with self._lock:
+            # Skip if the table was invalidated while the value was being built
+            if self._generations.get(table, 0) != generation:
+                return
+            self._entries[(table, path)] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end((table, path))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, table):
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in [k for k in self._entries if k[0] == table]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for table in set(self._generations) | {k[0] for k in self._entries}:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'listening': self.listening,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+            }
+
+
+reference_cache = ReferenceCache(CACHE_TTL, CACHE_MAX_ENTRIES)
+_listener_pid = None
+
+def _listen_for_notifications():
+    # One connection per worker for every channel
+    while True:
+        conn = None
+        try:
+            conn = _connect()
+            conn.autocommit = True
+            cur = conn.cursor()
+            cur.execute('LISTEN cache_invalidation')
+            cur.execute('LISTEN change_feed')
+            # Anything may have changed while we were not listening
+            reference_cache.clear()
+            reference_cache.listening = True
+            change_feed.resync()
+            change_feed.listening = True
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    cur.execute('SELECT 1')  # notice dead connections
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    if notify.channel == 'change_feed':
+                        change_feed.publish(notify.payload)
+                    else:
+                        reference_cache.invalidate(notify.payload)
+        except Exception:
+            reference_cache.listening = False
+            reference_cache.clear()
+            change_feed.listening = False
+            cache_log.warning('listener disconnected, retrying in 5s', exc_info=True)
+            time.sleep(5)
+        finally:
+            if conn is not None:
+                conn.close()
+
+def ensure_listener():
+    global _listener_pid
+    if _listener_pid != os.getpid():
+        with _pool_lock:
+            if _listener_pid != os.getpid():
+                reference_cache.listening = False
+                reference_cache.clear()
+                threading.Thread(target=_listen_for_notifications, name='db-listener', daemon=True).start()
+                _listener_pid = os.getpid()
+
+def cached(table, cache=reference_cache):
+    # Goes above @versioned: a hit answers (or 304s) without touching the DB.
+    # Inside /batch the view always runs, so it reads the batch's snapshot.
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if cache.ttl <= 0 or g.get('batch_snapshot'):
+                return f(*args, **kwargs)
+            if cache.requires_listener:
+                ensure_listener()
+            if not cache.enabled():
+                return f(*args, **kwargs)
+
+            path = request.full_path
+            entry = cache.get(table, path)
+            if entry is None:
+                generation = cache.generation(table)
+                resp = make_response(f(*args, **kwargs))
+                if resp.status_code == 200 and not resp.is_streamed:
+                    cache.put(
+                        table, path, (resp.get_data(), resp.mimetype, resp.get_etag()[0]), generation
+                    )
+                return resp
+
+            body, mimetype, etag = entry
+            matched = matching_etag(etag, request.if_none_match) if etag else None
+            if matched:
+                resp = make_response('', 304)
+                resp.set_etag(matched)
+            else:
+                resp = Response(body, mimetype=mimetype)
+                if etag:
+                    resp.set_etag(etag)
+            return resp
+        return wrapper
+    return decorator
+
+# ---------------- PASSWORD HASHING ----------------
+
+# bcrypt releases the GIL, so a small thread pool caps how many cores
+# password checks can take; beyond BCRYPT_MAX_PENDING queued or running
+# checks, logins are turned away with 503 instead of starving other routes.
+BCRYPT_WORKERS = int(os.getenv('BCRYPT_WORKERS', os.cpu_count() or 2))
+BCRYPT_MAX_PENDING = int(os.getenv('BCRYPT_MAX_PENDING', 4 * BCRYPT_WORKERS))
+BCRYPT_TIMEOUT = float(os.getenv('BCRYPT_TIMEOUT', 10))
+
+
+class HashingBusy(Exception):
+    pass
+
+@app.errorhandler(HashingBusy)
+def handle_hashing_busy(e):
+    resp = jsonify({'error': str(e)})
+    resp.headers['Retry-After'] = '1'
+    return resp, 503
+
+
+_bcrypt_executor = None
+_bcrypt_pid = None
+_bcrypt_slots = threading.BoundedSemaphore(BCRYPT_MAX_PENDING)
+
+def run_bcrypt(fn, *args):
+    global _bcrypt_executor, _bcrypt_pid
+    if _bcrypt_executor is None or _bcrypt_pid != os.getpid():
+        with _pool_lock:
+            if _bcrypt_executor is None or _bcrypt_pid != os.getpid():
+                _bcrypt_executor = ThreadPoolExecutor(BCRYPT_WORKERS, thread_name_prefix='bcrypt')
+                _bcrypt_pid = os.getpid()
+
+    if not _bcrypt_slots.acquire(blocking=False):
+        raise HashingBusy('Too many logins in progress, try again shortly')
+    try:
+        future = _bcrypt_executor.submit(fn, *args)
+    except Exception:
+        _bcrypt_slots.release()
+        raise
+    future.add_done_callback(lambda f: _bcrypt_slots.release())
+    try:
+        return future.result(timeout=BCRYPT_TIMEOUT)
+    except FutureTimeout:
+        # The hash keeps its slot until it finishes
+        raise HashingBusy('Password check timed out, try again shortly')
+
+# ---------------- SESSION TOKENS ----------------
+
+# Signs session tokens. Every worker must share it and it must survive
+# restarts, so there is no generated default: without SECRET_KEY logins
+# return no token and /users/session answers 503.
+SECRET_KEY = os.getenv('SECRET_KEY')
+SESSION_TOKEN_TTL = int(os.getenv('SESSION_TOKEN_TTL', 8 * 3600))
+
+if SECRET_KEY:
+    _session_signer = URLSafeTimedSerializer(SECRET_KEY, salt='gew-session')
+else:
+    _session_signer = None
+    logging.getLogger('gew').warning('SECRET_KEY is not set, session tokens are disabled')
+
+def _password_fingerprint(password_hash):
+    # Ties a token to the current password, so reset_password revokes it
+    return hashlib.sha256(password_hash.encode('utf-8')).hexdigest()[:16]
+
+def issue_session_token(username, password_hash):
+    if _session_signer is None:
+        return None
+    return _session_signer.dumps({'u': username, 'p': _password_fingerprint(password_hash)})
 
 # ---------------- USERS ----------------
 
@@ -38,19 +1149,50 @@ def login():
     cur.execute('SELECT * FROM users WHERE username = %s', (username,))
     user = cur.fetchone()
     cur.close()
-    conn.close()
+    # Don't hold a pooled connection through the bcrypt check
+    release_db_connection()
 
     if not user:
         return jsonify({'error': 'Invalid username or password'}), 401
 
     hashed_password = user['password'].encode('utf-8')
-    if bcrypt.checkpw(password.encode('utf-8'), hashed_password):
+    if run_bcrypt(bcrypt.checkpw, password.encode('utf-8'), hashed_password):
         user_dict = dict(user)
         user_dict.pop('password')  # Remove password hash before sending
+        user_dict['token'] = issue_session_token(user['username'], user['password'])
         return jsonify(user_dict)
     else:
         return jsonify({'error': 'Invalid username or password'}), 401
 
+@app.route('/users/session', methods=['POST'])
+def resume_session():
+    # Re-authenticate with a token from /users/login, no bcrypt involved
+    if _session_signer is None:
+        return jsonify({'error': 'Session tokens are not configured'}), 503
+    token = (request.json or {}).get('token')
+    if not token:
+        return jsonify({'error': 'token is required'}), 400
+    try:
+        claims = _session_signer.loads(token, max_age=SESSION_TOKEN_TTL)
+    except SignatureExpired:
+        return jsonify({'error': 'Session expired'}), 401
+    except BadSignature:
+        return jsonify({'error': 'Invalid session'}), 401
+
+    conn = get_db_connection()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    cur.execute('SELECT * FROM users WHERE username = %s', (claims.get('u'),))
+    user = cur.fetchone()
+    cur.close()
+
+    if not user or _password_fingerprint(user['password']) != claims.get('p'):
+        return jsonify({'error': 'Invalid session'}), 401
+
+    user_dict = dict(user)
+    user_dict.pop('password')
+    user_dict['token'] = issue_session_token(user['username'], user['password'])
+    return jsonify(user_dict)
+
 @app.route('/users', methods=['POST'])
 def add_user():
     data = request.json
@@ -61,7 +1203,7 @@ def add_user():
     if not all([username, password, role]):
         return jsonify({'error': 'Missing fields'}), 400
 
-    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    hashed = run_bcrypt(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt())
 
     try:
         conn = get_db_connection()
@@ -75,8 +1217,8 @@ def add_user():
             (username, hashed.decode('utf-8'), role)
         )
         conn.commit()
+        reference_cache.invalidate('users')
         cur.close()
-        conn.close()
         return jsonify({'message': 'User added/updated'}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -90,7 +1232,7 @@ def reset_password():
     if not all([username, new_password]):
         return jsonify({'error': 'Missing fields'}), 400
 
-    hashed = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
+    hashed = run_bcrypt(bcrypt.hashpw, new_password.encode('utf-8'), bcrypt.gensalt())
 
     try:
         conn = get_db_connection()
@@ -101,11 +1243,9 @@ def reset_password():
         )
         if cur.rowcount == 0:
             cur.close()
-            conn.close()
             return jsonify({'error': 'User not found'}), 404
         conn.commit()
         cur.close()
-        conn.close()
         return jsonify({'message': 'Password updated'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -118,30 +1258,70 @@ def delete_user(username):
         cur.execute('DELETE FROM users WHERE username = %s', (username,))
         if cur.rowcount == 0:
             cur.close()
-            conn.close()
             return jsonify({'error': 'User not found'}), 404
         conn.commit()
+        reference_cache.invalidate('users')
         cur.close()
-        conn.close()
         return jsonify({'message': 'User deleted'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/users', methods=['GET'])
+@cached('users')
+@versioned('users')
 def get_users():
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
     cur.execute('SELECT username, role FROM users ORDER BY username')
     users = cur.fetchall()
     cur.close()
-    conn.close()
 
     users_list = [{'username': u['username'], 'role': u['role']} for u in users]
     return jsonify(users_list)
 
 # ---------------- REPORTS ----------------
 
+# A report is stored as metadata columns plus its JSON body, gzipped
+# (migrations/015). GET /reports lists the metadata only; GET /reports/<id>
+# returns one body, sent still compressed to clients that accept gzip.
+REPORT_GZIP_LEVEL = int(os.getenv('REPORT_GZIP_LEVEL', 9))
+
+REPORT_LISTING = '''
+    SELECT id, json_build_object(
+        'id', id, 'serialNo', serial_no, 'reportType', report_type, 'savedBy', saved_by,
+        'remark', remark, 'timestamp', saved_at, 'createdAt', created_at, 'size', size
+    )::text FROM reports
+'''
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+def _report_created_at(timestamp):
+    # The app sends local ISO times without an offset
+    try:
+        created = datetime.fromisoformat(str(timestamp))
+    except ValueError:
+        return None
+    return created if created.tzinfo else created.astimezone()
+
+def report_row(data):
+    # Column values for one report; also used by migrations/016
+    meta = data if isinstance(data, dict) else {}
+    body = app.json.dumps(data).encode('utf-8')
+    return {
+        'serial_no': _text(meta.get('serialNo')),
+        'report_type': _text(meta.get('reportType')) or 'test',
+        'saved_by': _text(meta.get('savedBy')),
+        'remark': _text(meta.get('remark')),
+        'saved_at': _text(meta.get('timestamp')),
+        'created_at': _report_created_at(meta.get('timestamp')),
+        'size': len(body),
+        'body': b''.join(_compress_chunks((body,), 'gzip', REPORT_GZIP_LEVEL)),
+    }
+
 @app.route('/reports', methods=['POST'])
+@accepts_compressed_body
 def save_report():
     data = request.json.get('data')
     if not data:
@@ -151,26 +1331,67 @@ def save_report():
         conn = get_db_connection()
         cur = conn.cursor()
         cur.execute(
-            'INSERT INTO reports (data) VALUES (%s)',
-            (json.dumps(data),)
+            '''
+            INSERT INTO reports (serial_no, report_type, saved_by, remark, saved_at, created_at, size, body)
+            VALUES (%(serial_no)s, %(report_type)s, %(saved_by)s, %(remark)s, %(saved_at)s,
+                    coalesce(%(created_at)s, now()), %(size)s, %(body)s)
+            RETURNING id
+            ''',
+            report_row(data)
         )
+        report_id = cur.fetchone()[0]
         conn.commit()
         cur.close()
-        conn.close()
-        return jsonify({'message': 'Report saved'}), 201
+        return jsonify({'message': 'Report saved', 'id': report_id}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/reports', methods=['GET'])
+@compression(gzip=9, br=6)
+@versioned('reports')
 def get_reports():
+    page = Page.from_request()
+    serial_no = request.args.get('serialNo')
+    return page.run(
+        REPORT_LISTING, 'id', descending=True, after_type=int,
+        where='serial_no = %s' if serial_no is not None else None,
+        params=(serial_no,) if serial_no is not None else ()
+    )
+
+@app.route('/reports/<int:report_id>', methods=['GET'])
+def get_report(report_id):
+    # Saved reports are never edited in place, so the id alone is the ETag
+    etag = 'report.%d' % report_id
+    matched = matching_etag(etag, request.if_none_match)
+    if matched:
+        resp = make_response('', 304)
+        resp.set_etag(matched)
+        return resp
+
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute('SELECT data FROM reports ORDER BY id DESC')
-    rows = cur.fetchall()
+    cur.execute('SELECT body, data FROM reports WHERE id = %s', (report_id,))
+    row = cur.fetchone()
     cur.close()
-    conn.close()
-    reports = [json.loads(row[0]) for row in rows]
-    return jsonify(reports)
+    if not row:
+        return jsonify({'error': 'Report not found'}), 404
+
+    body, data = row
+    if body is None:
+        # Not yet moved by migrations/016; compress_response takes it from here
+        resp = Response(data, mimetype='application/json')
+        resp.set_etag(etag)
+        return resp
+    resp = Response(mimetype='application/json')
+    resp.vary.add('Accept-Encoding')
+    if request.accept_encodings['gzip']:
+        resp.set_data(bytes(body))
+        resp.headers['Content-Encoding'] = 'gzip'
+        resp.set_etag(etag + '-gzip')
+    else:
+        resp.set_data(_decompress(bytes(body), 'gzip'))
+        resp.set_etag(etag)
+    return resp
 
 # ---------------- JOBS ----------------
 
@@ -192,43 +1413,26 @@ def save_job():
             INSERT INTO jobs (serial_no, data) VALUES (%s, %s)
             ON CONFLICT (serial_no) DO UPDATE SET data = EXCLUDED.data
             ''',
-            (serialNo, json.dumps(job))
+            (serialNo, app.json.dumps(job))
         )
         conn.commit()
         cur.close()
-        conn.close()
         return jsonify({'message': 'Job saved/updated'}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/jobs', methods=['GET'])
+@versioned('jobs')
 def get_jobs():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    cur.execute('SELECT data FROM jobs ORDER BY serial_no')
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    jobs = []
-    for row in rows:
-        jobs.append(json.loads(row[0]))
-    
-    return jsonify(jobs)
+    page = Page.from_request()
+    return page.run('SELECT serial_no, data FROM jobs', 'serial_no')
 
 @app.route('/jobs/open', methods=['GET'])
+@versioned('jobs')
 def get_open_jobs():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT data FROM jobs ORDER BY serial_no')
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    # Parse JSON from the 'data' column
-    jobs_list = [json.loads(row[0]) for row in rows]
-    open_jobs = [job for job in jobs_list if not job.get('isFinal', False)]
-    return jsonify(open_jobs)
+    page = Page.from_request()
+    # is_final has a partial index (migrations/001)
+    return page.run('SELECT serial_no, data FROM jobs', 'serial_no', where='NOT is_final')
     
 
 # ---------------- MATERIALS ----------------
@@ -255,25 +1459,21 @@ def add_material():
             VALUES (%s, %s, %s, %s)
             ON CONFLICT (id) DO UPDATE SET data = EXCLUDED.data
             ''',
-            (material_id, m_type, subtype, json.dumps(data))
+            (material_id, m_type, subtype, app.json.dumps(data))
         )
         conn.commit()
+        reference_cache.invalidate('materials')
         cur.close()
-        conn.close()
         return jsonify({'message': 'Material added/updated', 'id': material_id}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/materials', methods=['GET'])
+@cached('materials')
+@versioned('materials')
 def get_materials():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT data FROM materials ORDER BY id')
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    materials = [json.loads(row[0]) for row in rows]
-    return jsonify(materials)
+    page = Page.from_request()
+    return page.run('SELECT id, data FROM materials', 'id')
 
 @app.route('/materials', methods=['DELETE'])
 def delete_material():
@@ -293,11 +1493,10 @@ def delete_material():
         )
         if cur.rowcount == 0:
             cur.close()
-            conn.close()
             return jsonify({'error': 'Material not found'}), 404
         conn.commit()
+        reference_cache.invalidate('materials')
         cur.close()
-        conn.close()
         return jsonify({'message': 'Material deleted'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -316,30 +1515,21 @@ def submit_material_incoming():
         cur = conn.cursor()
         cur.execute(
             'INSERT INTO incoming_materials (id, data) VALUES (%s, %s)',
-            (incoming_id, json.dumps(data))
+            (incoming_id, app.json.dumps(data))
         )
         conn.commit()
         cur.close()
-        conn.close()
         return jsonify({'message': 'Incoming material submitted', 'id': incoming_id}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/incoming_materials', methods=['GET'])
+@versioned('incoming_materials')
 def get_material_incoming_entries():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT id, data FROM incoming_materials ORDER BY id')
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    entries = []
-    for row in rows:
-        entry = json.loads(row[1])
-        entry['id'] = row[0]
-        entries.append(entry)
-    return jsonify(entries)
+    page = Page.from_request()
+    return page.run(
+        "SELECT id, data || jsonb_build_object('id', id) FROM incoming_materials", 'id'
+    )
 
 @app.route('/incoming_materials/<entry_id>', methods=['DELETE'])
 def delete_material_entry(entry_id):
@@ -349,26 +1539,24 @@ def delete_material_entry(entry_id):
         cur.execute('DELETE FROM incoming_materials WHERE id = %s', (entry_id,))
         if cur.rowcount == 0:
             cur.close()
-            conn.close()
             return jsonify({'error': 'Entry not found'}), 404
         conn.commit()
         cur.close()
-        conn.close()
         return jsonify({'message': 'Entry deleted'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/incoming_materials/<entry_id>', methods=['GET'])
+@versioned('incoming_materials')
 def get_material_entry_by_id(entry_id):
     conn = get_db_connection()
     cur = conn.cursor()
     cur.execute('SELECT data FROM incoming_materials WHERE id = %s', (entry_id,))
     row = cur.fetchone()
     cur.close()
-    conn.close()
     if not row:
         return jsonify({'error': 'Entry not found'}), 404
-    return jsonify(json.loads(row[0]))
+    return Response(row[0], mimetype='application/json')
 
 @app.route('/outgoing_materials', methods=['POST'])
 def submit_material_outgoing():
@@ -382,30 +1570,21 @@ def submit_material_outgoing():
         cur = conn.cursor()
         cur.execute(
             'INSERT INTO outgoing_materials (id, data) VALUES (%s, %s)',
-            (outgoing_id, json.dumps(data))
+            (outgoing_id, app.json.dumps(data))
         )
         conn.commit()
         cur.close()
-        conn.close()
         return jsonify({'message': 'Outgoing material submitted', 'id': outgoing_id}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/outgoing_materials', methods=['GET'])
+@versioned('outgoing_materials')
 def get_material_outgoing_entries():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT id, data FROM outgoing_materials ORDER BY id')
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    entries = []
-    for row in rows:
-        entry = json.loads(row[1])
-        entry['id'] = row[0]
-        entries.append(entry)
-    return jsonify(entries)
+    page = Page.from_request()
+    return page.run(
+        "SELECT id, data || jsonb_build_object('id', id) FROM outgoing_materials", 'id'
+    )
 
 
 # ---------------- STOCK ----------------
@@ -432,25 +1611,23 @@ def add_stock():
     
     material = f"{m_type} - {subtype}"
     key = material
-    print("key %s, job_specific %s ",key,job_specific)
     if job_specific and serial_no:
         key = f"{material} - {serial_no}"
 
     try:
         conn = get_db_connection()
         cur = conn.cursor()
-        print("add_stock() INSERT INTO stock (id,key, data) VALUES (%s, %s, %s)",(stock_id,key, json.dumps(data)))
+        stock_log.debug('add_stock', extra={'key': key, 'job_specific': job_specific, 'payload': data})
         cur.execute(
             'INSERT INTO stock (id,key, data) VALUES (%s, %s, %s)',
-                    (stock_id ,key, json.dumps(data))
+                    (stock_id ,key, app.json.dumps(data))
             )
         conn.commit()
         cur.close()
-        conn.close()
         return jsonify({'message': 'Stock Added'}), 200
 
     except Exception as e:
-        print("Exception: %s",str(e))
+        stock_log.exception('add_stock failed', extra={'key': key})
         return jsonify({'error': str(e)}), 500
 
 
@@ -458,7 +1635,7 @@ def add_stock():
 def delete_stock_entry():
     try:
         payload = request.json.get('data')
-        print("Payload: %s",payload);
+        stock_log.debug('delete_stock_entry', extra={'payload': payload})
         m_type = payload.get('type')
         subtype = payload.get('subtype')
         serial_no = payload.get('serialNo', None)
@@ -482,25 +1659,23 @@ def delete_stock_entry():
         # Optional: Fetch and return the row before deletion (for logging or client display)
         cur.execute("""
             SELECT * FROM stock
-            WHERE key = %s AND (data::json->>'invoice') = %s
+            WHERE key = %s AND (data->>'invoice') = %s
         """, (key, invoice))
         result = cur.fetchone()
         if not result:
-            conn.close()
             return jsonify({'error': 'No matching record found'}), 404
 
         # Now delete the row
         cur.execute("""
             DELETE FROM stock
-            WHERE key = %s AND (data::json->>'invoice') = %s
+            WHERE key = %s AND (data->>'invoice') = %s
         """, (key, invoice))
         conn.commit()
-        conn.close()
 
         return jsonify({'message': 'Entry deleted successfully'}), 200
 
     except Exception as e:
-        print("Exception: %s",str(e))
+        stock_log.exception('delete_stock_entry failed')
         return jsonify({'error': str(e)}), 500
 
 
@@ -508,13 +1683,9 @@ def delete_stock_entry():
 def update_stock():
     data = request.json.get('data')
     issue_quantity = request.json.get('quantity')
-    if not data and issue_quantity:
+    if not data or issue_quantity is None:
         return jsonify({'error': 'Missing stock data or quantity'}), 400
 
-    # To keep the logic same as Dart updateStock method,
-    # we will just store or update stock by key
-    # and calculate new quantity and price accordingly.
-
     material = data.get('material')
     if not material:
         return jsonify({'error': 'material field required'}), 401
@@ -526,100 +1697,104 @@ def update_stock():
     key = material
     if job_specific and serial_no:
         key = f"{material} - {serial_no}"
+    stock_log.debug('update_stock', extra={'key': key, 'invoice': invoice, 'quantity': issue_quantity})
 
     try:
         conn = get_db_connection()
         cur = conn.cursor()
+        # One statement: both UPDATEs lock their row and do the arithmetic on
+        # the latest committed values, so concurrent issues of the same
+        # material cannot lose each other's decrements. Quantities never go
+        # below zero; indentQuantity is only reduced while it is positive.
         cur.execute("""
-            SELECT * FROM stock
-            WHERE key = %s AND (data::json->>'invoice') = %s
-        """, (key, invoice))
-        row = cur.fetchone()
+            WITH issued AS (
+                UPDATE stock SET data = data || jsonb_build_object(
+                    'quantity', GREATEST(parse_numeric(data->>'quantity') - %(qty)s, 0),
+                    'indentQuantity', GREATEST(
+                        parse_numeric(data->>'indentQuantity')
+                            - CASE WHEN parse_numeric(data->>'indentQuantity') > 0 THEN %(qty)s ELSE 0 END,
+                        0)
+                )
+                WHERE key = %(key)s AND (data->>'invoice') = %(invoice)s
+                RETURNING key
+            ), indent AS (
+                UPDATE indent_stock SET data = data || jsonb_build_object(
+                    'indentQuantity', GREATEST(parse_numeric(data->>'indentQuantity') - %(qty)s, 0)
+                )
+                WHERE key = %(key)s
+                  AND parse_numeric(data->>'indentQuantity') > 0
+                  AND EXISTS (SELECT 1 FROM issued)
+                RETURNING key
+            )
+            SELECT (SELECT count(*) FROM issued)
+        """, {'key': key, 'invoice': invoice, 'qty': parse_float(issue_quantity)})
+        issued = cur.fetchone()[0]
+        if not issued:
+            return jsonify({'error': 'No matching stock entry found'}), 404
 
-        if row:
-            existing_data = json.loads(row[1])
-        else:
-            existing_data = None
-
-        # Update indentQuantity only if present and greater than 0
-        if float(existing_data.get('indentQuantity', 0.0)) > 0.0:
-            existing_data['indentQuantity'] = float(existing_data.get('indentQuantity', 0.0)) - float(issue_quantity)
-        existing_data['indentQuantity'] = max(updated_indent, 0.0)
-
-        # Update the current stock quantity
-        current_qty = parse_float(existing_data.get('quantity', 0.0))
-        new_qty = max(0.0, current_qty - parse_float(issue_quantity))
-        existing_data['quantity'] = new_qty
-        
-                
-        cur.execute("""
-            UPDATE stock SET data =%s
-            WHERE key = %s AND (data::json->>'invoice') = %s
-        """, (json.dumps(existing_data),key, invoice))
-        
-        # Get row from indent_stock
-        cur.execute("SELECT data FROM indent_stock WHERE key = %s", (key,))
-        
-        indentrow = cur.fetchone()
-        if indentrow:
-            indentrow = json.loads(indentrow[0])
-        else:
-            indentrow = None
-
-        print("INDENT STOCK %s,%s",indentrow,issue_quantity,key);        
-        
-        if float(indentrow.get('indentQuantity', 0.0)) > 0.0:
-            indentrow['indentQuantity'] = float(indentrow.get('indentQuantity', 0.0)) - float(issue_quantity)
-        
-                 
-        cur.execute(
-                    "UPDATE indent_stock SET data = %s WHERE key = %s",
-                    (json.dumps(indentrow), key))
-        
         conn.commit()
         cur.close()
-        conn.close()
         return jsonify({'message': 'Stock updated'}), 200
 
     except Exception as e:
-        exc_type, exc_obj, tb = sys.exc_info()
-        line_number = tb.tb_lineno
-        print(f"Exception: {e} at line {line_number}")
+        stock_log.exception('update_stock failed', extra={'key': key, 'invoice': invoice})
         return jsonify({'error': str(e)}), 500
 
 @app.route('/indent_stock', methods=['GET'])
+@versioned('indent_stock')
 def get_indent_stock():
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute('SELECT * FROM indent_stock')
+    cur.execute('SELECT key, data FROM indent_stock')
     indent_stock = cur.fetchall()
     cur.close()
-    conn.close()
 
     return jsonify(indent_stock)
 
 
 @app.route('/stock', methods=['GET'])
+@versioned('stock')
 def get_stock():
     is_job_specific = request.args.get('isJobSpecific', 'false').lower() == 'true'
+    page = Page.from_request()
+
+    if g.get('shared_stock_scan') and page.limit is None:
+        return page.response(shared_stock_rows(is_job_specific))
+    # is_job_specific has partial indexes (migrations/001)
+    return page.run(
+        "SELECT key, data || jsonb_build_object('key', key) FROM stock", 'key',
+        where='is_job_specific = %s', params=(is_job_specific,)
+    )
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT key, data FROM stock ORDER BY key')
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    stock_list = []
-    for row in rows:
-        data = json.loads(row[1])
-        data['key'] = row[0]
-        stock_list.append(data)
-
-    filtered = [item for item in stock_list if ('serialNo' in item) == is_job_specific]
-    return jsonify(filtered)
+@app.route('/stock/balance', methods=['GET'])
+@versioned('stock')
+def get_stock_balance():
+    # Per-key balances kept up to date by the stock ledger (migrations/010).
+    # ?material=<type - subtype> and ?serialNo=<job> are both indexed.
+    page = Page.from_request()
+    conditions = []
+    params = []
+    material = request.args.get('material')
+    if material:
+        conditions.append('material = %s')
+        params.append(material)
+    serial_no = request.args.get('serialNo')
+    if serial_no:
+        conditions.append('serial_no = %s')
+        params.append(serial_no)
+
+    return page.run(
+        """
+        SELECT stock_key, jsonb_build_object(
+            'key', stock_key, 'material', material, 'type', type, 'subtype', subtype,
+            'serialNo', serial_no, 'quantity', quantity, 'value', value
+        ) FROM stock_balances
+        """,
+        'stock_key', where=' AND '.join(conditions) or None, params=params
+    )
 
 @app.route('/stock/save', methods=['POST'])
+@accepts_compressed_body
 def save_stock():
     stock_data = request.json.get('stockData')
     is_job_specific = request.json.get('isJobSpecific', False)
@@ -627,33 +1802,45 @@ def save_stock():
     if not stock_data or not isinstance(stock_data, list):
         return jsonify({'error': 'stockData must be a list'}), 400
 
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        for item in stock_data:
-            m_type = item.get('type')
-            subtype = item.get('subtype')
-            serial_no = item.get('serialNo', None)
+    # Validate and key the whole upload first. Later items win on duplicate
+    # keys, as they did when each item was upserted in turn.
+    rows = {}
+    rejected = []
+    for index, item in enumerate(stock_data):
+        if not isinstance(item, dict):
+            rejected.append({'index': index, 'error': 'item must be an object'})
+            continue
+        m_type = item.get('type')
+        subtype = item.get('subtype')
+        serial_no = item.get('serialNo', None)
 
-            if not m_type or not subtype:
-                continue
+        if not m_type or not subtype:
+            rejected.append({'index': index, 'error': 'type and subtype are required'})
+            continue
 
-            key = f"{m_type} - {subtype}"
-            if is_job_specific and serial_no:
-                key = f"{key} - {serial_no}"
+        key = f"{m_type} - {subtype}"
+        if is_job_specific and serial_no:
+            key = f"{key} - {serial_no}"
+        rows[key] = app.json.dumps(item)
 
-            cur.execute(
+    try:
+        if rows:
+            conn = get_db_connection()
+            cur = conn.cursor()
+            # Ledger entries from this upload are stock-take corrections (migrations/010)
+            cur.execute("SET LOCAL gew.movement_kind = 'stocktake'")
+            psycopg2.extras.execute_values(
+                cur,
                 '''
-                INSERT INTO stock (key, data) VALUES (%s, %s)
+                INSERT INTO stock (key, data) VALUES %s
                 ON CONFLICT (key) DO UPDATE SET data = EXCLUDED.data
                 ''',
-                (key, json.dumps(item))
+                sorted(rows.items()),
+                page_size=len(rows)
             )
-        conn.commit()
-        cur.close()
-        conn.close()
-        return jsonify({'message': 'Stock saved'}), 200
+            conn.commit()
+            cur.close()
+        return jsonify({'message': 'Stock saved', 'saved': len(rows), 'rejected': rejected}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -661,79 +1848,81 @@ def save_stock():
 # ---------------- JOB INDENTS ----------------
 
 @app.route('/job_indents', methods=['POST'])
+@accepts_compressed_body
 def submit_job_indent():
     data = request.json.get('data')  # expecting list of indent dicts
+    indent_log.debug('submit_job_indent', extra={'payload': data})
    
     if not data or not isinstance(data, list):
         return jsonify({'error': 'List of indents expected'}), 400
 
+    # Sum quantities per stock key first so each indent_stock row is written
+    # once; ON CONFLICT cannot touch the same row twice in one statement.
+    indent_totals = {}
+    indent_rows = []
+    for indent in data:
+        jobid = indent.get('serialNo')
+        matType = indent.get('type')
+        subType = indent.get('subtype')
+        job_specific = indent.get('jobSpecific') is True 
+        indentquantity = indent.get('quantity')
+        if not jobid:
+            continue
+
+        if job_specific:
+            stock_key = f"{matType} - {subType} - {jobid}"
+        else:
+            stock_key = f"{matType} - {subType}"
+
+        if not isinstance(indentquantity, (int, float)):
+            indentquantity = parse_float(indentquantity)
+        indent_totals[stock_key] = indent_totals.get(stock_key, 0) + indentquantity
+        indent_rows.append((jobid, app.json.dumps(indent)))
+
+    if not indent_rows:
+        return jsonify({'message': 'Job indents submitted'}), 200
+
     try:
         conn = get_db_connection()
         cur = conn.cursor()
-        for indent in data:
-            jobid = indent.get('serialNo')
-            matType = indent.get('type')
-            subType = indent.get('subtype')
-            job_specific = indent.get('jobSpecific') is True 
-            indentquantity = indent.get('quantity')
-            if not jobid:
-                continue
-            
-            if job_specific:
-                stock_key = f"{matType} - {subType} - {jobid}"
-            else:
-                stock_key = f"{matType} - {subType}"
-                
-            # Fetch stock row
-            cur.execute("SELECT data FROM indent_stock WHERE key = %s", (stock_key,))
-            row = cur.fetchone()
-            
-            if row:
-                stock_data = json.loads(row[0])
-                existingindentQty = stock_data["indentQuantity"]
-                stock_data["indentQuantity"] = existingindentQty + indentquantity
-                # Save stock
-                cur.execute(
-                    "UPDATE indent_stock SET data = %s WHERE key = %s",
-                    (json.dumps(stock_data), stock_key)
-            )
-            else:
-                # Create new stock data
-                stock_id = str(uuid.uuid4())
-                stock_data = {
-                    "indentQuantity": indentquantity
-                }
-                
-                # Insert new stock row
-                cur.execute(
-                    "INSERT INTO indent_stock (key, data) VALUES (%s, %s)",
-                    (stock_key, json.dumps(stock_data))
-                )
-
-                    
-            cur.execute(
-                'INSERT INTO job_indents (jobid, data) VALUES (%s, %s)',
-                (jobid, json.dumps(indent))
+        # Sorted keys give concurrent submissions the same row-lock order
+        psycopg2.extras.execute_values(
+            cur,
+            """
+            INSERT INTO indent_stock AS s (key, data) VALUES %s
+            ON CONFLICT (key) DO UPDATE SET data = COALESCE(s.data, '{}'::jsonb) || jsonb_build_object(
+                'indentQuantity',
+                parse_numeric(s.data->>'indentQuantity')
+                    + parse_numeric(EXCLUDED.data->>'indentQuantity')
             )
+            """,
+            [(key, app.json.dumps({'indentQuantity': qty})) for key, qty in sorted(indent_totals.items())],
+            page_size=len(indent_totals)
+        )
+        psycopg2.extras.execute_values(
+            cur,
+            'INSERT INTO job_indents (jobid, data) VALUES %s',
+            indent_rows,
+            page_size=len(indent_rows)
+        )
         conn.commit()
         cur.close()
-        conn.close()
         return jsonify({'message': 'Job indents submitted'}), 200
     except Exception as e:
-        print("Exception: %s",str(e))
+        indent_log.exception('submit_job_indent failed', extra={'indents': len(indent_rows)})
         return jsonify({'error': str(e)}), 500
 
 @app.route('/job_indents/<jobid>', methods=['GET'])
+@versioned('job_indents')
 def get_indents_for_job(jobid):
     conn = get_db_connection()
     cur = conn.cursor()
     cur.execute('SELECT data FROM job_indents WHERE jobid = %s', (jobid,))
     rows = cur.fetchall()
     cur.close()
-    conn.close()
 
-    indents = [json.loads(row[0]) for row in rows]
-    return jsonify(indents)
+    # Stored JSON goes out as-is, no decode/encode round trip
+    return Response('[' + ','.join(row[0] for row in rows) + ']', mimetype='application/json')
 
 @app.route('/job_indents', methods=['PUT'])
 def update_job_indent():
@@ -757,10 +1946,10 @@ def update_job_indent():
         # Check for matching row inside JSON
         cur.execute(
             '''
-            SELECT * FROM job_indents
+            SELECT id, data FROM job_indents
             WHERE jobid = %s
-            AND data::json->>'type' = %s
-            AND data::json->>'subtype' = %s
+            AND data->>'type' = %s
+            AND data->>'subtype' = %s
             ''',
             (jobid, item_type, item_subtype)
         )
@@ -770,7 +1959,7 @@ def update_job_indent():
 
         # Get the unique row ID
         indent_id = row[0]
-        matched_indent = json.loads(row[2])
+        matched_indent = app.json.loads(row[1])
         matched_indent['price'] = data.get('price')
         matched_indent['issuedQty'] = data.get('issuedQty')
         matched_indent['issuedValue'] = data.get('issuedValue')
@@ -785,26 +1974,522 @@ def update_job_indent():
             SET data = %s
             WHERE id = %s
             ''',
-            (json.dumps(matched_indent), indent_id)
+            (app.json.dumps(matched_indent), indent_id)
         )
 
         conn.commit()
         cur.close()
-        conn.close()
 
         return jsonify({'message': 'Job indent updated'}), 200
 
     except Exception as e:
-        print("Exception: %s",str(e))
+        indent_log.exception('update_job_indent failed', extra={'jobid': jobid})
         return jsonify({'error': str(e)}), 500
 
 
 
+# ---------------- BATCH ----------------
+
+# POST /batch {"requests": ["/stock?isJobSpecific=false", {"path": "/jobs/open"}, ...]}
+# runs several GET routes on one pooled connection inside one read-only
+# REPEATABLE READ transaction, so every result comes from the same snapshot
+# (cached routes skip their cache). Each item runs under a savepoint, so a
+# failing one does not abort the rest.
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 50))
+# Only these plain JSON reads; streams (/changes), /sync (its own snapshot),
+# binary bodies (/reports/<id>) and /batch itself answer 400 per item.
+BATCH_ENDPOINTS = {
+    'get_users', 'get_reports', 'get_jobs', 'get_open_jobs', 'get_materials',
+    'get_material_incoming_entries', 'get_material_entry_by_id',
+    'get_material_outgoing_entries', 'get_stock', 'get_stock_balance',
+    'get_indent_stock', 'get_indents_for_job', 'dashboard_summary',
+    'search_jobs', 'search_materials',
+}
+
+
+def shared_stock_rows(is_job_specific):
+    # A batch asking for both /stock lists reads the table once
+    if 'stock_rows' not in g:
+        cur = get_db_connection().cursor()
+        cur.execute("SELECT is_job_specific, key, data || jsonb_build_object('key', key) FROM stock ORDER BY key")
+        g.stock_rows = {True: [], False: []}
+        for flag, key, item in cur:
+            g.stock_rows[flag].append((key, item))
+        cur.close()
+    return g.stock_rows[is_job_specific]
+
+
+def _parse_batch_item(item):
+    if isinstance(item, str):
+        item = {'path': item}
+    path = item.get('path') if isinstance(item, dict) else None
+    if not isinstance(path, str) or not path.startswith('/'):
+        raise InvalidParam('each request needs a path starting with /')
+    path, _, query = path.partition('?')
+    args = dict(parse_qsl(query, keep_blank_values=True))
+    params = item.get('params') or {}
+    if not isinstance(params, dict):
+        raise InvalidParam('params must be an object')
+    args.update({k: str(v).lower() if isinstance(v, bool) else str(v) for k, v in params.items()})
+    if STREAM_RESPONSES or 'stream' in args:
+        args['stream'] = 'false'  # the results are embedded in one body
+    return path, args
+
+
+def _dispatch_get(path, args):
+    # The nested request context reuses this request's app context, so the
+    # view sees the same g.db_conn and with it the batch's transaction.
+    environ = EnvironBuilder(path=path, query_string=args, method='GET', base_url=request.host_url).get_environ()
+    with app.request_context(environ):
+        if request.routing_exception is not None:
+            e = request.routing_exception
+            return getattr(e, 'code', 404), None, json.dumps({'error': e.description})
+        if request.url_rule.endpoint not in BATCH_ENDPOINTS:
+            return 400, None, json.dumps({'error': '%s cannot be batched' % path})
+        try:
+            try:
+                rv = app.dispatch_request()
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+        except Exception as e:
+            return 500, None, json.dumps({'error': str(e)})
+        if isinstance(rv, HTTPException):
+            return rv.code, None, json.dumps({'error': rv.description})
+        resp = app.make_response(rv)
+        if resp.is_streamed or resp.mimetype == 'text/event-stream':
+            resp.close()
+            return 500, None, json.dumps({'error': '%s streamed its response' % path})
+        body = resp.get_data(as_text=True)
+        if resp.mimetype != 'application/json' or not body:
+            body = json.dumps(body)
+        return resp.status_code, resp.get_etag()[0], body
+
+
+def _batch_part(path, status, etag, body):
+    return '{"path":%s,"status":%d,"etag":%s,"body":%s}' % (json.dumps(path), status, json.dumps(etag), body)
+
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    items = (request.get_json(silent=True) or {}).get('requests')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'requests must be a non-empty list'}), 400
+    if len(items) > BATCH_MAX_REQUESTS:
+        return jsonify({'error': 'at most %d requests per batch' % BATCH_MAX_REQUESTS}), 400
+    subrequests = [_parse_batch_item(item) for item in items]
+
+    stock_flags = {
+        args.get('isJobSpecific', 'false').lower() == 'true'
+        for path, args in subrequests if path == '/stock' and 'limit' not in args
+    }
+    g.shared_stock_scan = len(stock_flags) > 1
+
+    conn = get_db_connection()
+    conn.rollback()
+    cur = conn.cursor()
+    cur.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+    cur.execute('SELECT 1')  # takes the snapshot outside any savepoint
+    g.batch_snapshot = True
+
+    parts = []
+    for i, (path, args) in enumerate(subrequests):
+        cur.execute('SAVEPOINT batch_item')
+        status, etag, body = _dispatch_get(path, args)
+        parts.append(_batch_part(path, status, etag, body))
+        if conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            # The view committed or rolled back: the snapshot is gone
+            error = json.dumps({'error': 'batch snapshot lost after %s' % path})
+            parts += [_batch_part(p, 500, None, error) for p, _ in subrequests[i + 1:]]
+            break
+        cur.execute('ROLLBACK TO SAVEPOINT batch_item')  # read only: nothing to keep
+    cur.close()
+    conn.rollback()
+    return Response('{"responses":[' + ','.join(parts) + ']}', mimetype='application/json')
+
+# ---------------- DASHBOARD ----------------
+
+# Counts and totals for the dashboard, built in one aggregate query so the
+# app no longer downloads /jobs and /stock to sum them on the device. The
+# response, ETag included, is held for DASHBOARD_CACHE_TTL seconds, so for
+# that long after a write clients may still get (or 304 on) the old one.
+DASHBOARD_CACHE_TTL = float(os.getenv('DASHBOARD_CACHE_TTL', 30))
+DASHBOARD_MOVEMENT_DAYS = int(os.getenv('DASHBOARD_MOVEMENT_DAYS', 7))
+
+summary_cache = ReferenceCache(DASHBOARD_CACHE_TTL, 16, requires_listener=False)
+
+# Stock value comes from the ledger balances (migrations/010), pending
+# indents from indent_stock, recent movements from the ledger itself:
+# those of today and the days before it. Both placeholders are the number
+# of days.
+DASHBOARD_SUMMARY = """
+    SELECT jsonb_build_object(
+        'jobs', (
+            SELECT jsonb_build_object(
+                'total', count(*),
+                'open', count(*) FILTER (WHERE NOT is_final),
+                'closed', count(*) FILTER (WHERE is_final)
+            ) FROM jobs
+        ),
+        'stock', (
+            SELECT jsonb_build_object(
+                'keys', coalesce(sum(keys), 0),
+                'value', coalesce(sum(value), 0),
+                'job_specific_value', coalesce(sum(job_specific_value), 0),
+                'by_type', coalesce(jsonb_agg(t ORDER BY t.type), '[]'::jsonb)
+            ) FROM (
+                SELECT coalesce(type, '') AS type, count(*) AS keys,
+                       sum(quantity) AS quantity, sum(value) AS value,
+                       coalesce(sum(value) FILTER (WHERE serial_no IS NOT NULL), 0) AS job_specific_value
+                FROM stock_balances
+                GROUP BY 1
+            ) t
+        ),
+        'indents', (
+            SELECT jsonb_build_object(
+                'keys', coalesce(sum(keys), 0),
+                'quantity', coalesce(sum(quantity), 0),
+                'by_type', coalesce(jsonb_agg(t ORDER BY t.type), '[]'::jsonb)
+            ) FROM (
+                SELECT split_part(key, ' - ', 1) AS type, count(*) AS keys, sum(qty) AS quantity
+                FROM (SELECT key, parse_numeric(data->>'indentQuantity') AS qty FROM indent_stock) s
+                WHERE qty > 0
+                GROUP BY 1
+            ) t
+        ),
+        'movements', (
+            SELECT jsonb_build_object(
+                'days', %s::int,
+                'total', coalesce(sum(n), 0),
+                'by_kind', coalesce(jsonb_object_agg(kind, n), '{}'::jsonb)
+            ) FROM (
+                SELECT kind, count(*) AS n FROM stock_movements
+                WHERE created_at >= current_date - (%s::int - 1)
+                GROUP BY kind
+            ) m
+        )
+    )
+"""
+
+
+def dashboard_days(args):
+    try:
+        days = int(args.get('days', DASHBOARD_MOVEMENT_DAYS))
+    except ValueError:
+        raise InvalidParam('days must be an integer')
+    if days < 1:
+        raise InvalidParam('days must be at least 1')
+    return days
+
+
+@app.route('/dashboard/summary', methods=['GET'])
+@cached('dashboard', cache=summary_cache)
+@versioned('jobs', 'stock', 'indent_stock', by_day=True)
+def dashboard_summary():
+    days = dashboard_days(request.args)
+    cur = get_db_connection().cursor()
+    cur.execute(DASHBOARD_SUMMARY, (days, days))
+    summary = cur.fetchone()[0]
+    cur.close()
+    return Response(summary, mimetype='application/json')
+
+# ---------------- SYNC ----------------
+
+# GET /sync?since=<token>[&tables=jobs,stock] returns, per table, the rows
+# written and the keys deleted since the token (migrations/012), plus the
+# token for the next call. Without since it returns every row ("full":
+# true) for the client to replace its copy with. A row may come back in
+# two consecutive syncs; a change is never skipped.
+SYNC_TABLES = {
+    'jobs': 'serial_no',
+    'stock': 'key',
+    'indent_stock': 'key',
+    'materials': 'id',
+    'job_indents': 'id',
+    'incoming_materials': 'id',
+    'outgoing_materials': 'id',
+}
+
+
+def _sync_tables(value):
+    if value is None:
+        return list(SYNC_TABLES)
+    tables = [t.strip() for t in value.split(',') if t.strip()]
+    unknown = [t for t in tables if t not in SYNC_TABLES]
+    if unknown or not tables:
+        raise InvalidParam('tables must be a list of: %s' % ', '.join(SYNC_TABLES))
+    return tables
+
+
+def sync_query(args):
+    # Returns (query, params, full) for the /sync request in `args`; shared
+    # with asgi_app. Everything is read by one statement, so the rows, the
+    # tombstones and the next token all come from the same snapshot.
+    # Transactions that snapshot could not see all have ids >= its xmin, so
+    # they are picked up next time.
+    since = args.get('since')
+    if since is not None and not since.isdigit():
+        raise InvalidParam('since must be a token returned by /sync')
+    tables = _sync_tables(args.get('tables'))
+
+    changed_since = '' if since is None else ' WHERE change_xid >= %s::text::xid8'
+    parts = []
+    params = []
+    for table in tables:
+        key = SYNC_TABLES[table]
+        deleted = "'[]'::json" if since is None else (
+            "(SELECT coalesce(json_agg(row_key ORDER BY row_key), '[]') FROM sync_tombstones"
+            " WHERE table_name = '%s' AND change_xid >= %%s::text::xid8)" % table
+        )
+        parts.append(
+            "'%(table)s', json_build_object("
+            "'changed', (SELECT coalesce(json_agg(json_build_object("
+            "'key', %(key)s::text, 'updated_at', updated_at, 'data', data) ORDER BY %(key)s), '[]')"
+            " FROM %(table)s%(where)s),"
+            " 'deleted', %(deleted)s)" % {'table': table, 'key': key, 'where': changed_since, 'deleted': deleted}
+        )
+        if since is not None:
+            params += [since, since]
+    query = 'SELECT pg_snapshot_xmin(pg_current_snapshot())::text, json_build_object(%s)::text' % ', '.join(parts)
+    return query, params, since is None
+
+
+def sync_body(token, full, changes):
+    return '{"token":%s,"full":%s,"tables":%s}' % (json.dumps(token), json.dumps(full), changes)
+
+
+@app.route('/sync', methods=['GET'])
+@versioned(*SYNC_TABLES)
+def sync():
+    query, params, full = sync_query(request.args)
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(query, params)
+    token, changes = cur.fetchone()
+    cur.close()
+    return Response(sync_body(token, full, changes), mimetype='application/json')
+
+# ---------------- CHANGE FEED ----------------
+
+# GET /changes[?tables=jobs,stock] is a Server-Sent Events stream of row
+# changes ({"table", "op", "key", "serial_no"}, migrations/013) so screens
+# can refresh when someone else writes instead of polling. The worker's one
+# listener connection fans each event out to every subscriber; no stream
+# holds a pooled connection. A "resync" event means events may have been
+# missed (listener reconnect, or a client too slow to keep up): call /sync.
+# Here each open stream holds a server thread for as long as it is open, so
+# the cap must stay well below the worker's thread count or the streams
+# starve every other request; past it /changes answers 503 + Retry-After.
+# asgi_app.py streams without threads and uses the larger async cap, so
+# deployments with many tablets should route /changes there.
+CHANGE_FEED_WSGI_MAX_SUBSCRIBERS = int(os.getenv('CHANGE_FEED_WSGI_MAX_SUBSCRIBERS', 4))
+CHANGE_FEED_MAX_SUBSCRIBERS = int(os.getenv('CHANGE_FEED_MAX_SUBSCRIBERS', 100))  # asgi_app.py
+CHANGE_FEED_QUEUE_SIZE = int(os.getenv('CHANGE_FEED_QUEUE_SIZE', 1000))
+CHANGE_FEED_HEARTBEAT = float(os.getenv('CHANGE_FEED_HEARTBEAT', 15))
+
+RESYNC_EVENT = 'event: resync\ndata: {}\n\n'
+
+
+class FeedFull(Exception):
+    pass
+
+@app.errorhandler(FeedFull)
+def handle_feed_full(e):
+    resp = jsonify({'error': str(e)})
+    resp.headers['Retry-After'] = '30'
+    return resp, 503
+
+
+class ChangeFeed:
+    queue_class = queue.Queue  # asgi_app.py uses asyncio.Queue
+
+    def __init__(self, max_subscribers, queue_size):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._subscribers = {}  # queue -> set of tables, or None for all
+        self._lock = threading.Lock()
+        self.listening = False
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, tables=None):
+        q = self.queue_class(self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise FeedFull('too many open change streams')
+            self._subscribers[q] = tables
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.pop(q, None)
+
+    def _put(self, q, event):
+        # Only the listener adds to the queues, so full() can't go stale
+        if q.full():
+            # Too far behind: drop its backlog and have it resync instead
+            self.dropped += 1
+            while not q.empty():
+                try:
+                    q.get_nowait()
+                except queue.Empty:  # the reader got there first
+                    break
+            event = RESYNC_EVENT
+        q.put_nowait(event)
+
+    def publish(self, payload):
+        # Encoded once, whatever the number of subscribers
+        table = json.loads(payload).get('table')
+        event = 'event: change\ndata: %s\n\n' % payload
+        with self._lock:
+            self.published += 1
+            for q, tables in self._subscribers.items():
+                if tables is None or table in tables:
+                    self._put(q, event)
+
+    def resync(self):
+        with self._lock:
+            for q in self._subscribers:
+                self._put(q, RESYNC_EVENT)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'listening': self.listening,
+                'subscribers': len(self._subscribers),
+                'max_subscribers': self.max_subscribers,
+                'published': self.published,
+                'dropped': self.dropped,
+            }
+
+
+change_feed = ChangeFeed(CHANGE_FEED_WSGI_MAX_SUBSCRIBERS, CHANGE_FEED_QUEUE_SIZE)
+
+@app.route('/changes', methods=['GET'])
+def change_stream():
+    tables = request.args.get('tables')
+    tables = None if tables is None else set(_sync_tables(tables))
+    ensure_listener()
+    q = change_feed.subscribe(tables)
+
+    def generate():
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                yield q.get(timeout=CHANGE_FEED_HEARTBEAT)
+            except queue.Empty:
+                yield ': keep-alive\n\n'  # also how a closed client is noticed
+
+    resp = Response(generate(), mimetype='text/event-stream')
+    # Runs when the server closes the stream, even one that never started
+    resp.call_on_close(lambda: change_feed.unsubscribe(q))
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'  # nginx: pass events through unbuffered
+    return resp
+
+# ---------------- SEARCH ----------------
+
+# Type-ahead for the pickers, so they stop downloading whole lists:
+#   /search/jobs?q=&limit=&open=true    serial no, purchaser, reference, type, kVA
+#   /search/materials?q=&limit=         type and subtype
+# Ranked prefix matches first, then substring matches, then by trigram word
+# similarity, so a typo still finds the row (migrations/014). Queries too
+# short to have a trigram match prefixes only. Without q the first rows in
+# order come back, as the picker's initial list.
+SEARCH_DEFAULT_LIMIT = int(os.getenv('SEARCH_DEFAULT_LIMIT', 20))
+SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', 100))
+SEARCH_MIN_TRIGRAM = 3
+# The indexed expressions (migrations/014); queries must use them verbatim
+JOB_SEARCH_TEXT = 'job_search_text(serial_no, data)'
+MATERIAL_SEARCH_TEXT = 'material_search_text(type, subtype)'
+
+
+def _like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_query(args, select, text_col, prefix_col, order_col, where=None):
+    # Returns (query, params) for the search in `args`; shared with asgi_app.
+    # `select` returns the item JSON; text_col has a trigram index and
+    # prefix_col a text_pattern_ops one
+    q = ' '.join(args.get('q', '').lower().split())
+    try:
+        limit = int(args.get('limit', SEARCH_DEFAULT_LIMIT))
+    except ValueError:
+        raise InvalidParam('limit must be an integer')
+    if limit < 1:
+        raise InvalidParam('limit must be positive')
+
+    prefix = _like_escape(q) + '%'
+    contains = '%' + _like_escape(q) + '%'
+    conditions = [where] if where else []
+    params = []
+    order = order_col
+    if len(q) >= SEARCH_MIN_TRIGRAM:
+        conditions.append(
+            '(' + prefix_col + ' LIKE %s OR ' + text_col + ' LIKE %s OR ' + text_col + ' %%> %s)'
+        )
+        order = (
+            prefix_col + ' LIKE %s DESC, ' + text_col + ' LIKE %s DESC,'
+            ' word_similarity(%s, ' + text_col + ') DESC, ' + order_col
+        )
+        params = [prefix, contains, q, prefix, contains, q]
+    elif q:
+        conditions.append(prefix_col + ' LIKE %s')
+        params = [prefix]
+
+    query = select
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY ' + order + ' LIMIT %s'
+    return query, params + [min(limit, SEARCH_MAX_LIMIT)]
+
+
+def search_rows(select, text_col, prefix_col, order_col, where=None):
+    query, params = search_query(request.args, select, text_col, prefix_col, order_col, where)
+    cur = get_db_connection().cursor()
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    cur.close()
+    return Response('[' + ','.join(row[0] for row in rows) + ']', mimetype='application/json')
+
+
+@app.route('/search/jobs', methods=['GET'])
+@versioned('jobs')
+def search_jobs():
+    open_only = request.args.get('open', 'false').lower() == 'true'
+    return search_rows(
+        'SELECT data FROM jobs', JOB_SEARCH_TEXT, 'lower(serial_no)', 'serial_no',
+        where='NOT is_final' if open_only else None
+    )
+
+
+@app.route('/search/materials', methods=['GET'])
+@cached('materials')
+@versioned('materials')
+def search_materials():
+    return search_rows('SELECT data FROM materials', MATERIAL_SEARCH_TEXT, MATERIAL_SEARCH_TEXT, MATERIAL_SEARCH_TEXT)
+
 # -------------- HEALTH CHECK ----------------
 
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'OK'})
 
+@app.route('/health/pool', methods=['GET'])
+def pool_stats():
+    return jsonify(get_pool().stats())
+
+@app.route('/health/cache', methods=['GET'])
+def cache_stats():
+    return jsonify(reference_cache.stats())
+
+@app.route('/health/changes', methods=['GET'])
+def change_feed_stats():
+    return jsonify(change_feed.stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(request_metrics.render(get_pool().stats()), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
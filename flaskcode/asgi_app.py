@@ -0,0 +1,1286 @@
+# Async deployment of the API in app.py: same URLs, payloads and status
+# codes, served by Quart on an asyncpg pool so one process can hold hundreds
+# of concurrent tablet connections while they wait on Postgres.
+#
+#   hypercorn asgi_app:app --bind 0.0.0.0:5000
+#
+# Configuration (DB_*, pool, paging, cache, bcrypt, session, metrics settings) is
+# shared with app.py. Requires the same migrations.
+import asyncio
+import contextvars
+import itertools
+import json
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import wraps
+
+import asyncpg
+import bcrypt
+from itsdangerous import BadSignature, SignatureExpired
+from quart import Quart, Response, g, has_app_context, jsonify, make_response, request
+from quart.wrappers.response import DataBody, IterableBody
+from quart_cors import cors
+from werkzeug.exceptions import HTTPException
+
+from app import (
+    BATCH_ENDPOINTS, BATCH_MAX_REQUESTS, BCRYPT_MAX_PENDING, BCRYPT_TIMEOUT, BCRYPT_WORKERS, CACHE_TTL, CACHE_MAX_ENTRIES,
+    CHANGE_FEED_HEARTBEAT, CHANGE_FEED_MAX_SUBSCRIBERS, CHANGE_FEED_QUEUE_SIZE,
+    COMPRESS_BROTLI_QUALITY, COMPRESS_GZIP_LEVEL, COMPRESS_MIN_SIZE, COMPRESSIBLE_MIMETYPES,
+    DASHBOARD_CACHE_TTL, DASHBOARD_SUMMARY,
+    DB_HOST, DB_NAME, DB_PASS, DB_POOL_MAX, DB_POOL_MIN, DB_POOL_TIMEOUT, DB_PORT, DB_USER,
+    DB_POOL_HEALTH_CHECK_INTERVAL, JOB_SEARCH_TEXT, MATERIAL_SEARCH_TEXT, MAX_COMPRESSED_BODY,
+    METRICS_ENABLED, REPORT_LISTING, SESSION_TOKEN_TTL, SLOW_REQUEST_MS, STREAM_ITERSIZE, SYNC_TABLES,
+    TABLE_VERSIONS_DAY,
+    ChangeFeed, FeedFull, HashingBusy, InvalidParam, Metrics, Page, PoolTimeout, QueryStats, ReferenceCache,
+    _accepted_encoding, _batch_part, _compress_chunks, _compressor, _decompress, _parse_batch_item,
+    _password_fingerprint, _session_signer, _sync_tables, accepts_compressed_body, brotli, cache_log, compression,
+    dashboard_days, finish_request_metrics, issue_session_token, matching_etag, parse_float, report_row,
+    search_query, sync_body, sync_query, version_etag,
+)
+
+app = Quart(__name__)
+app = cors(app)
+
+_pool = None
+_pool_timeouts = 0
+
+
+def numbered(query):
+    # The SQL below keeps app.py's %s placeholders (and %% for a literal %);
+    # asyncpg wants $1, $2, ...
+    counter = itertools.count(1)
+    return re.sub(r'%[s%]', lambda m: '%' if m.group() == '%%' else '$%d' % next(counter), query)
+
+
+class AcquireTimeout:
+    # pool.acquire() with the checkout timeout mapped to PoolTimeout (503)
+    def __init__(self):
+        self._ctx = _pool.acquire(timeout=DB_POOL_TIMEOUT)
+
+    async def __aenter__(self):
+        try:
+            return await self._ctx.__aenter__()
+        except asyncio.TimeoutError:
+            global _pool_timeouts
+            _pool_timeouts += 1
+            raise PoolTimeout('No database connection available within %.1fs' % DB_POOL_TIMEOUT)
+
+    async def __aexit__(self, *exc):
+        return await self._ctx.__aexit__(*exc)
+
+
+# Set while /batch runs, so every sub-request reads the batch's snapshot
+_batch_conn = contextvars.ContextVar('batch_conn', default=None)
+
+
+@asynccontextmanager
+async def _borrowed(conn):
+    yield conn
+
+
+def db():
+    conn = _batch_conn.get()
+    return AcquireTimeout() if conn is None else _borrowed(conn)
+
+
+def _query_stats():
+    return g.get('query_stats') if has_app_context() else None
+
+
+def _status_rows(status):
+    # 'UPDATE 3', 'INSERT 0 5' -> rows affected
+    count = status.rsplit(' ', 1)[-1] if status else ''
+    return int(count) if count.isdigit() else 0
+
+
+class InstrumentedConnection(asyncpg.Connection):
+    # asyncpg counterpart of app.InstrumentedConnection: times each query into
+    # the request's QueryStats. Rows read through cursors are not counted.
+    _resetting = False
+
+    async def reset(self, *, timeout=None):
+        # The pool's reset query on release is not the request's work
+        self._resetting = True
+        try:
+            await super().reset(timeout=timeout)
+        finally:
+            self._resetting = False
+
+    async def _timed(self, method, rows, query, args, kwargs):
+        stats = _query_stats()
+        if stats is None or self._resetting:
+            return await method(query, *args, **kwargs)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = await method(query, *args, **kwargs)
+            return result
+        finally:
+            stats.add(time.perf_counter() - start, rows(result) if result is not None else 0, query)
+
+    async def execute(self, query, *args, **kwargs):
+        return await self._timed(super().execute, _status_rows, query, args, kwargs)
+
+    async def executemany(self, query, *args, **kwargs):
+        return await self._timed(super().executemany, lambda result: 0, query, args, kwargs)
+
+    async def fetch(self, query, *args, **kwargs):
+        return await self._timed(super().fetch, len, query, args, kwargs)
+
+    async def fetchrow(self, query, *args, **kwargs):
+        return await self._timed(super().fetchrow, lambda row: 1, query, args, kwargs)
+
+    async def fetchval(self, query, *args, **kwargs):
+        return await self._timed(super().fetchval, lambda value: 1, query, args, kwargs)
+
+
+@app.before_serving
+async def open_pool():
+    global _pool
+    _pool = await asyncpg.create_pool(
+        host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASS, port=int(DB_PORT),
+        min_size=DB_POOL_MIN, max_size=DB_POOL_MAX,
+        max_inactive_connection_lifetime=DB_POOL_HEALTH_CHECK_INTERVAL * 10,
+        connection_class=InstrumentedConnection,
+    )
+    app.add_background_task(_listen_for_invalidations)
+
+
+@app.after_serving
+async def close_pool():
+    await _pool.close()
+
+
+@app.errorhandler(PoolTimeout)
+async def handle_pool_timeout(e):
+    return jsonify({'error': str(e)}), 503
+
+
+@app.errorhandler(InvalidParam)
+async def handle_invalid_param(e):
+    return jsonify({'error': str(e)}), 400
+
+
+@app.errorhandler(HashingBusy)
+async def handle_hashing_busy(e):
+    resp = jsonify({'error': str(e)})
+    resp.headers['Retry-After'] = '1'
+    return resp, 503
+
+
+@app.errorhandler(FeedFull)
+async def handle_feed_full(e):
+    resp = jsonify({'error': str(e)})
+    resp.headers['Retry-After'] = '30'
+    return resp, 503
+
+# ---------------- METRICS ----------------
+
+request_metrics = Metrics()
+
+@app.before_request
+async def start_request_metrics():
+    if METRICS_ENABLED or SLOW_REQUEST_MS > 0:
+        g.request_started = time.perf_counter()
+        g.query_stats = QueryStats(keep_sql=SLOW_REQUEST_MS > 0)
+
+@app.after_request
+async def record_request_metrics(response):
+    stats = g.pop('query_stats', None)
+    if stats is None:
+        return response
+    finish_request_metrics(
+        request_metrics, request, response.status_code, time.perf_counter() - g.request_started,
+        response.content_length or 0 if isinstance(response.response, DataBody) else 0, stats
+    )
+    return response
+
+# ---------------- COMPRESSION ----------------
+
+# Same rules as app.py's COMPRESSION section, including the per-encoding
+# ETags that matching_etag() accepts.
+
+def _view_attr(name, default=None):
+    return getattr(app.view_functions.get(request.endpoint), name, default)
+
+async def _compress_body(body, encoding, level):
+    # _compress_chunks for a streamed Quart body
+    compress, finish = _compressor(encoding, level)
+    async with body:
+        async for chunk in body:
+            out = compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            if out:
+                yield out
+    yield finish()
+
+@app.before_request
+async def decompress_request_body():
+    encoding = request.headers.get('Content-Encoding', 'identity').strip().lower()
+    if encoding == 'identity' or not _view_attr('accepts_compressed_body', False):
+        return None
+    if encoding not in ('gzip', 'br') or (encoding == 'br' and brotli is None):
+        return jsonify({'error': 'Unsupported Content-Encoding %s' % encoding}), 415
+    if (request.content_length or 0) > MAX_COMPRESSED_BODY:
+        return jsonify({'error': 'Request body too large'}), 413
+    data = bytearray()
+    async for chunk in request.body:
+        data += chunk
+        if len(data) > MAX_COMPRESSED_BODY:
+            return jsonify({'error': 'Request body too large'}), 413
+    try:
+        # Inflating takes a while for big bodies; keep it off the event loop
+        body = await asyncio.to_thread(_decompress, bytes(data), encoding)
+    except Exception:
+        return jsonify({'error': 'Request body is not valid %s' % encoding}), 400
+    if body is None:
+        return jsonify({'error': 'Request body too large'}), 413
+    # Swap in the inflated body before the view reads it
+    request.body = request.body_class(len(body), None)
+    request.body.append(body)
+    request.body.set_complete()
+    request.headers['Content-Length'] = str(len(body))
+    del request.headers['Content-Encoding']
+    return None
+
+@app.after_request
+async def compress_response(response):
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or not isinstance(response.response, (DataBody, IterableBody))
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _accepted_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    settings = _view_attr('compression', {})
+    level = settings.get(encoding)
+    if level is None:
+        level = COMPRESS_BROTLI_QUALITY if encoding == 'br' else COMPRESS_GZIP_LEVEL
+    if isinstance(response.response, IterableBody):
+        response.response = IterableBody(_compress_body(response.response, encoding, level))
+    else:
+        data = await response.get_data()
+        if len(data) < (settings.get('min_size') or COMPRESS_MIN_SIZE):
+            return response
+        response.set_data(b''.join(_compress_chunks((data,), encoding, level)))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag('%s-%s' % (etag, encoding), weak)
+    return response
+
+# ---------------- PAGINATION ----------------
+
+class AsyncPage(Page):
+    # Same query building, projection and encoding as app.Page, run on asyncpg
+    response_class = Response
+
+    async def run(self, select, order_col, **kwargs):
+        if self.stream:
+            return self.stream_response(None, select, order_col, **kwargs)
+        async with db() as conn:
+            rows = await self.fetch(conn, select, order_col, **kwargs)
+        return self.response(rows)
+
+    async def fetch(self, conn, select, order_col, where=None, params=(), descending=False, after_type=str):
+        query, params = self._query(select, order_col, where, params, descending, after_type)
+        if self.limit is None:
+            return await conn.fetch(numbered(query), *params)
+
+        rows = await conn.fetch(numbered(query + ' LIMIT %s'), *params, self.limit + 1)
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            self.next = rows[-1][0]
+        return rows
+
+    def stream_response(self, conn, select, order_col, where=None, params=(),
+                        descending=False, after_type=str):
+        query, params = self._query(select, order_col, where, params, descending, after_type)
+
+        async def generate():
+            async with db() as conn:
+                async with conn.transaction():
+                    yield '['
+                    chunk = []
+                    first = True
+                    async for row in conn.cursor(numbered(query), *params, prefetch=STREAM_ITERSIZE):
+                        item = self.encode(row)
+                        chunk.append(item if first else ',' + item)
+                        first = False
+                        if len(chunk) >= STREAM_ITERSIZE:
+                            yield ''.join(chunk)
+                            chunk = []
+                    chunk.append(']')
+                    yield ''.join(chunk)
+
+        return Response(generate(), mimetype='application/json')
+
+
+def page_from_request():
+    return AsyncPage.from_request(request.args)
+
+# ---------------- ETAGS ----------------
+
+def versioned(*tables, by_day=False):
+    def decorator(f):
+        @wraps(f)
+        async def wrapper(*args, **kwargs):
+            async with db() as conn:
+                versions = dict(await conn.fetch(
+                    'SELECT table_name, version FROM table_versions WHERE table_name = ANY($1)'
+                    + (TABLE_VERSIONS_DAY if by_day else ''),
+                    list(tables)
+                ))
+            etag = version_etag(tables, versions, by_day)
+            matched = matching_etag(etag, request.if_none_match)
+            if matched:
+                resp = await make_response('', 304)
+                resp.set_etag(matched)
+                return resp
+            resp = await make_response(await f(*args, **kwargs))
+            if resp.status_code == 200:
+                resp.set_etag(etag)
+            return resp
+        return wrapper
+    return decorator
+
+# ---------------- REFERENCE DATA CACHE ----------------
+
+reference_cache = ReferenceCache(CACHE_TTL, CACHE_MAX_ENTRIES)
+
+
+async def _listen_for_invalidations():
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(
+                host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASS, port=int(DB_PORT)
+            )
+            lost = asyncio.Event()
+            conn.add_termination_listener(lambda c: lost.set())
+            await conn.add_listener('cache_invalidation', lambda c, pid, channel, payload: reference_cache.invalidate(payload))
+            await conn.add_listener('change_feed', lambda c, pid, channel, payload: change_feed.publish(payload))
+            reference_cache.clear()
+            reference_cache.listening = True
+            change_feed.resync()
+            change_feed.listening = True
+            await lost.wait()
+        except Exception:
+            cache_log.warning('listener disconnected, retrying in 5s', exc_info=True)
+        finally:
+            reference_cache.listening = False
+            reference_cache.clear()
+            change_feed.listening = False
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        await asyncio.sleep(5)
+
+
+def cached(table, cache=reference_cache):
+    def decorator(f):
+        @wraps(f)
+        async def wrapper(*args, **kwargs):
+            if not cache.enabled() or _batch_conn.get() is not None:
+                return await f(*args, **kwargs)  # in /batch: read the snapshot
+
+            path = request.full_path
+            entry = cache.get(table, path)
+            if entry is None:
+                generation = cache.generation(table)
+                resp = await make_response(await f(*args, **kwargs))
+                if resp.status_code == 200 and isinstance(resp.response, DataBody):
+                    cache.put(
+                        table, path, (await resp.get_data(), resp.mimetype, resp.get_etag()[0]), generation
+                    )
+                return resp
+
+            body, mimetype, etag = entry
+            matched = matching_etag(etag, request.if_none_match) if etag else None
+            if matched:
+                resp = await make_response('', 304)
+                resp.set_etag(matched)
+            else:
+                resp = Response(body, mimetype=mimetype)
+                if etag:
+                    resp.set_etag(etag)
+            return resp
+        return wrapper
+    return decorator
+
+# ---------------- PASSWORD HASHING ----------------
+
+_bcrypt_executor = ThreadPoolExecutor(BCRYPT_WORKERS, thread_name_prefix='bcrypt')
+_bcrypt_pending = 0
+
+
+def _release_bcrypt_slot(future):
+    global _bcrypt_pending
+    _bcrypt_pending -= 1
+
+
+async def run_bcrypt(fn, *args):
+    # Same admission control as app.run_bcrypt; the slot is held until the
+    # hash itself finishes, even if the request has timed out waiting for it
+    global _bcrypt_pending
+    if _bcrypt_pending >= BCRYPT_MAX_PENDING:
+        raise HashingBusy('Too many logins in progress, try again shortly')
+    _bcrypt_pending += 1
+    future = asyncio.get_running_loop().run_in_executor(_bcrypt_executor, fn, *args)
+    future.add_done_callback(_release_bcrypt_slot)
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), BCRYPT_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HashingBusy('Password check timed out, try again shortly')
+
+# ---------------- USERS ----------------
+
+@app.route('/users/login', methods=['POST'])
+async def login():
+    data = await request.get_json()
+    username = data.get('username')
+    password = data.get('password')
+
+    async with db() as conn:
+        user = await conn.fetchrow('SELECT * FROM users WHERE username = $1', username)
+
+    if not user:
+        return jsonify({'error': 'Invalid username or password'}), 401
+
+    hashed_password = user['password'].encode('utf-8')
+    if await run_bcrypt(bcrypt.checkpw, password.encode('utf-8'), hashed_password):
+        user_dict = dict(user)
+        user_dict.pop('password')  # Remove password hash before sending
+        user_dict['token'] = issue_session_token(user['username'], user['password'])
+        return jsonify(user_dict)
+    else:
+        return jsonify({'error': 'Invalid username or password'}), 401
+
+@app.route('/users/session', methods=['POST'])
+async def resume_session():
+    if _session_signer is None:
+        return jsonify({'error': 'Session tokens are not configured'}), 503
+    token = ((await request.get_json()) or {}).get('token')
+    if not token:
+        return jsonify({'error': 'token is required'}), 400
+    try:
+        claims = _session_signer.loads(token, max_age=SESSION_TOKEN_TTL)
+    except SignatureExpired:
+        return jsonify({'error': 'Session expired'}), 401
+    except BadSignature:
+        return jsonify({'error': 'Invalid session'}), 401
+
+    async with db() as conn:
+        user = await conn.fetchrow('SELECT * FROM users WHERE username = $1', claims.get('u'))
+
+    if not user or _password_fingerprint(user['password']) != claims.get('p'):
+        return jsonify({'error': 'Invalid session'}), 401
+
+    user_dict = dict(user)
+    user_dict.pop('password')
+    user_dict['token'] = issue_session_token(user['username'], user['password'])
+    return jsonify(user_dict)
+
+@app.route('/users', methods=['POST'])
+async def add_user():
+    data = await request.get_json()
+    username = data.get('username')
+    password = data.get('password')
+    role = data.get('role')
+
+    if not all([username, password, role]):
+        return jsonify({'error': 'Missing fields'}), 400
+
+    hashed = await run_bcrypt(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt())
+
+    try:
+        async with db() as conn:
+            await conn.execute(
+                '''
+                INSERT INTO users (username, password, role)
+                VALUES ($1, $2, $3)
+                ON CONFLICT (username) DO UPDATE SET password = EXCLUDED.password, role = EXCLUDED.role
+                ''',
+                username, hashed.decode('utf-8'), role
+            )
+        reference_cache.invalidate('users')
+        return jsonify({'message': 'User added/updated'}), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/users/reset_password', methods=['PUT'])
+async def reset_password():
+    data = await request.get_json()
+    username = data.get('username')
+    new_password = data.get('newPassword')
+
+    if not all([username, new_password]):
+        return jsonify({'error': 'Missing fields'}), 400
+
+    hashed = await run_bcrypt(bcrypt.hashpw, new_password.encode('utf-8'), bcrypt.gensalt())
+
+    try:
+        async with db() as conn:
+            status = await conn.execute(
+                'UPDATE users SET password = $1 WHERE username = $2',
+                hashed.decode('utf-8'), username
+            )
+        if status == 'UPDATE 0':
+            return jsonify({'error': 'User not found'}), 404
+        return jsonify({'message': 'Password updated'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/users/<username>', methods=['DELETE'])
+async def delete_user(username):
+    try:
+        async with db() as conn:
+            status = await conn.execute('DELETE FROM users WHERE username = $1', username)
+        if status == 'DELETE 0':
+            return jsonify({'error': 'User not found'}), 404
+        reference_cache.invalidate('users')
+        return jsonify({'message': 'User deleted'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/users', methods=['GET'])
+@cached('users')
+@versioned('users')
+async def get_users():
+    async with db() as conn:
+        users = await conn.fetch('SELECT username, role FROM users ORDER BY username')
+
+    users_list = [{'username': u['username'], 'role': u['role']} for u in users]
+    return jsonify(users_list)
+
+# ---------------- REPORTS ----------------
+
+@app.route('/reports', methods=['POST'])
+@accepts_compressed_body
+async def save_report():
+    data = (await request.get_json()).get('data')
+    if not data:
+        return jsonify({'error': 'Missing report data'}), 400
+
+    try:
+        row = report_row(data)
+        async with db() as conn:
+            report_id = await conn.fetchval(
+                '''
+                INSERT INTO reports (serial_no, report_type, saved_by, remark, saved_at, created_at, size, body)
+                VALUES ($1, $2, $3, $4, $5, coalesce($6, now()), $7, $8)
+                RETURNING id
+                ''',
+                row['serial_no'], row['report_type'], row['saved_by'], row['remark'],
+                row['saved_at'], row['created_at'], row['size'], row['body']
+            )
+        return jsonify({'message': 'Report saved', 'id': report_id}), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/reports', methods=['GET'])
+@compression(gzip=9, br=6)
+@versioned('reports')
+async def get_reports():
+    page = page_from_request()
+    serial_no = request.args.get('serialNo')
+    return await page.run(
+        REPORT_LISTING, 'id', descending=True, after_type=int,
+        where='serial_no = %s' if serial_no is not None else None,
+        params=(serial_no,) if serial_no is not None else ()
+    )
+
+@app.route('/reports/<int:report_id>', methods=['GET'])
+async def get_report(report_id):
+    etag = 'report.%d' % report_id
+    matched = matching_etag(etag, request.if_none_match)
+    if matched:
+        resp = await make_response('', 304)
+        resp.set_etag(matched)
+        return resp
+
+    async with db() as conn:
+        row = await conn.fetchrow('SELECT body, data FROM reports WHERE id = $1', report_id)
+    if not row:
+        return jsonify({'error': 'Report not found'}), 404
+
+    if row['body'] is None:
+        # Not yet moved by migrations/016; compress_response takes it from here
+        resp = Response(row['data'], mimetype='application/json')
+        resp.set_etag(etag)
+        return resp
+    if request.accept_encodings['gzip']:
+        resp = Response(row['body'], mimetype='application/json')
+        resp.headers['Content-Encoding'] = 'gzip'
+        resp.set_etag(etag + '-gzip')
+    else:
+        resp = Response(_decompress(row['body'], 'gzip'), mimetype='application/json')
+        resp.set_etag(etag)
+    resp.vary.add('Accept-Encoding')
+    return resp
+
+# ---------------- JOBS ----------------
+
+@app.route('/jobs', methods=['POST'])
+async def save_job():
+    job = await request.get_json()
+    if not job:
+        return jsonify({'error': 'Missing job data'}), 400
+
+    serialNo = job.get('serialNo')
+    if not serialNo:
+        return jsonify({'error': 'serialNo is required'}), 401
+
+    try:
+        async with db() as conn:
+            await conn.execute(
+                '''
+                INSERT INTO jobs (serial_no, data) VALUES ($1, $2)
+                ON CONFLICT (serial_no) DO UPDATE SET data = EXCLUDED.data
+                ''',
+                serialNo, json.dumps(job)
+            )
+        return jsonify({'message': 'Job saved/updated'}), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs', methods=['GET'])
+@versioned('jobs')
+async def get_jobs():
+    page = page_from_request()
+    return await page.run('SELECT serial_no, data FROM jobs', 'serial_no')
+
+@app.route('/jobs/open', methods=['GET'])
+@versioned('jobs')
+async def get_open_jobs():
+    page = page_from_request()
+    return await page.run('SELECT serial_no, data FROM jobs', 'serial_no', where='NOT is_final')
+
+# ---------------- MATERIALS ----------------
+
+@app.route('/materials', methods=['POST'])
+async def add_material():
+    data = await request.get_json()
+    if not data:
+        return jsonify({'error': 'Missing material data'}), 400
+
+    material_id = str(uuid.uuid4())
+    m_type = data.get('type')
+    subtype = data.get('subtype')
+
+    if not m_type or not subtype:
+        return jsonify({'error': 'type and subtype are required'}), 400
+
+    try:
+        async with db() as conn:
+            await conn.execute(
+                '''
+                INSERT INTO materials (id, type, subtype, data)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (id) DO UPDATE SET data = EXCLUDED.data
+                ''',
+                material_id, m_type, subtype, json.dumps(data)
+            )
+        reference_cache.invalidate('materials')
+        return jsonify({'message': 'Material added/updated', 'id': material_id}), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/materials', methods=['GET'])
+@cached('materials')
+@versioned('materials')
+async def get_materials():
+    page = page_from_request()
+    return await page.run('SELECT id, data FROM materials', 'id')
+
+@app.route('/materials', methods=['DELETE'])
+async def delete_material():
+    data = await request.get_json()
+    m_type = data.get('type')
+    subtype = data.get('subtype')
+
+    if not m_type or not subtype:
+        return jsonify({'error': 'type and subtype required'}), 400
+
+    try:
+        async with db() as conn:
+            status = await conn.execute(
+                'DELETE FROM materials WHERE type = $1 AND subtype = $2', m_type, subtype
+            )
+        if status == 'DELETE 0':
+            return jsonify({'error': 'Material not found'}), 404
+        reference_cache.invalidate('materials')
+        return jsonify({'message': 'Material deleted'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ---------------- INCOMING MATERIALS ----------------
+
+@app.route('/incoming_materials', methods=['POST'])
+async def submit_material_incoming():
+    data = await request.get_json()
+    if not data:
+        return jsonify({'error': 'Missing incoming material data'}), 400
+
+    incoming_id = str(uuid.uuid4())
+    try:
+        async with db() as conn:
+            await conn.execute(
+                'INSERT INTO incoming_materials (id, data) VALUES ($1, $2)',
+                incoming_id, json.dumps(data)
+            )
+        return jsonify({'message': 'Incoming material submitted', 'id': incoming_id}), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/incoming_materials', methods=['GET'])
+@versioned('incoming_materials')
+async def get_material_incoming_entries():
+    page = page_from_request()
+    return await page.run(
+        "SELECT id, data || jsonb_build_object('id', id) FROM incoming_materials", 'id'
+    )
+
+@app.route('/incoming_materials/<entry_id>', methods=['DELETE'])
+async def delete_material_entry(entry_id):
+    try:
+        async with db() as conn:
+            status = await conn.execute('DELETE FROM incoming_materials WHERE id = $1', entry_id)
+        if status == 'DELETE 0':
+            return jsonify({'error': 'Entry not found'}), 404
+        return jsonify({'message': 'Entry deleted'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/incoming_materials/<entry_id>', methods=['GET'])
+@versioned('incoming_materials')
+async def get_material_entry_by_id(entry_id):
+    async with db() as conn:
+        data = await conn.fetchval('SELECT data FROM incoming_materials WHERE id = $1', entry_id)
+    if data is None:
+        return jsonify({'error': 'Entry not found'}), 404
+    return Response(data, mimetype='application/json')
+
+@app.route('/outgoing_materials', methods=['POST'])
+async def submit_material_outgoing():
+    data = await request.get_json()
+    if not data:
+        return jsonify({'error': 'Missing outgoing material data'}), 400
+
+    outgoing_id = str(uuid.uuid4())
+    try:
+        async with db() as conn:
+            await conn.execute(
+                'INSERT INTO outgoing_materials (id, data) VALUES ($1, $2)',
+                outgoing_id, json.dumps(data)
+            )
+        return jsonify({'message': 'Outgoing material submitted', 'id': outgoing_id}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/outgoing_materials', methods=['GET'])
+@versioned('outgoing_materials')
+async def get_material_outgoing_entries():
+    page = page_from_request()
+    return await page.run(
+        "SELECT id, data || jsonb_build_object('id', id) FROM outgoing_materials", 'id'
+    )
+
+# ---------------- STOCK ----------------
+
+@app.route('/stock/add', methods=['POST'])
+async def add_stock():
+    data = (await request.get_json()).get('data')
+    if not data:
+        return jsonify({'error': 'Missing stock data'}), 400
+
+    stock_id = str(uuid.uuid4())
+    job_specific = data.get('jobSpecific', False)
+    serial_no = data.get('serialNo', None)
+    m_type = data.get('type', None)
+    subtype = data.get('subtype', None)
+
+    key = f"{m_type} - {subtype}"
+    if job_specific and serial_no:
+        key = f"{key} - {serial_no}"
+
+    try:
+        async with db() as conn:
+            await conn.execute(
+                'INSERT INTO stock (id, key, data) VALUES ($1, $2, $3)',
+                stock_id, key, json.dumps(data)
+            )
+        return jsonify({'message': 'Stock Added'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/stock/delete', methods=['POST'])
+async def delete_stock_entry():
+    try:
+        payload = (await request.get_json()).get('data')
+        m_type = payload.get('type')
+        subtype = payload.get('subtype')
+        serial_no = payload.get('serialNo', None)
+        is_job_specific = payload.get('jobSpecific')
+
+        if not m_type or not subtype:
+            return jsonify({'error': 'Missing type or subtype'}), 401
+
+        key = f"{m_type} - {subtype}"
+        if is_job_specific and serial_no:
+            key = f"{key} - {serial_no}"
+
+        invoice = payload.get('invoice')
+
+        if not key or not invoice:
+            return jsonify({'error': 'Missing key or invoice'}), 400
+
+        async with db() as conn:
+            status = await conn.execute(
+                "DELETE FROM stock WHERE key = $1 AND (data->>'invoice') = $2", key, invoice
+            )
+        if status == 'DELETE 0':
+            return jsonify({'error': 'No matching record found'}), 404
+
+        return jsonify({'message': 'Entry deleted successfully'}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/stock/update', methods=['POST'])
+async def update_stock():
+    body = await request.get_json()
+    data = body.get('data')
+    issue_quantity = body.get('quantity')
+    if not data or issue_quantity is None:
+        return jsonify({'error': 'Missing stock data or quantity'}), 400
+
+    material = data.get('material')
+    if not material:
+        return jsonify({'error': 'material field required'}), 401
+
+    job_specific = data.get('jobSpecific', False)
+    serial_no = data.get('serialNo', None)
+    invoice = data.get('invoice', None)
+
+    key = material
+    if job_specific and serial_no:
+        key = f"{material} - {serial_no}"
+
+    try:
+        # Same single locking statement as app.update_stock
+        async with db() as conn:
+            issued = await conn.fetchval("""
+                WITH issued AS (
+                    UPDATE stock SET data = data || jsonb_build_object(
+                        'quantity', GREATEST(parse_numeric(data->>'quantity') - $3::numeric, 0),
+                        'indentQuantity', GREATEST(
+                            parse_numeric(data->>'indentQuantity')
+                                - CASE WHEN parse_numeric(data->>'indentQuantity') > 0 THEN $3::numeric ELSE 0 END,
+                            0)
+                    )
+                    WHERE key = $1 AND (data->>'invoice') = $2
+                    RETURNING key
+                ), indent AS (
+                    UPDATE indent_stock SET data = data || jsonb_build_object(
+                        'indentQuantity', GREATEST(parse_numeric(data->>'indentQuantity') - $3::numeric, 0)
+                    )
+                    WHERE key = $1
+                      AND parse_numeric(data->>'indentQuantity') > 0
+                      AND EXISTS (SELECT 1 FROM issued)
+                    RETURNING key
+                )
+                SELECT (SELECT count(*) FROM issued)
+            """, key, invoice, str(parse_float(issue_quantity)))
+        if not issued:
+            return jsonify({'error': 'No matching stock entry found'}), 404
+        return jsonify({'message': 'Stock updated'}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/indent_stock', methods=['GET'])
+@versioned('indent_stock')
+async def get_indent_stock():
+    async with db() as conn:
+        indent_stock = await conn.fetch('SELECT key, data FROM indent_stock')
+
+    return jsonify([list(row) for row in indent_stock])
+
+@app.route('/stock', methods=['GET'])
+@versioned('stock')
+async def get_stock():
+    is_job_specific = request.args.get('isJobSpecific', 'false').lower() == 'true'
+    page = page_from_request()
+
+    return await page.run(
+        "SELECT key, data || jsonb_build_object('key', key) FROM stock", 'key',
+        where='is_job_specific = %s', params=(is_job_specific,)
+    )
+
+@app.route('/stock/balance', methods=['GET'])
+@versioned('stock')
+async def get_stock_balance():
+    page = page_from_request()
+    conditions = []
+    params = []
+    material = request.args.get('material')
+    if material:
+        conditions.append('material = %s')
+        params.append(material)
+    serial_no = request.args.get('serialNo')
+    if serial_no:
+        conditions.append('serial_no = %s')
+        params.append(serial_no)
+
+    return await page.run(
+        """
+        SELECT stock_key, jsonb_build_object(
+            'key', stock_key, 'material', material, 'type', type, 'subtype', subtype,
+            'serialNo', serial_no, 'quantity', quantity, 'value', value
+        ) FROM stock_balances
+        """,
+        'stock_key', where=' AND '.join(conditions) or None, params=params
+    )
+
+@app.route('/stock/save', methods=['POST'])
+@accepts_compressed_body
+async def save_stock():
+    body = await request.get_json()
+    stock_data = body.get('stockData')
+    is_job_specific = body.get('isJobSpecific', False)
+
+    if not stock_data or not isinstance(stock_data, list):
+        return jsonify({'error': 'stockData must be a list'}), 400
+
+    rows = {}
+    rejected = []
+    for index, item in enumerate(stock_data):
+        if not isinstance(item, dict):
+            rejected.append({'index': index, 'error': 'item must be an object'})
+            continue
+        m_type = item.get('type')
+        subtype = item.get('subtype')
+        serial_no = item.get('serialNo', None)
+
+        if not m_type or not subtype:
+            rejected.append({'index': index, 'error': 'type and subtype are required'})
+            continue
+
+        key = f"{m_type} - {subtype}"
+        if is_job_specific and serial_no:
+            key = f"{key} - {serial_no}"
+        rows[key] = json.dumps(item)
+
+    try:
+        if rows:
+            keys, payloads = zip(*sorted(rows.items()))
+            async with db() as conn:
+                async with conn.transaction():
+                    await conn.execute("SET LOCAL gew.movement_kind = 'stocktake'")
+                    await conn.execute(
+                        '''
+                        INSERT INTO stock (key, data)
+                        SELECT k, d::jsonb FROM unnest($1::text[], $2::text[]) AS t(k, d)
+                        ON CONFLICT (key) DO UPDATE SET data = EXCLUDED.data
+                        ''',
+                        list(keys), list(payloads)
+                    )
+        return jsonify({'message': 'Stock saved', 'saved': len(rows), 'rejected': rejected}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ---------------- JOB INDENTS ----------------
+
+@app.route('/job_indents', methods=['POST'])
+@accepts_compressed_body
+async def submit_job_indent():
+    data = (await request.get_json()).get('data')
+
+    if not data or not isinstance(data, list):
+        return jsonify({'error': 'List of indents expected'}), 400
+
+    indent_totals = {}
+    jobids = []
+    payloads = []
+    for indent in data:
+        jobid = indent.get('serialNo')
+        matType = indent.get('type')
+        subType = indent.get('subtype')
+        job_specific = indent.get('jobSpecific') is True
+        indentquantity = indent.get('quantity')
+        if not jobid:
+            continue
+
+        if job_specific:
+            stock_key = f"{matType} - {subType} - {jobid}"
+        else:
+            stock_key = f"{matType} - {subType}"
+
+        if not isinstance(indentquantity, (int, float)):
+            indentquantity = parse_float(indentquantity)
+        indent_totals[stock_key] = indent_totals.get(stock_key, 0) + indentquantity
+        jobids.append(jobid)
+        payloads.append(json.dumps(indent))
+
+    if not jobids:
+        return jsonify({'message': 'Job indents submitted'}), 200
+
+    keys, quantities = zip(*sorted(indent_totals.items()))
+    try:
+        async with db() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    INSERT INTO indent_stock AS s (key, data)
+                    SELECT k, jsonb_build_object('indentQuantity', q)
+                    FROM unnest($1::text[], $2::numeric[]) AS t(k, q)
+                    ON CONFLICT (key) DO UPDATE SET data = COALESCE(s.data, '{}'::jsonb) || jsonb_build_object(
+                        'indentQuantity',
+                        parse_numeric(s.data->>'indentQuantity')
+                            + parse_numeric(EXCLUDED.data->>'indentQuantity')
+                    )
+                    """,
+                    list(keys), [str(q) for q in quantities]
+                )
+                await conn.execute(
+                    '''
+                    INSERT INTO job_indents (jobid, data)
+                    SELECT j, d::jsonb FROM unnest($1::text[], $2::text[]) AS t(j, d)
+                    ''',
+                    jobids, payloads
+                )
+        return jsonify({'message': 'Job indents submitted'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/job_indents/<jobid>', methods=['GET'])
+@versioned('job_indents')
+async def get_indents_for_job(jobid):
+    async with db() as conn:
+        rows = await conn.fetch('SELECT data FROM job_indents WHERE jobid = $1', jobid)
+
+    return Response('[' + ','.join(row[0] for row in rows) + ']', mimetype='application/json')
+
+@app.route('/job_indents', methods=['PUT'])
+async def update_job_indent():
+    data = await request.get_json()
+    if not data:
+        return jsonify({'error': 'Missing indent data'}), 400
+
+    jobid = data.get('serialNo')
+    item_type = data.get('type')
+    item_subtype = data.get('subtype')
+
+    if not jobid:
+        return jsonify({'error': 'serialNo is required'}), 401
+    if not item_type or not item_subtype:
+        return jsonify({'error': 'type and subtype are required'}), 402
+
+    try:
+        async with db() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow(
+                    '''
+                    SELECT id, data FROM job_indents
+                    WHERE jobid = $1
+                    AND data->>'type' = $2
+                    AND data->>'subtype' = $3
+                    ''',
+                    jobid, item_type, item_subtype
+                )
+                if not row:
+                    return jsonify({'error': 'Indent with matching jobid, type, and subtype not found'}), 400
+
+                matched_indent = json.loads(row['data'])
+                matched_indent['price'] = data.get('price')
+                matched_indent['issuedQty'] = data.get('issuedQty')
+                matched_indent['issuedValue'] = data.get('issuedValue')
+                matched_indent['jobSpecific'] = data.get('jobSpecific')
+                matched_indent['user_out'] = data.get('user_out')
+                matched_indent['out_time'] = data.get('out_time')
+
+                await conn.execute(
+                    'UPDATE job_indents SET data = $1 WHERE id = $2',
+                    json.dumps(matched_indent), row['id']
+                )
+
+        return jsonify({'message': 'Job indent updated'}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ---------------- BATCH ----------------
+
+async def _dispatch_get(path, args):
+    async with app.test_request_context(path, query_string=args):
+        if request.routing_exception is not None:
+            e = request.routing_exception
+            return getattr(e, 'code', 404), None, json.dumps({'error': e.description})
+        if request.url_rule.endpoint not in BATCH_ENDPOINTS:
+            return 400, None, json.dumps({'error': '%s cannot be batched' % path})
+        try:
+            try:
+                rv = await app.dispatch_request()
+            except Exception as e:
+                rv = await app.handle_user_exception(e)
+        except Exception as e:
+            return 500, None, json.dumps({'error': str(e)})
+        if isinstance(rv, HTTPException):
+            return rv.code, None, json.dumps({'error': rv.description})
+        resp = await app.make_response(rv)
+        if not isinstance(resp.response, DataBody) or resp.mimetype == 'text/event-stream':
+            return 500, None, json.dumps({'error': '%s streamed its response' % path})
+        body = await resp.get_data(as_text=True)
+        if resp.mimetype != 'application/json' or not body:
+            body = json.dumps(body)
+        return resp.status_code, resp.get_etag()[0], body
+
+
+@app.route('/batch', methods=['POST'])
+async def batch():
+    # Same contract as app.batch, minus its shared /stock scan
+    items = ((await request.get_json(silent=True)) or {}).get('requests')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'requests must be a non-empty list'}), 400
+    if len(items) > BATCH_MAX_REQUESTS:
+        return jsonify({'error': 'at most %d requests per batch' % BATCH_MAX_REQUESTS}), 400
+    subrequests = [_parse_batch_item(item) for item in items]
+
+    parts = []
+    async with db() as conn:
+        async with conn.transaction(isolation='repeatable_read', readonly=True):
+            await conn.execute('SELECT 1')  # takes the snapshot outside any savepoint
+            token = _batch_conn.set(conn)
+            try:
+                for i, (path, args) in enumerate(subrequests):
+                    savepoint = conn.transaction()
+                    await savepoint.start()
+                    status, etag, body = await _dispatch_get(path, args)
+                    parts.append(_batch_part(path, status, etag, body))
+                    if not conn.is_in_transaction():
+                        error = json.dumps({'error': 'batch snapshot lost after %s' % path})
+                        parts += [_batch_part(p, 500, None, error) for p, _ in subrequests[i + 1:]]
+                        break
+                    await savepoint.rollback()  # read only: nothing to keep
+            finally:
+                _batch_conn.reset(token)
+    return Response('{"responses":[' + ','.join(parts) + ']}', mimetype='application/json')
+
+# ---------------- DASHBOARD ----------------
+
+summary_cache = ReferenceCache(DASHBOARD_CACHE_TTL, 16, requires_listener=False)
+
+@app.route('/dashboard/summary', methods=['GET'])
+@cached('dashboard', cache=summary_cache)
+@versioned('jobs', 'stock', 'indent_stock', by_day=True)
+async def dashboard_summary():
+    days = dashboard_days(request.args)
+    async with db() as conn:
+        summary = await conn.fetchval(numbered(DASHBOARD_SUMMARY), days, days)
+    return Response(summary, mimetype='application/json')
+
+# ---------------- SYNC ----------------
+
+@app.route('/sync', methods=['GET'])
+@versioned(*SYNC_TABLES)
+async def sync():
+    query, params, full = sync_query(request.args)
+    async with db() as conn:
+        token, changes = await conn.fetchrow(numbered(query), *params)
+    return Response(sync_body(token, full, changes), mimetype='application/json')
+
+# ---------------- CHANGE FEED ----------------
+
+class AsyncChangeFeed(ChangeFeed):
+    queue_class = asyncio.Queue
+
+
+# Fed by the listener above; a stream is just a coroutine waiting on its queue
+change_feed = AsyncChangeFeed(CHANGE_FEED_MAX_SUBSCRIBERS, CHANGE_FEED_QUEUE_SIZE)
+
+@app.route('/changes', methods=['GET'])
+async def change_stream():
+    tables = request.args.get('tables')
+    tables = None if tables is None else set(_sync_tables(tables))
+    q = change_feed.subscribe(tables)
+
+    async def generate():
+        try:
+            yield b'retry: 5000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(q.get(), CHANGE_FEED_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    event = ': keep-alive\n\n'
+                yield event.encode('utf-8')
+        finally:
+            change_feed.unsubscribe(q)
+
+    resp = Response(generate(), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    resp.timeout = None  # no RESPONSE_TIMEOUT for a stream that never ends
+    return resp
+
+# ---------------- SEARCH ----------------
+
+async def search_rows(select, text_col, prefix_col, order_col, where=None):
+    query, params = search_query(request.args, select, text_col, prefix_col, order_col, where)
+    async with db() as conn:
+        rows = await conn.fetch(numbered(query), *params)
+    return Response('[' + ','.join(row[0] for row in rows) + ']', mimetype='application/json')
+
+
+@app.route('/search/jobs', methods=['GET'])
+@versioned('jobs')
+async def search_jobs():
+    open_only = request.args.get('open', 'false').lower() == 'true'
+    return await search_rows(
+        'SELECT data FROM jobs', JOB_SEARCH_TEXT, 'lower(serial_no)', 'serial_no',
+        where='NOT is_final' if open_only else None
+    )
+
+
+@app.route('/search/materials', methods=['GET'])
+@cached('materials')
+@versioned('materials')
+async def search_materials():
+    return await search_rows('SELECT data FROM materials', MATERIAL_SEARCH_TEXT, MATERIAL_SEARCH_TEXT, MATERIAL_SEARCH_TEXT)
+
+# -------------- HEALTH CHECK ----------------
+
+@app.route('/health', methods=['GET'])
+async def health():
+    return jsonify({'status': 'OK'})
+
+@app.route('/health/pool', methods=['GET'])
+async def pool_stats():
+    return jsonify({
+        'size': _pool.get_size(),
+        'min': _pool.get_min_size(),
+        'max': _pool.get_max_size(),
+        'idle': _pool.get_idle_size(),
+        'in_use': _pool.get_size() - _pool.get_idle_size(),
+    })
+
+@app.route('/health/cache', methods=['GET'])
+async def cache_stats():
+    return jsonify(reference_cache.stats())
+
+@app.route('/health/changes', methods=['GET'])
+async def change_feed_stats():
+    return jsonify(change_feed.stats())
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    idle = _pool.get_idle_size()
+    pool = {'in_use': _pool.get_size() - idle, 'idle': idle, 'timeouts': _pool_timeouts}
+    return Response(request_metrics.render(pool), mimetype='text/plain; version=0.0.4')
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,59 @@
+# CPU cost of the JSON work a request does, per provider (JSON_PROVIDER):
+# parsing an upload body, encoding items for storage, decoding stored rows
+# and jsonify()-ing a list. No database needed; payloads are synthetic
+# job and stock rows.
+# Usage: python benchmarks/json_bench.py [rows] [repeats]
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider
+
+from app import OrjsonProvider, app, orjson
+from benchmarks.passthrough_bench import cpu_ms, make_job
+from benchmarks.seed import make_stock
+
+
+def cases(provider, jobs, stock_body, stored_stock):
+    return {
+        'parse /stock/save body': lambda: provider.loads(stock_body),
+        'encode items for storage': lambda: [provider.dumps(job) for job in jobs],
+        'decode stored rows': lambda: [provider.loads(row) for row in stored_stock],
+        'jsonify job list': lambda: provider.response(jobs).get_data(),
+    }
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rng = random.Random(1973)
+    jobs = [make_job(i) for i in range(n)]
+    stock = [make_stock(i, rng) for i in range(n)]
+    stock_body = DefaultJSONProvider(app).dumps({'stockData': stock, 'isJobSpecific': False}).encode('utf-8')
+    stored_stock = [DefaultJSONProvider(app).dumps(item) for item in stock]
+
+    providers = {'stdlib': DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider(app)
+    else:
+        print('orjson not installed, timing stdlib only')
+
+    results = {}
+    with app.test_request_context('/'):
+        for name, provider in providers.items():
+            for case, fn in cases(provider, jobs, stock_body, stored_stock).items():
+                results[case, name] = cpu_ms(fn, repeats)
+
+    print('rows: %d (best of %d, ms CPU)' % (n, repeats))
+    print('%-26s' % '' + ''.join('%10s' % name for name in providers))
+    for case in cases(None, None, None, None):
+        line = '%-26s' % case + ''.join('%10.1f' % results[case, name] for name in providers)
+        if 'orjson' in providers:
+            line += '   %.1fx' % (results[case, 'stdlib'] / results[case, 'orjson'])
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
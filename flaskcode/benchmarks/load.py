@@ -0,0 +1,234 @@
+# Concurrent load against a running server (app.py or asgi_app.py), one
+# endpoint at a time, on data from benchmarks/seed.py. Reports latency
+# percentiles, throughput and DB statements per request, and saves the run
+# as JSON so later runs can be compared against it.
+#
+# DB round trips come from pg_stat_statements when the extension is
+# installed, otherwise from pg_stat_database transaction counts; both are
+# database-wide, so run against a quiet database.
+#
+# Usage: python benchmarks/load.py [--url http://127.0.0.1:5000] [-c 16] [-n 500]
+#                                  [--scenario jobs --scenario stock_update ...]
+#                                  [--label name] [--compare results/<file>.json]
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import _connect
+from benchmarks.seed import BENCH_PASSWORD, BENCH_USER, job_serial, stock_invoice, stock_material
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def get(path):
+    return lambda rng, args: ('GET', path, None)
+
+
+def stock_update(rng, args):
+    i = rng.randrange(args.stock_keys)
+    return 'POST', '/stock/update', {
+        'data': {'material': stock_material(i), 'invoice': stock_invoice(i), 'jobSpecific': False},
+        'quantity': 1,
+    }
+
+
+def job_indents(rng, args):
+    indents = []
+    for _ in range(args.indent_batch):
+        m_type, subtype = stock_material(rng.randrange(args.stock_keys)).split(' - ')
+        indents.append({
+            'serialNo': job_serial(rng.randrange(args.jobs)),
+            'type': m_type,
+            'subtype': subtype,
+            'quantity': rng.randint(1, 10),
+            'jobSpecific': False,
+            'user_in': BENCH_USER,
+        })
+    return 'POST', '/job_indents', {'data': indents}
+
+
+def login(rng, args):
+    return 'POST', '/users/login', {'username': BENCH_USER, 'password': BENCH_PASSWORD}
+
+
+SCENARIOS = {
+    'jobs': get('/jobs'),
+    'jobs_open': get('/jobs/open'),
+    'stock': get('/stock?isJobSpecific=false'),
+    'stock_update': stock_update,
+    'job_indents': job_indents,
+    'login': login,
+}
+
+
+class Client(threading.local):
+    # One keep-alive connection per load thread
+    def __init__(self, url):
+        parsed = urllib.parse.urlsplit(url)
+        conn_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+        self.conn = conn_class(parsed.netloc, timeout=60)
+
+    def request(self, method, path, body):
+        headers = {}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.conn.request(method, path, body, headers)
+            resp = self.conn.getresponse()
+            resp.read()
+            return resp.status
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            return None
+
+
+def db_counters():
+    # Fresh connection per snapshot: closing it flushes its own stats, and
+    # each snapshot adds exactly two queries/transactions to the next one
+    conn = _connect()
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+        if cur.fetchone():
+            cur.execute(
+                'SELECT coalesce(sum(calls), 0) FROM pg_stat_statements'
+                ' WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())'
+            )
+            return 'statements', int(cur.fetchone()[0])
+        cur.execute('SELECT xact_commit + xact_rollback FROM pg_stat_database WHERE datname = current_database()')
+        return 'transactions', int(cur.fetchone()[0])
+    finally:
+        conn.close()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run_scenario(name, args):
+    make_request = SCENARIOS[name]
+    client = Client(args.url)
+    rngs = threading.local()
+
+    def one(i):
+        if not hasattr(rngs, 'rng'):
+            rngs.rng = random.Random('%s-%s-%s' % (args.seed, name, threading.get_ident()))
+        method, path, body = make_request(rngs.rng, args)
+        start = time.perf_counter()
+        status = client.request(method, path, body)
+        return (time.perf_counter() - start) * 1000, status
+
+    with ThreadPoolExecutor(args.concurrency) as ex:
+        list(ex.map(one, range(min(args.warmup, args.requests))))
+        # Idle server backends report transaction counts up to 10s late
+        settle = args.settle if args.db_counter == 'transactions' else 0
+        time.sleep(settle)
+        before = db_counters()[1]
+        start = time.perf_counter()
+        samples = list(ex.map(one, range(args.requests)))
+        elapsed = time.perf_counter() - start
+        time.sleep(settle)
+        after = db_counters()[1]
+
+    latencies = sorted(ms for ms, status in samples if status is not None and status < 400)
+    statuses = {}
+    for ms, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    db_calls = max(after - before - 2, 0)
+    return {
+        'requests': len(samples),
+        'errors': len(samples) - len(latencies),
+        'statuses': statuses,
+        'seconds': round(elapsed, 3),
+        'rps': round(len(samples) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95), 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99), 2) if latencies else None,
+        'max_ms': round(latencies[-1], 2) if latencies else None,
+        'db_per_request': round(db_calls / len(samples), 2),
+    }
+
+
+def print_results(results, baseline=None):
+    cols = ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'db_per_request')
+    print('db round trips counted as %s' % results['db_counter'])
+    print('%-14s %6s %6s' % ('scenario', 'reqs', 'errors') + ''.join(' %14s' % c for c in cols))
+    for name, r in results['scenarios'].items():
+        line = '%-14s %6d %6d' % (name, r['requests'], r['errors'])
+        base = (baseline or {}).get('scenarios', {}).get(name)
+        for c in cols:
+            cell = '-' if r[c] is None else '%g' % r[c]
+            if base and base.get(c) and r[c] is not None:
+                cell += ' (%+.0f%%)' % ((r[c] - base[c]) * 100 / base[c])
+            line += ' %14s' % cell
+        print(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Drive the API with concurrent requests and record latencies')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('-n', '--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20, help='untimed requests per scenario')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='run only these (repeatable); default all')
+    parser.add_argument('--jobs', type=int, default=2000, help='as passed to seed.py')
+    parser.add_argument('--stock-keys', type=int, default=500, help='as passed to seed.py')
+    parser.add_argument('--indent-batch', type=int, default=5, help='indents per /job_indents POST')
+    parser.add_argument('--seed', type=int, default=1973)
+    parser.add_argument('--settle', type=float, default=11,
+                        help='seconds to let server stats flush around each scenario (0 to skip)')
+    parser.add_argument('--label', default='run')
+    parser.add_argument('--out', default=RESULTS_DIR, help='directory for the results JSON')
+    parser.add_argument('--compare', help='earlier results JSON to diff against')
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    args.db_counter = db_counters()[0]
+
+    results = {
+        'label': args.label,
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'url': args.url,
+        'concurrency': args.concurrency,
+        'db_counter': args.db_counter,
+        'requests': args.requests,
+        'scenarios': {},
+    }
+    for name in args.scenario or SCENARIOS:
+        results['scenarios'][name] = run_scenario(name, args)
+        print('%s done' % name, file=sys.stderr)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, '%s-%s.json' % (time.strftime('%Y%m%d-%H%M%S'), args.label))
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('saved %s' % path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# CPU cost of building a list response from stored JSON rows:
+# decode each row + jsonify (old path) vs splicing the stored text (Page.response).
+# No database needed; rows are synthetic job payloads.
+# Usage: python benchmarks/passthrough_bench.py [rows] [repeats]
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+
+from app import Page, app
+
+
+def make_job(i):
+    return {
+        'serialNo': 'GEW/%05d' % i,
+        'jobType': 'Distribution',
+        'kva': '1000',
+        'hvVoltage': '11000',
+        'lvVoltage': '433',
+        'phases': '3',
+        'vectorGroup': 'Dyn11',
+        'tappingType': 'OCTC',
+        'tappingRangeMin': '-5',
+        'tappingRangeMax': '5',
+        'stepVoltage': '2.5',
+        'relevantIS': 'IS 1180',
+        'purchaserName': 'Purchaser %d' % (i % 300),
+        'purchaserReference': 'PO-%06d' % i,
+        'quantity': '1',
+        'dispatchDate': '2025-03-31',
+        'entryDateTime': '2025-01-15T10:%02d:00' % (i % 60),
+        'createdBy': 'storekeeper',
+        'remark': 'Converter duty transformer',
+        'isFinal': i % 4 == 0,
+    }
+
+
+def cpu_ms(fn, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.process_time()
+        fn()
+        elapsed = (time.process_time() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    # Shape of page.fetch() rows: (order column, stored JSON text)
+    rows = [(job['serialNo'], json.dumps(job)) for job in map(make_job, range(n))]
+
+    with app.test_request_context('/jobs'):
+        page = Page()
+
+        def decode_and_jsonify():
+            jsonify([json.loads(row[1]) for row in rows]).get_data()
+
+        def passthrough():
+            page.response(rows).get_data()
+
+        old = cpu_ms(decode_and_jsonify, repeats)
+        new = cpu_ms(passthrough, repeats)
+
+    print('rows: %d (best of %d)' % (n, repeats))
+    print('json.loads + jsonify: %8.1f ms CPU' % old)
+    print('passthrough splice:   %8.1f ms CPU' % new)
+    print('saved per 10k rows:   %8.1f ms CPU (%.0fx faster)' % ((old - new) * 10000 / n, old / new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+# Synthetic data for load tests: fills the app's tables with reproducible
+# bench rows (BENCH keys/serials, bench- ids) next to whatever is already there.
+# Run migrate.py first. Uses the same DB_* env vars as app.py.
+# Usage: python benchmarks/seed.py [--jobs N] [--stock-keys N] ... [--reset]
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+import psycopg2.extras
+
+from app import _connect, report_row
+
+BENCH_USER = 'bench'
+BENCH_PASSWORD = 'bench'
+MATERIAL_TYPES = ['CRGO', 'Copper', 'Oil', 'Bushing', 'Tap Changer', 'Radiator', 'Insulation', 'Hardware']
+
+
+def job_serial(i):
+    return 'BENCH/%05d' % i
+
+
+def stock_material(i):
+    return '%s - BENCH%04d' % (MATERIAL_TYPES[i % len(MATERIAL_TYPES)], i)
+
+
+def stock_invoice(i):
+    return 'BINV-%05d' % i
+
+
+def make_job(i, rng):
+    return {
+        'serialNo': job_serial(i),
+        'jobType': rng.choice(['Distribution', 'Power', 'Converter']),
+        'kva': str(rng.choice([250, 500, 1000, 2500, 5000])),
+        'hvVoltage': '11000',
+        'lvVoltage': '433',
+        'purchaserName': 'Purchaser %d' % rng.randrange(300),
+        'purchaserReference': 'PO-%06d' % i,
+        'dispatchDate': '2025-%02d-%02d' % (rng.randint(1, 12), rng.randint(1, 28)),
+        'createdBy': BENCH_USER,
+        'isFinal': rng.random() < 0.7,
+    }
+
+
+def make_material(i):
+    m_type, subtype = stock_material(i).split(' - ')
+    return ('bench-%05d' % i, m_type, subtype, json.dumps({'type': m_type, 'subtype': subtype, 'unit': 'kg'}))
+
+
+def make_stock(i, rng):
+    m_type, subtype = stock_material(i).split(' - ')
+    return {
+        'type': m_type,
+        'subtype': subtype,
+        'material': stock_material(i),
+        'invoice': stock_invoice(i),
+        'quantity': str(rng.randint(10_000, 100_000)),
+        'price': str(rng.randint(10, 5000)),
+        'jobSpecific': False,
+    }
+
+
+def make_indent(i, jobs, stock_keys, rng):
+    k = rng.randrange(stock_keys)
+    m_type, subtype = stock_material(k).split(' - ')
+    return {
+        'serialNo': job_serial(rng.randrange(jobs)),
+        'type': m_type,
+        'subtype': subtype,
+        'quantity': rng.randint(1, 50),
+        'jobSpecific': False,
+        'user_in': BENCH_USER,
+    }
+
+
+def make_movement(i, stock_keys, rng):
+    k = rng.randrange(stock_keys)
+    return {
+        'material': stock_material(k),
+        'invoice': stock_invoice(k),
+        'quantity': str(rng.randint(1, 500)),
+        'vendor': 'Vendor %d' % rng.randrange(50),
+        'bench': True,
+    }
+
+
+def make_report(i, jobs, stock_keys, rng):
+    return {
+        'bench': True,
+        'serialNo': job_serial(i % jobs),
+        'savedBy': BENCH_USER,
+        'remark': 'Report %d' % i,
+        'timestamp': '2025-%02d-%02dT10:00:00' % (rng.randint(1, 12), rng.randint(1, 28)),
+        'rows': [make_movement(j, stock_keys, rng) for j in range(20)],
+    }
+
+
+def reset(cur):
+    cur.execute("DELETE FROM job_indents WHERE jobid LIKE 'BENCH/%'")
+    cur.execute("DELETE FROM indent_stock WHERE key LIKE '% - BENCH%'")
+    cur.execute("DELETE FROM stock WHERE key LIKE '% - BENCH%'")
+    cur.execute("DELETE FROM stock_movements WHERE stock_key LIKE '% - BENCH%'")
+    cur.execute("DELETE FROM stock_balances WHERE stock_key LIKE '% - BENCH%'")
+    cur.execute("DELETE FROM jobs WHERE serial_no LIKE 'BENCH/%'")
+    cur.execute("DELETE FROM materials WHERE id LIKE 'bench-%'")
+    cur.execute("DELETE FROM incoming_materials WHERE id LIKE 'bench-%'")
+    cur.execute("DELETE FROM outgoing_materials WHERE id LIKE 'bench-%'")
+    cur.execute("DELETE FROM reports WHERE serial_no LIKE 'BENCH/%' OR data->>'bench' = 'true'")
+    cur.execute('DELETE FROM users WHERE username = %s', (BENCH_USER,))
+
+
+def insert(cur, query, rows):
+    psycopg2.extras.execute_values(cur, query, rows, page_size=1000)
+    return len(rows)
+
+
+def seed(cur, args):
+    rng = random.Random(args.seed)
+    counts = {}
+    counts['users'] = insert(cur, 'INSERT INTO users (username, password, role) VALUES %s', [
+        (BENCH_USER, bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8'), 'admin')
+    ])
+    counts['jobs'] = insert(cur, 'INSERT INTO jobs (serial_no, data) VALUES %s', [
+        (job_serial(i), json.dumps(make_job(i, rng))) for i in range(args.jobs)
+    ])
+    counts['materials'] = insert(cur, 'INSERT INTO materials (id, type, subtype, data) VALUES %s', [
+        make_material(i) for i in range(args.materials)
+    ])
+    counts['stock'] = insert(cur, 'INSERT INTO stock (key, data) VALUES %s', [
+        (stock_material(i), json.dumps(make_stock(i, rng))) for i in range(args.stock_keys)
+    ])
+    indents = [make_indent(i, args.jobs, args.stock_keys, rng) for i in range(args.indents)]
+    totals = {}
+    for indent in indents:
+        key = '%s - %s' % (indent['type'], indent['subtype'])
+        totals[key] = totals.get(key, 0) + indent['quantity']
+    insert(cur, 'INSERT INTO indent_stock (key, data) VALUES %s', [
+        (key, json.dumps({'indentQuantity': qty})) for key, qty in sorted(totals.items())
+    ])
+    counts['job_indents'] = insert(cur, 'INSERT INTO job_indents (jobid, data) VALUES %s', [
+        (indent['serialNo'], json.dumps(indent)) for indent in indents
+    ])
+    for table in ('incoming_materials', 'outgoing_materials'):
+        counts[table] = insert(cur, 'INSERT INTO %s (id, data) VALUES %%s' % table, [
+            ('bench-%07d' % i, json.dumps(make_movement(i, args.stock_keys, rng))) for i in range(args.movements)
+        ])
+    reports = [report_row(make_report(i, args.jobs, args.stock_keys, rng)) for i in range(args.reports)]
+    counts['reports'] = insert(
+        cur,
+        'INSERT INTO reports (serial_no, report_type, saved_by, remark, saved_at, created_at, size, body) VALUES %s',
+        [(r['serial_no'], r['report_type'], r['saved_by'], r['remark'], r['saved_at'], r['created_at'], r['size'], r['body'])
+         for r in reports]
+    )
+    return counts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Seed the database with synthetic bench data')
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--materials', type=int, default=500)
+    parser.add_argument('--stock-keys', type=int, default=500)
+    parser.add_argument('--indents', type=int, default=10000)
+    parser.add_argument('--movements', type=int, default=5000, help='incoming and outgoing rows each')
+    parser.add_argument('--reports', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1973)
+    parser.add_argument('--reset', action='store_true', help='only remove bench rows')
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    conn = _connect()
+    cur = conn.cursor()
+    start = time.perf_counter()
+    reset(cur)
+    counts = {} if args.reset else seed(cur, args)
+    conn.commit()
+    cur.execute('ANALYZE')
+    conn.commit()
+    conn.close()
+    for table, n in counts.items():
+        print('%-20s %8d' % (table, n))
+    print('done in %.1fs' % (time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Applies flaskcode/migrations/* in filename order, once each.
+#   *.sql  run in one transaction, unless the first line is `-- no-transaction`
+#          (needed for CREATE INDEX CONCURRENTLY); then each statement autocommits,
+#          and explicit BEGIN; ... COMMIT; group statements into shorter transactions
+#   *.py   must define migrate(conn) and commit its own work (batched backfills)
+# Usage: python migrate.py            (uses the same DB_* env vars as app.py)
+import importlib.util
+import os
+import re
+import sys
+
+from app import _connect
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+
+def applied_migrations(cur):
+    cur.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        '''
+    )
+    cur.execute('SELECT name FROM schema_migrations')
+    return {row[0] for row in cur.fetchall()}
+
+
+def split_statements(script):
+    # Splits on ';' except inside $$ / $tag$ bodies (functions, DO blocks).
+    # Semicolons in comments or string literals are not handled.
+    statements = ['']
+    quote = None
+    for i, part in enumerate(re.split(r'(\$\w*\$)', script)):
+        if i % 2:  # a dollar-quote tag
+            if quote is None:
+                quote = part
+            elif part == quote:
+                quote = None
+        elif quote is None:
+            first, *rest = part.split(';')
+            statements[-1] += first
+            statements.extend(rest)
+            continue
+        statements[-1] += part
+    return statements
+
+
+def run_sql(conn, cur, script):
+    if not script.startswith('-- no-transaction'):
+        cur.execute(script)
+        return
+    conn.autocommit = True
+    try:
+        for statement in split_statements(script):
+            lines = [l for l in statement.splitlines() if l.strip() and not l.strip().startswith('--')]
+            if lines:
+                cur.execute(statement)
+    finally:
+        conn.autocommit = False
+
+
+def run_python(conn, path):
+    spec = importlib.util.spec_from_file_location(os.path.basename(path)[:-3], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.migrate(conn)
+
+
+def main():
+    conn = _connect()
+    cur = conn.cursor()
+    done = applied_migrations(cur)
+    conn.commit()
+
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not name.endswith(('.sql', '.py')) or name in done:
+            continue
+        path = os.path.join(MIGRATIONS_DIR, name)
+        print(f'Applying {name}')
+        try:
+            if name.endswith('.py'):
+                run_python(conn, path)
+            else:
+                with open(path) as f:
+                    run_sql(conn, cur, f.read())
+            cur.execute('INSERT INTO schema_migrations (name) VALUES (%s)', (name,))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f'Failed on {name}: {e}')
+            sys.exit(1)
+
+    cur.close()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
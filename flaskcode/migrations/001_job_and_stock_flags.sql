@@ -0,0 +1,21 @@
+-- Evaluate the /jobs/open and /stock?isJobSpecific= filters in the database.
+-- Both flags are derived from the stored JSON, so writers need no changes.
+
+ALTER TABLE jobs
+    ADD COLUMN IF NOT EXISTS is_final BOOLEAN
+    GENERATED ALWAYS AS (COALESCE(data::jsonb -> 'isFinal' = 'true'::jsonb, false)) STORED;
+
+-- Open jobs are the small, hot subset: index only those rows
+CREATE INDEX IF NOT EXISTS jobs_open_serial_no_idx
+    ON jobs (serial_no) WHERE NOT is_final;
+
+-- Matches the old `'serialNo' in item` check: key present, whatever its value
+ALTER TABLE stock
+    ADD COLUMN IF NOT EXISTS is_job_specific BOOLEAN
+    GENERATED ALWAYS AS (data::jsonb ? 'serialNo') STORED;
+
+CREATE INDEX IF NOT EXISTS stock_job_specific_key_idx
+    ON stock (key) WHERE is_job_specific;
+
+CREATE INDEX IF NOT EXISTS stock_general_key_idx
+    ON stock (key) WHERE NOT is_job_specific;
@@ -0,0 +1,36 @@
+-- Phase 1 of the text -> JSONB move for every `data` column.
+-- Adds a nullable shadow column (no table rewrite) and a trigger that keeps
+-- it in step with writes while 003 backfills existing rows in batches.
+
+CREATE OR REPLACE FUNCTION sync_data_jsonb() RETURNS trigger AS $$
+BEGIN
+    NEW.data_jsonb := NEW.data::jsonb;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS data_jsonb JSONB;
+ALTER TABLE stock ADD COLUMN IF NOT EXISTS data_jsonb JSONB;
+ALTER TABLE indent_stock ADD COLUMN IF NOT EXISTS data_jsonb JSONB;
+ALTER TABLE materials ADD COLUMN IF NOT EXISTS data_jsonb JSONB;
+ALTER TABLE reports ADD COLUMN IF NOT EXISTS data_jsonb JSONB;
+ALTER TABLE incoming_materials ADD COLUMN IF NOT EXISTS data_jsonb JSONB;
+ALTER TABLE outgoing_materials ADD COLUMN IF NOT EXISTS data_jsonb JSONB;
+ALTER TABLE job_indents ADD COLUMN IF NOT EXISTS data_jsonb JSONB;
+
+CREATE TRIGGER jobs_sync_data_jsonb BEFORE INSERT OR UPDATE OF data ON jobs
+    FOR EACH ROW EXECUTE FUNCTION sync_data_jsonb();
+CREATE TRIGGER stock_sync_data_jsonb BEFORE INSERT OR UPDATE OF data ON stock
+    FOR EACH ROW EXECUTE FUNCTION sync_data_jsonb();
+CREATE TRIGGER indent_stock_sync_data_jsonb BEFORE INSERT OR UPDATE OF data ON indent_stock
+    FOR EACH ROW EXECUTE FUNCTION sync_data_jsonb();
+CREATE TRIGGER materials_sync_data_jsonb BEFORE INSERT OR UPDATE OF data ON materials
+    FOR EACH ROW EXECUTE FUNCTION sync_data_jsonb();
+CREATE TRIGGER reports_sync_data_jsonb BEFORE INSERT OR UPDATE OF data ON reports
+    FOR EACH ROW EXECUTE FUNCTION sync_data_jsonb();
+CREATE TRIGGER incoming_materials_sync_data_jsonb BEFORE INSERT OR UPDATE OF data ON incoming_materials
+    FOR EACH ROW EXECUTE FUNCTION sync_data_jsonb();
+CREATE TRIGGER outgoing_materials_sync_data_jsonb BEFORE INSERT OR UPDATE OF data ON outgoing_materials
+    FOR EACH ROW EXECUTE FUNCTION sync_data_jsonb();
+CREATE TRIGGER job_indents_sync_data_jsonb BEFORE INSERT OR UPDATE OF data ON job_indents
+    FOR EACH ROW EXECUTE FUNCTION sync_data_jsonb();
@@ -0,0 +1,39 @@
+# Phase 2: copy existing rows into data_jsonb in small committed batches so
+# the app keeps serving reads and writes. Safe to interrupt and re-run.
+import os
+import time
+
+TABLES = [
+    'jobs', 'stock', 'indent_stock', 'materials', 'reports',
+    'incoming_materials', 'outgoing_materials', 'job_indents',
+]
+BATCH_SIZE = int(os.getenv('BACKFILL_BATCH_SIZE', 1000))
+BATCH_PAUSE = float(os.getenv('BACKFILL_BATCH_PAUSE', 0.05))
+
+
+def migrate(conn):
+    cur = conn.cursor()
+    for table in TABLES:
+        total = 0
+        while True:
+            # ctid works for every table, including those without a primary key
+            cur.execute(
+                f'''
+                UPDATE {table} SET data_jsonb = data::jsonb
+                WHERE ctid = ANY(ARRAY(
+                    SELECT ctid FROM {table}
+                    WHERE data_jsonb IS NULL AND data IS NOT NULL
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ))
+                ''',
+                (BATCH_SIZE,)
+            )
+            updated = cur.rowcount
+            conn.commit()
+            total += updated
+            if updated == 0:
+                break
+            time.sleep(BATCH_PAUSE)
+        print(f'  {table}: {total} rows backfilled')
+    cur.close()
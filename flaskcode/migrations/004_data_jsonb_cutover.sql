@@ -0,0 +1,94 @@
+-- no-transaction
+-- Phase 3: swap data_jsonb in as `data`. Each table is switched over in its
+-- own transaction, so it is locked only for its catch-up UPDATE (rows 003
+-- has not seen) and catalog-only ALTERs, and is released before the next
+-- table is locked. If this stops part way, the tables already committed are
+-- done: finish the remaining blocks by hand and record the migration.
+
+CREATE OR REPLACE FUNCTION set_job_flags() RETURNS trigger AS $$
+BEGIN
+    NEW.is_final := COALESCE(NEW.data -> 'isFinal' = 'true'::jsonb, false);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION set_stock_flags() RETURNS trigger AS $$
+BEGIN
+    NEW.is_job_specific := COALESCE(NEW.data ? 'serialNo', false);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- jobs: is_final was generated from the text column (migrations/001);
+-- DROP EXPRESSION keeps its values without a rewrite and a trigger takes over.
+BEGIN;
+LOCK TABLE jobs IN ACCESS EXCLUSIVE MODE;
+UPDATE jobs SET data_jsonb = data::jsonb WHERE data_jsonb IS NULL AND data IS NOT NULL;
+DROP TRIGGER jobs_sync_data_jsonb ON jobs;
+ALTER TABLE jobs ALTER COLUMN is_final DROP EXPRESSION;
+ALTER TABLE jobs DROP COLUMN data;
+ALTER TABLE jobs RENAME COLUMN data_jsonb TO data;
+CREATE TRIGGER jobs_set_flags BEFORE INSERT OR UPDATE OF data ON jobs
+    FOR EACH ROW EXECUTE FUNCTION set_job_flags();
+COMMIT;
+
+BEGIN;
+LOCK TABLE stock IN ACCESS EXCLUSIVE MODE;
+UPDATE stock SET data_jsonb = data::jsonb WHERE data_jsonb IS NULL AND data IS NOT NULL;
+DROP TRIGGER stock_sync_data_jsonb ON stock;
+ALTER TABLE stock ALTER COLUMN is_job_specific DROP EXPRESSION;
+ALTER TABLE stock DROP COLUMN data;
+ALTER TABLE stock RENAME COLUMN data_jsonb TO data;
+CREATE TRIGGER stock_set_flags BEFORE INSERT OR UPDATE OF data ON stock
+    FOR EACH ROW EXECUTE FUNCTION set_stock_flags();
+COMMIT;
+
+BEGIN;
+LOCK TABLE indent_stock IN ACCESS EXCLUSIVE MODE;
+UPDATE indent_stock SET data_jsonb = data::jsonb WHERE data_jsonb IS NULL AND data IS NOT NULL;
+DROP TRIGGER indent_stock_sync_data_jsonb ON indent_stock;
+ALTER TABLE indent_stock DROP COLUMN data;
+ALTER TABLE indent_stock RENAME COLUMN data_jsonb TO data;
+COMMIT;
+
+BEGIN;
+LOCK TABLE materials IN ACCESS EXCLUSIVE MODE;
+UPDATE materials SET data_jsonb = data::jsonb WHERE data_jsonb IS NULL AND data IS NOT NULL;
+DROP TRIGGER materials_sync_data_jsonb ON materials;
+ALTER TABLE materials DROP COLUMN data;
+ALTER TABLE materials RENAME COLUMN data_jsonb TO data;
+COMMIT;
+
+BEGIN;
+LOCK TABLE reports IN ACCESS EXCLUSIVE MODE;
+UPDATE reports SET data_jsonb = data::jsonb WHERE data_jsonb IS NULL AND data IS NOT NULL;
+DROP TRIGGER reports_sync_data_jsonb ON reports;
+ALTER TABLE reports DROP COLUMN data;
+ALTER TABLE reports RENAME COLUMN data_jsonb TO data;
+COMMIT;
+
+BEGIN;
+LOCK TABLE incoming_materials IN ACCESS EXCLUSIVE MODE;
+UPDATE incoming_materials SET data_jsonb = data::jsonb WHERE data_jsonb IS NULL AND data IS NOT NULL;
+DROP TRIGGER incoming_materials_sync_data_jsonb ON incoming_materials;
+ALTER TABLE incoming_materials DROP COLUMN data;
+ALTER TABLE incoming_materials RENAME COLUMN data_jsonb TO data;
+COMMIT;
+
+BEGIN;
+LOCK TABLE outgoing_materials IN ACCESS EXCLUSIVE MODE;
+UPDATE outgoing_materials SET data_jsonb = data::jsonb WHERE data_jsonb IS NULL AND data IS NOT NULL;
+DROP TRIGGER outgoing_materials_sync_data_jsonb ON outgoing_materials;
+ALTER TABLE outgoing_materials DROP COLUMN data;
+ALTER TABLE outgoing_materials RENAME COLUMN data_jsonb TO data;
+COMMIT;
+
+BEGIN;
+LOCK TABLE job_indents IN ACCESS EXCLUSIVE MODE;
+UPDATE job_indents SET data_jsonb = data::jsonb WHERE data_jsonb IS NULL AND data IS NOT NULL;
+DROP TRIGGER job_indents_sync_data_jsonb ON job_indents;
+ALTER TABLE job_indents DROP COLUMN data;
+ALTER TABLE job_indents RENAME COLUMN data_jsonb TO data;
+COMMIT;
+
+DROP FUNCTION sync_data_jsonb();
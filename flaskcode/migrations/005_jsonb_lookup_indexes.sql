@@ -0,0 +1,15 @@
+-- no-transaction
+-- Built CONCURRENTLY so stock issues and indent updates are not blocked.
+-- If a build is interrupted, drop the INVALID index and re-run.
+
+-- /stock/delete and /stock/update: key = ? AND data->>'invoice' = ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS stock_key_invoice_idx
+    ON stock (key, (data ->> 'invoice'));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS stock_serial_no_idx
+    ON stock ((data ->> 'serialNo')) WHERE is_job_specific;
+
+-- PUT /job_indents: jobid = ? AND data->>'type' = ? AND data->>'subtype' = ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS job_indents_job_type_subtype_idx
+    ON job_indents (jobid, (data ->> 'type'), (data ->> 'subtype'));
+
@@ -0,0 +1,45 @@
+-- Per-table change versions used as ETags by the GET routes.
+-- Bumped by statement-level triggers so every writer (API, psql, scripts)
+-- invalidates cached lists. Values come from one sequence, so they never
+-- repeat across tables or after a version row is recreated.
+
+CREATE SEQUENCE IF NOT EXISTS table_version_seq;
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT nextval('table_version_seq')
+);
+
+INSERT INTO table_versions (table_name)
+SELECT unnest(ARRAY[
+    'users', 'reports', 'jobs', 'materials', 'incoming_materials',
+    'outgoing_materials', 'stock', 'indent_stock', 'job_indents'
+])
+ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_versions SET version = nextval('table_version_seq')
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER users_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON users
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+CREATE TRIGGER reports_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON reports
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+CREATE TRIGGER jobs_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON jobs
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+CREATE TRIGGER materials_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON materials
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+CREATE TRIGGER incoming_materials_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON incoming_materials
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+CREATE TRIGGER outgoing_materials_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON outgoing_materials
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+CREATE TRIGGER stock_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON stock
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+CREATE TRIGGER indent_stock_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON indent_stock
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+CREATE TRIGGER job_indents_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON job_indents
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
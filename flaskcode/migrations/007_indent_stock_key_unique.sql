@@ -0,0 +1,3 @@
+-- /job_indents upserts indent_stock with ON CONFLICT (key), which needs a
+-- unique index. Fails if duplicate keys exist; merge those rows first.
+CREATE UNIQUE INDEX IF NOT EXISTS indent_stock_key_idx ON indent_stock (key);
@@ -0,0 +1,10 @@
+-- SQL twin of app.parse_float(): '1,250.5 ' -> 1250.5, anything unparsable -> fallback.
+-- Lets quantity arithmetic on the stored JSON run inside the database.
+CREATE OR REPLACE FUNCTION parse_numeric(value TEXT, fallback NUMERIC DEFAULT 0)
+RETURNS NUMERIC AS $$
+    SELECT CASE
+        WHEN trim(replace(value, ',', '')) ~ '^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$'
+            THEN trim(replace(value, ',', ''))::numeric
+        ELSE fallback
+    END
+$$ LANGUAGE sql IMMUTABLE;
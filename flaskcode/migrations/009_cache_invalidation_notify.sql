@@ -0,0 +1,13 @@
+-- Tell every worker's reference-data cache (app.py) that a table changed.
+-- NOTIFY is delivered on commit, so listeners never see uncommitted data.
+CREATE OR REPLACE FUNCTION notify_cache_invalidation() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('cache_invalidation', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER materials_cache_invalidation AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON materials
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation();
+CREATE TRIGGER users_cache_invalidation AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON users
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation();
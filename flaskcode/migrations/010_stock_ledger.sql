@@ -0,0 +1,116 @@
+-- Typed stock-movement ledger plus per-key balances, both maintained by a
+-- row trigger on `stock` in the writer's transaction. Every stock change
+-- goes through that table (receipts via /stock/add, issues via /stock/update,
+-- removals via /stock/delete, stock-takes via /stock/save), so the ledger
+-- sees each movement exactly once whichever route or tool made it.
+
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id BIGSERIAL PRIMARY KEY,
+    stock_key TEXT NOT NULL,
+    material TEXT NOT NULL,
+    serial_no TEXT,
+    kind TEXT NOT NULL CHECK (kind IN ('opening', 'receipt', 'issue', 'removal', 'adjustment', 'stocktake')),
+    quantity NUMERIC NOT NULL,  -- signed: receipts positive, issues negative
+    value NUMERIC NOT NULL,     -- signed change in quantity * price
+    invoice TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS stock_movements_key_idx ON stock_movements (stock_key, id);
+
+CREATE TABLE IF NOT EXISTS stock_balances (
+    stock_key TEXT PRIMARY KEY,
+    material TEXT NOT NULL,
+    type TEXT,
+    subtype TEXT,
+    serial_no TEXT,
+    quantity NUMERIC NOT NULL DEFAULT 0,
+    value NUMERIC NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS stock_balances_material_idx ON stock_balances (material, stock_key);
+CREATE INDEX IF NOT EXISTS stock_balances_serial_no_idx
+    ON stock_balances (serial_no, stock_key) WHERE serial_no IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION apply_stock_movement(
+    p_key TEXT, p_data JSONB, p_quantity NUMERIC, p_value NUMERIC, p_kind TEXT
+) RETURNS void AS $$
+DECLARE
+    v_serial_no TEXT := CASE WHEN p_data ? 'serialNo' THEN p_data->>'serialNo' END;
+    v_material TEXT := concat_ws(' - ', p_data->>'type', p_data->>'subtype');
+BEGIN
+    IF p_key IS NULL OR (p_quantity = 0 AND p_value = 0) THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO stock_movements (stock_key, material, serial_no, kind, quantity, value, invoice)
+    VALUES (p_key, v_material, v_serial_no, p_kind, p_quantity, p_value, p_data->>'invoice');
+
+    INSERT INTO stock_balances AS b (stock_key, material, type, subtype, serial_no, quantity, value)
+    VALUES (p_key, v_material, p_data->>'type', p_data->>'subtype', v_serial_no, p_quantity, p_value)
+    ON CONFLICT (stock_key) DO UPDATE SET
+        quantity = b.quantity + EXCLUDED.quantity,
+        value = b.value + EXCLUDED.value,
+        updated_at = now();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION record_stock_movement() RETURNS trigger AS $$
+DECLARE
+    -- Handlers may name the movement (SET LOCAL gew.movement_kind = 'stocktake')
+    v_kind TEXT := NULLIF(current_setting('gew.movement_kind', true), '');
+    v_old_qty NUMERIC;
+    v_old_value NUMERIC;
+    v_new_qty NUMERIC;
+    v_new_value NUMERIC;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        v_old_qty := parse_numeric(OLD.data->>'quantity');
+        v_old_value := v_old_qty * parse_numeric(OLD.data->>'price');
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        v_new_qty := parse_numeric(NEW.data->>'quantity');
+        v_new_value := v_new_qty * parse_numeric(NEW.data->>'price');
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        PERFORM apply_stock_movement(NEW.key, NEW.data, v_new_qty, v_new_value, COALESCE(v_kind, 'receipt'));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM apply_stock_movement(OLD.key, OLD.data, -v_old_qty, -v_old_value, COALESCE(v_kind, 'removal'));
+    ELSIF OLD.key IS DISTINCT FROM NEW.key THEN
+        PERFORM apply_stock_movement(OLD.key, OLD.data, -v_old_qty, -v_old_value, COALESCE(v_kind, 'adjustment'));
+        PERFORM apply_stock_movement(NEW.key, NEW.data, v_new_qty, v_new_value, COALESCE(v_kind, 'adjustment'));
+    ELSE
+        PERFORM apply_stock_movement(
+            NEW.key, NEW.data, v_new_qty - v_old_qty, v_new_value - v_old_value,
+            COALESCE(v_kind, CASE WHEN v_new_qty < v_old_qty THEN 'issue' ELSE 'adjustment' END)
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Opening balances for the stock already on hand
+LOCK TABLE stock IN SHARE MODE;
+
+INSERT INTO stock_movements (stock_key, material, serial_no, kind, quantity, value, invoice)
+SELECT key, concat_ws(' - ', data->>'type', data->>'subtype'),
+       CASE WHEN data ? 'serialNo' THEN data->>'serialNo' END,
+       'opening', parse_numeric(data->>'quantity'),
+       parse_numeric(data->>'quantity') * parse_numeric(data->>'price'), data->>'invoice'
+FROM stock
+WHERE key IS NOT NULL;
+
+INSERT INTO stock_balances (stock_key, material, type, subtype, serial_no, quantity, value)
+SELECT key, min(concat_ws(' - ', data->>'type', data->>'subtype')), min(data->>'type'), min(data->>'subtype'),
+       min(CASE WHEN data ? 'serialNo' THEN data->>'serialNo' END),
+       sum(parse_numeric(data->>'quantity')),
+       sum(parse_numeric(data->>'quantity') * parse_numeric(data->>'price'))
+FROM stock
+WHERE key IS NOT NULL
+GROUP BY key
+ON CONFLICT (stock_key) DO NOTHING;
+
+CREATE TRIGGER stock_record_movement AFTER INSERT OR UPDATE OR DELETE ON stock
+    FOR EACH ROW EXECUTE FUNCTION record_stock_movement();
@@ -0,0 +1,6 @@
+-- no-transaction
+-- /dashboard/summary counts recent ledger movements by created_at.
+-- If a build is interrupted, drop the INVALID index and re-run.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS stock_movements_created_at_idx
+    ON stock_movements (created_at);
@@ -0,0 +1,105 @@
+-- Row-level change tracking for /sync (app.py). Every tracked row records
+-- when and by which transaction it was last written; deletes leave a
+-- tombstone. Sync tokens are transaction ids rather than values from a
+-- plain sequence: a sequence value taken by a transaction that commits
+-- late can fall behind a token already handed out, but any transaction a
+-- /sync snapshot could not see has an id >= that snapshot's xmin.
+--
+-- Rows that predate this migration keep NULLs and only come back from a
+-- full sync (no token), which is the only way a client can have missed them.
+
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+    table_name TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    deleted_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    change_xid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    PRIMARY KEY (table_name, row_key)
+);
+
+CREATE INDEX IF NOT EXISTS sync_tombstones_change_idx ON sync_tombstones (table_name, change_xid);
+
+-- BEFORE INSERT OR UPDATE; TG_ARGV[0] names the table's key column
+CREATE OR REPLACE FUNCTION track_row_change() RETURNS trigger AS $$
+DECLARE
+    v_old_key TEXT;
+    v_new_key TEXT := to_jsonb(NEW) ->> TG_ARGV[0];
+BEGIN
+    NEW.updated_at := now();
+    NEW.change_xid := pg_current_xact_id();
+
+    IF TG_OP = 'UPDATE' THEN
+        v_old_key := to_jsonb(OLD) ->> TG_ARGV[0];
+        IF v_old_key IS NOT DISTINCT FROM v_new_key THEN
+            RETURN NEW;
+        END IF;
+        IF v_old_key IS NOT NULL THEN
+            INSERT INTO sync_tombstones (table_name, row_key) VALUES (TG_TABLE_NAME, v_old_key)
+            ON CONFLICT (table_name, row_key) DO UPDATE SET
+                deleted_at = now(), change_xid = pg_current_xact_id();
+        END IF;
+    END IF;
+    -- A key that comes back is a live row again
+    DELETE FROM sync_tombstones WHERE table_name = TG_TABLE_NAME AND row_key = v_new_key;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- AFTER DELETE, per row
+CREATE OR REPLACE FUNCTION record_tombstone() RETURNS trigger AS $$
+DECLARE
+    v_key TEXT := to_jsonb(OLD) ->> TG_ARGV[0];
+BEGIN
+    IF v_key IS NOT NULL THEN
+        INSERT INTO sync_tombstones (table_name, row_key) VALUES (TG_TABLE_NAME, v_key)
+        ON CONFLICT (table_name, row_key) DO UPDATE SET
+            deleted_at = now(), change_xid = pg_current_xact_id();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- BEFORE TRUNCATE: row triggers don't fire, so tombstone every key up front
+CREATE OR REPLACE FUNCTION record_truncate_tombstones() RETURNS trigger AS $$
+BEGIN
+    EXECUTE format(
+        'INSERT INTO sync_tombstones (table_name, row_key)
+         SELECT %L, %I::text FROM %I WHERE %I IS NOT NULL
+         ON CONFLICT (table_name, row_key) DO UPDATE SET
+             deleted_at = now(), change_xid = pg_current_xact_id()',
+        TG_TABLE_NAME, TG_ARGV[0], TG_TABLE_NAME, TG_ARGV[0]
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t RECORD;
+BEGIN
+    FOR t IN SELECT * FROM (VALUES
+        ('jobs', 'serial_no'),
+        ('stock', 'key'),
+        ('indent_stock', 'key'),
+        ('materials', 'id'),
+        ('job_indents', 'id'),
+        ('incoming_materials', 'id'),
+        ('outgoing_materials', 'id')
+    ) AS v (table_name, key_column)
+    LOOP
+        -- No defaults: the trigger fills both, and existing rows need no rewrite
+        EXECUTE format('ALTER TABLE %I ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ', t.table_name);
+        EXECUTE format('ALTER TABLE %I ADD COLUMN IF NOT EXISTS change_xid XID8', t.table_name);
+        EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON %I (change_xid)',
+                       t.table_name || '_change_xid_idx', t.table_name);
+        EXECUTE format('CREATE TRIGGER %I BEFORE INSERT OR UPDATE ON %I
+                        FOR EACH ROW EXECUTE FUNCTION track_row_change(%L)',
+                       t.table_name || '_track_change', t.table_name, t.key_column);
+        EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON %I
+                        FOR EACH ROW EXECUTE FUNCTION record_tombstone(%L)',
+                       t.table_name || '_tombstone', t.table_name, t.key_column);
+        EXECUTE format('CREATE TRIGGER %I BEFORE TRUNCATE ON %I
+                        FOR EACH STATEMENT EXECUTE FUNCTION record_truncate_tombstones(%L)',
+                       t.table_name || '_truncate_tombstones', t.table_name, t.key_column);
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,48 @@
+-- Row change events for the /changes stream (app.py), sent on the
+-- change_feed channel. Like the cache invalidations (migrations/009) they
+-- come from triggers, so every writer is covered and listeners only hear
+-- about committed changes. TG_ARGV[0] names the table's key column.
+CREATE OR REPLACE FUNCTION notify_row_change() RETURNS trigger AS $$
+DECLARE
+    v_row JSONB := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+BEGIN
+    PERFORM pg_notify('change_feed', json_build_object(
+        'table', TG_TABLE_NAME,
+        'op', lower(TG_OP),
+        'key', v_row ->> TG_ARGV[0],
+        'serial_no', coalesce(v_row ->> 'serial_no', v_row ->> 'jobid', v_row -> 'data' ->> 'serialNo')
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_truncate() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('change_feed', json_build_object('table', TG_TABLE_NAME, 'op', 'truncate')::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t RECORD;
+BEGIN
+    FOR t IN SELECT * FROM (VALUES
+        ('jobs', 'serial_no'),
+        ('stock', 'key'),
+        ('indent_stock', 'key'),
+        ('materials', 'id'),
+        ('job_indents', 'id'),
+        ('incoming_materials', 'id'),
+        ('outgoing_materials', 'id')
+    ) AS v (table_name, key_column)
+    LOOP
+        EXECUTE format('CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE ON %I
+                        FOR EACH ROW EXECUTE FUNCTION notify_row_change(%L)',
+                       t.table_name || '_notify_change', t.table_name, t.key_column);
+        EXECUTE format('CREATE TRIGGER %I AFTER TRUNCATE ON %I
+                        FOR EACH STATEMENT EXECUTE FUNCTION notify_truncate()',
+                       t.table_name || '_notify_truncate', t.table_name);
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,37 @@
+-- no-transaction
+-- Indexes behind /search/jobs and /search/materials (app.py). The searched
+-- text is an expression index over an IMMUTABLE function rather than a
+-- stored column, so no table is rewritten, and the queries call the same
+-- function so the planner can use the indexes:
+--   * trigram GIN for substring (LIKE '%q%') and typo-tolerant matching
+--   * text_pattern_ops btree for prefixes too short to have trigrams
+-- Built CONCURRENTLY so writes carry on meanwhile.
+-- If a build is interrupted, drop the INVALID index and re-run.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE OR REPLACE FUNCTION job_search_text(serial_no TEXT, data JSONB) RETURNS TEXT AS $$
+    SELECT lower(
+        serial_no
+        || ' ' || coalesce(data ->> 'purchaserName', '')
+        || ' ' || coalesce(data ->> 'purchaserReference', '')
+        || ' ' || coalesce(data ->> 'jobType', '')
+        || ' ' || coalesce(data ->> 'kva', '')
+    )
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION material_search_text(type TEXT, subtype TEXT) RETURNS TEXT AS $$
+    SELECT lower(coalesce(type, '') || ' ' || coalesce(subtype, ''))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS jobs_search_trgm_idx
+    ON jobs USING gin (job_search_text(serial_no, data) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS jobs_serial_no_prefix_idx
+    ON jobs (lower(serial_no) text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS materials_search_trgm_idx
+    ON materials USING gin (material_search_text(type, subtype) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS materials_search_prefix_idx
+    ON materials (material_search_text(type, subtype) text_pattern_ops);
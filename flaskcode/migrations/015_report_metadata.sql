@@ -0,0 +1,18 @@
+-- Reports as metadata columns plus a gzip-compressed JSON body, so the
+-- /reports listing reads a few short columns and a single report is
+-- fetched (and inflated) only when opened. Bodies are written by app.py
+-- (report_row); 016 moves the existing `data` blobs across.
+
+ALTER TABLE reports
+    ADD COLUMN IF NOT EXISTS serial_no TEXT,
+    ADD COLUMN IF NOT EXISTS report_type TEXT NOT NULL DEFAULT 'test',
+    ADD COLUMN IF NOT EXISTS saved_by TEXT,
+    ADD COLUMN IF NOT EXISTS remark TEXT,
+    ADD COLUMN IF NOT EXISTS saved_at TEXT,  -- the client's timestamp, as shown in the app
+    ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    ADD COLUMN IF NOT EXISTS size INTEGER,   -- uncompressed body bytes
+    ADD COLUMN IF NOT EXISTS body BYTEA;
+
+ALTER TABLE reports ALTER COLUMN data DROP NOT NULL;
+
+CREATE INDEX IF NOT EXISTS reports_serial_no_idx ON reports (serial_no, id);
@@ -0,0 +1,51 @@
+# Moves each report's `data` blob into the metadata columns and compressed
+# body added by 015, in small committed batches so the app keeps serving.
+# Safe to interrupt and re-run; rows written by the old code while this
+# runs are picked up by the next batch.
+import json
+import os
+import time
+
+import psycopg2.extras
+
+from app import report_row
+
+BATCH_SIZE = int(os.getenv('BACKFILL_BATCH_SIZE', 200))
+BATCH_PAUSE = float(os.getenv('BACKFILL_BATCH_PAUSE', 0.05))
+
+
+def migrate(conn):
+    cur = conn.cursor()
+    total = 0
+    while True:
+        cur.execute(
+            '''
+            SELECT id, data::text FROM reports
+            WHERE body IS NULL AND data IS NOT NULL
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+            ''',
+            (BATCH_SIZE,)
+        )
+        rows = [dict(report_row(json.loads(data)), id=report_id) for report_id, data in cur.fetchall()]
+        if not rows:
+            conn.commit()
+            break
+        psycopg2.extras.execute_batch(
+            cur,
+            '''
+            UPDATE reports SET
+                serial_no = %(serial_no)s, report_type = %(report_type)s, saved_by = %(saved_by)s,
+                remark = %(remark)s, saved_at = %(saved_at)s,
+                created_at = coalesce(%(created_at)s, created_at),
+                size = %(size)s, body = %(body)s, data = NULL
+            WHERE id = %(id)s
+            ''',
+            rows
+        )
+        conn.commit()
+        total += len(rows)
+        time.sleep(BATCH_PAUSE)
+    print(f'  reports: {total} rows compressed')
+    cur.close()
@@ -0,0 +1,46 @@
+-- Bump table_versions (migrations/006) at commit rather than in every write
+-- statement. The bump's UPDATE locks the table's version row, so with the
+-- statement triggers each writer to a table waited for the previous one to
+-- commit. Deferred constraint triggers run just before commit, so the row
+-- is only held while the transaction commits. They are row-level only, so
+-- the first row of each table per transaction bumps it and the rest return
+-- early. TRUNCATE cannot be deferred and keeps the statement trigger.
+--
+-- The bump commits together with the data it versions, so the ETags read
+-- by app.py and asgi_app.py are unchanged in meaning.
+
+CREATE OR REPLACE FUNCTION bump_table_version_at_commit() RETURNS trigger AS $$
+DECLARE
+    v_bumped TEXT := 'table_versions.bumped_' || TG_TABLE_NAME;
+BEGIN
+    -- set_config(..., true) lasts until the end of the transaction
+    IF current_setting(v_bumped, true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM set_config(v_bumped, 'on', true);
+    UPDATE table_versions SET version = nextval('table_version_seq')
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'users', 'reports', 'jobs', 'materials', 'incoming_materials',
+        'outgoing_materials', 'stock', 'indent_stock', 'job_indents'
+    ]
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_bump_version', t);
+        EXECUTE format('CREATE CONSTRAINT TRIGGER %I AFTER INSERT OR UPDATE OR DELETE ON %I
+                        DEFERRABLE INITIALLY DEFERRED
+                        FOR EACH ROW EXECUTE FUNCTION bump_table_version_at_commit()',
+                       t || '_bump_version', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER TRUNCATE ON %I
+                        FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()',
+                       t || '_bump_version_truncate', t);
+    END LOOP;
+END;
+$$;
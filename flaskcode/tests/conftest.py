@@ -0,0 +1,116 @@
+import os
+import re
+import sys
+
+import psycopg2.errors
+import psycopg2.extensions
+import pytest
+
+# app.py is a top-level module next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+
+IDLE = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+INTRANS = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+INERROR = psycopg2.extensions.TRANSACTION_STATUS_INERROR
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        query = ' '.join(str(query).split())
+        self.conn.executed.append((query, params))
+        if query.startswith('ROLLBACK TO SAVEPOINT'):
+            self.conn.status = INTRANS
+            return
+        if self.conn.status == INERROR:
+            raise psycopg2.errors.InFailedSqlTransaction('current transaction is aborted')
+        self.conn.status = INTRANS
+        result = self.conn.respond(query, params)
+        if isinstance(result, Exception):
+            self.conn.status = INERROR
+            raise result
+        self.rows = list(result)
+        self.rowcount = len(self.rows)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    # Answers each query from `responses`: (regex, rows | exception | callable)
+    # pairs, the first regex found in the query wins; anything else gets [].
+    def __init__(self):
+        self.responses = []
+        self.executed = []
+        self.status = IDLE
+        self.autocommit = False
+        self.closed = False
+
+    def respond(self, query, params):
+        for pattern, result in self.responses:
+            if re.search(pattern, query):
+                return result(self, query, params) if callable(result) else result
+        return []
+
+    def queries(self, pattern):
+        return [q for q, _ in self.executed if re.search(pattern, q)]
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def commit(self):
+        self.status = IDLE
+
+    def rollback(self):
+        self.status = IDLE
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn):
+        conn.rollback()
+
+    def stats(self):
+        return {'in_use': 0, 'idle': 1}
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    conn = FakeConnection()
+    monkeypatch.setattr(app_module, 'get_pool', lambda: FakePool(conn))
+    monkeypatch.setattr(app_module, 'ensure_listener', lambda: None)
+    app_module.reference_cache.clear()
+    app_module.summary_cache.clear()
+    return conn
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
@@ -0,0 +1,79 @@
+import psycopg2.errors
+
+from conftest import IDLE
+
+VERSIONS = (r'FROM table_versions', [('jobs', 7), ('stock', 3), ('materials', 2)])
+STOCK_SCAN = (r'SELECT is_job_specific, key', [
+    (False, 'Oil - A', '{"key":"Oil - A"}'),
+    (True, 'Oil - B - J1', '{"key":"Oil - B - J1"}'),
+])
+
+
+def batch(client, *paths):
+    resp = client.post('/batch', json={'requests': list(paths)})
+    assert resp.status_code == 200
+    return resp.get_json()['responses']
+
+
+def test_both_stock_lists_share_one_scan(fake_db, client):
+    fake_db.responses = [VERSIONS, STOCK_SCAN]
+    general, job_specific = batch(client, '/stock?isJobSpecific=false', '/stock?isJobSpecific=true')
+
+    assert general['body'] == [{'key': 'Oil - A'}]
+    assert job_specific['body'] == [{'key': 'Oil - B - J1'}]
+    assert general['etag'] == job_specific['etag'] == 'stock.3'
+    assert len(fake_db.queries(r'FROM stock\b')) == 1
+
+
+def test_runs_in_one_read_only_snapshot(fake_db, client):
+    fake_db.responses = [VERSIONS, (r'FROM jobs', [('J1', '{"serialNo":"J1"}')])]
+    (jobs,) = batch(client, '/jobs/open')
+
+    assert jobs['status'] == 200 and jobs['body'] == [{'serialNo': 'J1'}]
+    assert fake_db.queries(r'^SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY$')
+    assert fake_db.queries(r'^SAVEPOINT batch_item$')
+    assert fake_db.status == IDLE  # rolled back at the end
+
+
+def test_rejects_routes_outside_the_allowlist(fake_db, client):
+    fake_db.responses = [VERSIONS]
+    changes, health, report, missing = batch(client, '/changes', '/health', '/reports/1', '/nope')
+
+    assert changes['status'] == 400 and 'cannot be batched' in changes['body']['error']
+    assert health['status'] == 400
+    assert report['status'] == 400
+    assert missing['status'] == 404
+
+
+def test_failing_item_does_not_abort_the_rest(fake_db, client):
+    fake_db.responses = [
+        VERSIONS,
+        (r'FROM jobs', psycopg2.errors.QueryCanceled('canceling statement due to statement timeout')),
+        (r'FROM materials', [('Oil', '{"type":"Oil"}')]),
+    ]
+    jobs, materials = batch(client, '/jobs/open', '/materials')
+
+    assert jobs['status'] == 500
+    assert materials['status'] == 200 and materials['body'] == [{'type': 'Oil'}]
+    assert fake_db.queries(r'^ROLLBACK TO SAVEPOINT batch_item$')
+
+
+def test_cached_routes_read_the_snapshot(fake_db, client):
+    fake_db.responses = [VERSIONS, (r'FROM materials', [('Oil', '{"type":"Oil"}')])]
+    batch(client, '/materials')
+    batch(client, '/materials')
+
+    assert len(fake_db.queries(r'FROM materials')) == 2
+
+
+def test_items_after_a_lost_snapshot_fail(fake_db, client):
+    def end_transaction(conn, query, params):
+        conn.rollback()  # as a view's own error handling might
+        return []
+
+    fake_db.responses = [VERSIONS, (r'FROM jobs', end_transaction)]
+    jobs, materials = batch(client, '/jobs/open', '/materials')
+
+    assert jobs['status'] == 200
+    assert materials['status'] == 500 and 'snapshot lost' in materials['body']['error']
+    assert not fake_db.queries(r'FROM materials')
@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    monkeypatch.setattr(app_module, '_bcrypt_slots', threading.BoundedSemaphore(1))
+    release = threading.Event()
+    yield release
+    release.set()
+
+
+def test_full_executor_raises_hashing_busy(one_slot):
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        one_slot.wait()
+
+    blocker = threading.Thread(target=app_module.run_bcrypt, args=(hold,))
+    blocker.start()
+    assert started.wait(1)
+
+    with pytest.raises(app_module.HashingBusy):
+        app_module.run_bcrypt(lambda: True)
+
+    one_slot.set()
+    blocker.join()
+    assert app_module.run_bcrypt(lambda: 'done') == 'done'
+
+
+def test_slow_hash_times_out_and_keeps_its_slot(one_slot, monkeypatch):
+    monkeypatch.setattr(app_module, 'BCRYPT_TIMEOUT', 0.05)
+    with pytest.raises(app_module.HashingBusy, match='timed out'):
+        app_module.run_bcrypt(one_slot.wait)
+    with pytest.raises(app_module.HashingBusy, match='Too many'):
+        app_module.run_bcrypt(lambda: True)
+
+
+def test_login_while_busy_is_a_503(one_slot, fake_db, client):
+    fake_db.responses = [(r'FROM users', [{'username': 'amy', 'password': '$2b$04$x', 'role': 'user'}])]
+    app_module._bcrypt_slots.acquire()
+    resp = client.post('/users/login', json={'username': 'amy', 'password': 'secret'})
+    app_module._bcrypt_slots.release()
+
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After'] == '1'
@@ -0,0 +1,37 @@
+from app import app, change_feed
+
+
+def test_changes_streams_events():
+    client = app.test_client()
+    before = change_feed.stats()['subscribers']
+
+    resp = client.get('/changes', buffered=False)
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/event-stream'
+    assert resp.headers['Cache-Control'] == 'no-cache'
+    assert next(resp.response) == b'retry: 5000\n\n'
+    assert change_feed.stats()['subscribers'] == before + 1
+
+    resp.close()
+    assert change_feed.stats()['subscribers'] == before
+
+
+def test_changes_rejects_unknown_tables():
+    resp = app.test_client().get('/changes?tables=nope')
+    assert resp.status_code == 400
+
+
+def test_changes_over_the_cap_get_503(monkeypatch):
+    monkeypatch.setattr(change_feed, 'max_subscribers', change_feed.stats()['subscribers'] + 1)
+    client = app.test_client()
+
+    first = client.get('/changes', buffered=False)
+    second = client.get('/changes', buffered=False)
+    assert first.status_code == 200
+    assert second.status_code == 503
+    assert second.headers['Retry-After'] == '30'
+
+    first.close()
+    third = client.get('/changes', buffered=False)
+    assert third.status_code == 200
+    third.close()
@@ -0,0 +1,81 @@
+import gzip
+import os
+import zlib
+
+import pytest
+from werkzeug.http import parse_etags
+
+import app as app_module
+
+
+def post_gzipped(client, path, payload):
+    return client.post(path, data=gzip.compress(payload), headers={
+        'Content-Type': 'application/json', 'Content-Encoding': 'gzip',
+    })
+
+
+def test_compressed_body_over_the_limit_is_rejected_unread(fake_db, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_COMPRESSED_BODY', 64)
+    resp = post_gzipped(client, '/reports', os.urandom(1024))
+
+    assert resp.status_code == 413
+    assert not fake_db.executed
+
+
+def test_compressed_body_is_inflated_for_the_view(fake_db, client):
+    fake_db.responses = [(r'INSERT INTO reports', [(7,)])]
+    resp = post_gzipped(client, '/reports', b'{"data": {"serialNo": "J1", "reportType": "test"}}')
+
+    assert resp.status_code == 201 and resp.get_json()['id'] == 7
+
+
+def test_decompress_stops_at_the_limit(monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_DECOMPRESSED_BODY', 1024 * 1024)
+    bomb = gzip.compress(bytes(8 * 1024 * 1024))
+
+    assert len(bomb) < 64 * 1024
+    assert app_module._decompress(bomb, 'gzip') is None
+    assert app_module._decompress(gzip.compress(bytes(1024 * 1024)), 'gzip') == bytes(1024 * 1024)
+
+
+def test_decompress_rejects_truncated_gzip():
+    body = gzip.compress(os.urandom(4096))
+    with pytest.raises(zlib.error):
+        app_module._decompress(body[:-8], 'gzip')
+
+
+@pytest.mark.skipif(app_module.brotli is None, reason='brotli >= 1.1 not installed')
+def test_decompress_brotli_limit_and_truncation(monkeypatch):
+    brotli = app_module.brotli
+    monkeypatch.setattr(app_module, 'MAX_DECOMPRESSED_BODY', 1024 * 1024)
+
+    assert app_module._decompress(brotli.compress(bytes(8 * 1024 * 1024)), 'br') is None
+    with pytest.raises(brotli.error):
+        app_module._decompress(brotli.compress(os.urandom(4096))[:-8], 'br')
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('"jobs.7"', 'jobs.7'),
+    ('"jobs.7-gzip"', 'jobs.7-gzip'),
+    ('"jobs.6-gzip", "jobs.7-br"', 'jobs.7-br'),
+    ('"jobs.6", "jobs.6-gzip"', None),
+    ('"jobs.7-deflate"', None),
+    ('*', 'jobs.7'),
+])
+def test_matching_etag(header, expected):
+    assert app_module.matching_etag('jobs.7', parse_etags(header)) == expected
+
+
+def test_gzipped_response_etag_revalidates(fake_db, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'COMPRESS_MIN_SIZE', 1)
+    fake_db.responses = [
+        (r'FROM table_versions', [('jobs', 7)]),
+        (r'FROM jobs', [('J1', '{"serialNo":"J1"}')]),
+    ]
+    resp = client.get('/jobs/open', headers={'Accept-Encoding': 'gzip'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert resp.headers['ETag'] == '"jobs.7-gzip"'
+
+    resp = client.get('/jobs/open', headers={'Accept-Encoding': 'gzip', 'If-None-Match': '"jobs.7-gzip"'})
+    assert resp.status_code == 304
+    assert resp.headers['ETag'] == '"jobs.7-gzip"'
@@ -0,0 +1,16 @@
+VERSIONS = (r'FROM table_versions', [('jobs', 7), ('stock', 3), ('indent_stock', 2), ('day', 20261018)])
+SUMMARY = (r'jsonb_build_object', [('{"jobs": {"open": 1}}',)])
+
+
+def test_summary_etag_changes_with_the_day(fake_db, client):
+    fake_db.responses = [VERSIONS, SUMMARY]
+    resp = client.get('/dashboard/summary')
+
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] == '"jobs.7-stock.3-indent_stock.2-day.20261018"'
+    assert fake_db.queries(r"FROM table_versions .* UNION ALL SELECT 'day', to_char\(current_date")
+
+
+def test_summary_rejects_an_empty_window(fake_db, client):
+    fake_db.responses = [VERSIONS, SUMMARY]
+    assert client.get('/dashboard/summary?days=0').status_code == 400
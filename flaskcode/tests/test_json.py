@@ -0,0 +1,31 @@
+import datetime
+import decimal
+import uuid
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+from app import OrjsonProvider, app, orjson
+
+pytestmark = pytest.mark.skipif(orjson is None, reason='orjson not installed')
+
+VALUES = {
+    'naive': datetime.datetime(2024, 3, 1, 12, 30, 5),
+    'aware': datetime.datetime(2024, 3, 1, 12, 30, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30))),
+    'date': datetime.date(2024, 3, 1),
+    'decimal': decimal.Decimal('1250.50'),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+}
+
+
+@pytest.mark.parametrize('name', VALUES)
+def test_orjson_matches_flask_default(name):
+    value = {'v': VALUES[name]}
+    expected = DefaultJSONProvider(app).loads(DefaultJSONProvider(app).dumps(value))
+    assert OrjsonProvider(app).loads(OrjsonProvider(app).dumps(value)) == expected
+
+
+def test_orjson_response_uses_http_dates():
+    with app.app_context():
+        resp = OrjsonProvider(app).response({'at': VALUES['naive']})
+    assert resp.get_json() == {'at': 'Fri, 01 Mar 2024 12:30:05 GMT'}
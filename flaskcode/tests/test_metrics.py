@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+import app as app_module
+
+
+def test_query_stats_count_rows_returned_and_affected():
+    stats = app_module.QueryStats(keep_sql=True)
+    stats.record(SimpleNamespace(description=[('id',)], rowcount=2, query=b'SELECT id FROM jobs'), 0.001)
+    stats.record(SimpleNamespace(description=None, rowcount=3, query=b'UPDATE stock SET quantity = 0'), 0.002)
+    stats.record(SimpleNamespace(description=None, rowcount=-1, query=b'SET LOCAL statement_timeout = 0'), 0.0)
+
+    assert stats.queries == 3
+    assert stats.rows == 5
+    assert [sql for _, sql in stats.statements][1] == 'UPDATE stock SET quantity = 0'
+
+
+def test_metrics_route_renders_pool_gauges(fake_db, client):
+    client.get('/materials')
+    body = client.get('/metrics').get_data(as_text=True)
+
+    assert 'gew_http_requests_total{method="GET",route="/materials",status="200"}' in body
+    assert 'gew_db_pool_connections{state="idle"} 1' in body
+    assert 'gew_db_pool_waiting' not in body  # FakePool reports no wait stats
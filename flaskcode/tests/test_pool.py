@@ -0,0 +1,43 @@
+import pytest
+
+import app as app_module
+from conftest import FakeConnection
+
+
+@pytest.fixture
+def one_conn_pool(monkeypatch):
+    monkeypatch.setattr(app_module, '_connect', FakeConnection)
+    return app_module.ConnectionPool(0, 1, 0.05, 30)
+
+
+def test_checkout_times_out_when_the_pool_is_exhausted(one_conn_pool):
+    conn = one_conn_pool.getconn()
+    with pytest.raises(app_module.PoolTimeout):
+        one_conn_pool.getconn()
+
+    stats = one_conn_pool.stats()
+    assert stats['timeouts'] == 1
+    assert stats['waiting'] == 0
+    assert stats['in_use'] == 1
+
+    one_conn_pool.putconn(conn)
+    assert one_conn_pool.getconn() is conn
+
+
+def test_pool_timeout_is_a_503(one_conn_pool, monkeypatch, client):
+    one_conn_pool.getconn()
+    monkeypatch.setattr(app_module, 'get_pool', lambda: one_conn_pool)
+    monkeypatch.setattr(app_module, 'ensure_listener', lambda: None)
+    resp = client.get('/jobs/open')
+
+    assert resp.status_code == 503
+    assert 'No database connection available' in resp.get_json()['error']
+
+
+def test_broken_connections_are_not_reused(one_conn_pool):
+    conn = one_conn_pool.getconn()
+    conn.close()
+    one_conn_pool.putconn(conn)
+
+    assert one_conn_pool.stats()['discarded'] == 1
+    assert one_conn_pool.getconn() is not conn
@@ -0,0 +1,61 @@
+import time
+
+import app as app_module
+
+ReferenceCache = app_module.ReferenceCache
+
+
+def test_invalidate_drops_only_that_table():
+    cache = ReferenceCache(60, 10)
+    cache.put('materials', '/materials?', 'm', cache.generation('materials'))
+    cache.put('users', '/users?', 'u', cache.generation('users'))
+    cache.invalidate('materials')
+
+    assert cache.get('materials', '/materials?') is None
+    assert cache.get('users', '/users?') == 'u'
+
+
+def test_value_built_across_an_invalidation_is_not_stored():
+    cache = ReferenceCache(60, 10)
+    generation = cache.generation('materials')
+    cache.invalidate('materials')  # a write lands while the view runs
+    cache.put('materials', '/materials?', 'stale', generation)
+    assert cache.get('materials', '/materials?') is None
+
+    cache.clear()  # e.g. the listener reconnected
+    generation = cache.generation('materials')
+    cache.put('materials', '/materials?', 'fresh', generation)
+    assert cache.get('materials', '/materials?') == 'fresh'
+
+
+def test_entries_expire_and_the_oldest_is_evicted():
+    cache = ReferenceCache(0.01, 2)
+    for path in ('a', 'b', 'c'):
+        cache.put('materials', path, path, 0)
+    assert cache.get('materials', 'a') is None  # evicted
+    assert cache.get('materials', 'c') == 'c'
+
+    time.sleep(0.02)
+    assert cache.get('materials', 'c') is None
+
+
+def test_disabled_until_listening():
+    assert not ReferenceCache(60, 10).enabled()
+    assert ReferenceCache(60, 10, requires_listener=False).enabled()
+    assert not ReferenceCache(0, 10, requires_listener=False).enabled()
+
+
+def test_cached_route_is_reread_after_a_notify(fake_db, client, monkeypatch):
+    monkeypatch.setattr(app_module.reference_cache, 'listening', True)
+    fake_db.responses = [
+        (r'FROM table_versions', [('materials', 2)]),
+        (r'FROM materials', [('Oil', '{"type":"Oil"}')]),
+    ]
+    client.get('/materials')
+    client.get('/materials')
+    assert len(fake_db.queries(r'FROM materials')) == 1
+
+    app_module.reference_cache.invalidate('materials')
+    resp = client.get('/materials')
+    assert resp.get_json() == [{'type': 'Oil'}]
+    assert len(fake_db.queries(r'FROM materials')) == 2
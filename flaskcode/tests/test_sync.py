@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+import app as app_module
+from app import InvalidParam, sync_query
+
+
+def test_without_since_everything_is_returned():
+    query, params, full = sync_query({'tables': 'jobs'})
+
+    assert full is True
+    assert params == []
+    assert query.startswith('SELECT pg_snapshot_xmin(pg_current_snapshot())::text')
+    assert 'change_xid' not in query
+    assert "'deleted', '[]'::json" in query
+
+
+def test_since_filters_rows_and_tombstones_by_the_token():
+    query, params, full = sync_query({'since': '1234', 'tables': 'jobs,stock'})
+
+    assert full is False
+    assert params == ['1234'] * 4  # changed and deleted, per table
+    assert query.count('%s::text::xid8') == 4
+    assert "table_name = 'jobs'" in query and "table_name = 'stock'" in query
+
+
+@pytest.mark.parametrize('args', [
+    {'since': 'abc'}, {'since': '-1'}, {'since': '1.5'}, {'since': ''}, {'tables': 'jobs,nope'}, {'tables': ','},
+])
+def test_bad_tokens_and_tables_are_rejected(args):
+    with pytest.raises(InvalidParam):
+        sync_query(args)
+
+
+def test_sync_returns_the_next_token(fake_db, client):
+    fake_db.responses = [
+        (r'FROM table_versions', [('jobs', 1)]),
+        (r'pg_snapshot_xmin', [('900', '{"jobs": {"changed": [], "deleted": ["J1"]}}')]),
+    ]
+    resp = client.get('/sync?since=850&tables=jobs')
+    body = json.loads(resp.get_data())
+
+    assert resp.status_code == 200
+    assert body == {'token': '900', 'full': False, 'tables': {'jobs': {'changed': [], 'deleted': ['J1']}}}
+    assert fake_db.executed[-1][1] == ['850', '850']
+    assert app_module.sync_body('1', True, '{}') == '{"token":"1","full":true,"tables":{}}'
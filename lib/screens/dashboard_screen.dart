@@ -14,16 +14,20 @@ class DashboardScreen extends StatefulWidget {
   State<DashboardScreen> createState() => _DashboardScreenState();
 }
 
-class _DashboardScreenState extends State<DashboardScreen> {
+class _DashboardScreenState extends State<DashboardScreen>
+    with WidgetsBindingObserver {
   String _role = '';
   String _username = '';
   Timer? _updateTimer;
   int timerDuration = 300;
+  Map<String, dynamic>? _summary;
 
   @override
   void initState() {
     super.initState();
+    WidgetsBinding.instance.addObserver(this);
     _loadUser();
+    _loadSummary();
     checkForUpdatesIfNeeded();
 
     // Then check every hour
@@ -40,6 +44,16 @@ class _DashboardScreenState extends State<DashboardScreen> {
     });
   }
 
+  // Counts and totals aggregated by the server (/dashboard/summary)
+  Future<void> _loadSummary() async {
+    try {
+      final summary = await ApiService.getDashboardSummary();
+      if (mounted) setState(() => _summary = summary);
+    } catch (e) {
+      // Keep the last summary; the buttons work without it
+    }
+  }
+
   Future<void> checkForUpdatesIfNeeded() async {
     final SharedPreferences prefs = await SharedPreferences.getInstance();
     final int now = DateTime.now().millisecondsSinceEpoch ~/ 1000;
@@ -100,6 +114,7 @@ class _DashboardScreenState extends State<DashboardScreen> {
               // Pop the dialog
               Navigator.pop(context);
               // Logout: clear prefs and go to login page
+              await ApiService.clearSession();
               final prefs = await SharedPreferences.getInstance();
               await prefs.clear();
               if (context.mounted) {
@@ -112,8 +127,27 @@ class _DashboardScreenState extends State<DashboardScreen> {
     );
   }
 
+  @override
+  void didChangeAppLifecycleState(AppLifecycleState state) {
+    if (state == AppLifecycleState.resumed) {
+      _resumeSession();
+      _loadSummary();
+    }
+  }
+
+  // Back from the background: re-check the session, log out if rejected
+  Future<void> _resumeSession() async {
+    if (!await ApiService.hasSessionToken()) return;
+    final user = await ApiService.resumeSession();
+    if (user != null || ApiService.sessionToken != null) return;
+    final prefs = await SharedPreferences.getInstance();
+    await prefs.clear();
+    if (mounted) context.go('/');
+  }
+
   @override
   void dispose() {
+    WidgetsBinding.instance.removeObserver(this);
     _updateTimer?.cancel(); // This disposes the timer!
     super.dispose();
   }
@@ -128,6 +162,7 @@ class _DashboardScreenState extends State<DashboardScreen> {
             icon: const Icon(Icons.logout),
             tooltip: 'Logout',
             onPressed: () async {
+              await ApiService.clearSession();
               final prefs = await SharedPreferences.getInstance();
               await prefs.clear();
               context.go('/');
@@ -148,6 +183,7 @@ class _DashboardScreenState extends State<DashboardScreen> {
                 ),
               ),
               const SizedBox(height: 20),
+              if (_summary != null) _buildSummaryCard(_summary!),
               ..._buildDashboardButtons(context),
             ],
           ),
@@ -156,6 +192,40 @@ class _DashboardScreenState extends State<DashboardScreen> {
     );
   }
 
+  Widget _buildSummaryCard(Map<String, dynamic> summary) {
+    final jobs = summary['jobs'];
+    final stock = summary['stock'];
+    final indents = summary['indents'];
+    final movements = summary['movements'];
+    final stockValue = (stock['value'] as num).toDouble();
+    final indentQty = (indents['quantity'] as num).toDouble();
+
+    return FractionallySizedBox(
+      widthFactor: 0.8,
+      child: Card(
+        margin: const EdgeInsets.only(bottom: 12),
+        child: Padding(
+          padding: const EdgeInsets.all(12),
+          child: Column(
+            crossAxisAlignment: CrossAxisAlignment.start,
+            children: [
+              Text('Jobs: ${jobs['open']} open, ${jobs['closed']} closed'),
+              Text('Stock value: ₹${stockValue.toStringAsFixed(2)}'),
+              Text(
+                'Pending indents: ${indents['keys']} items, '
+                'qty ${indentQty.toStringAsFixed(2)}',
+              ),
+              Text(
+                'Stock movements (last ${movements['days']} days): '
+                '${movements['total']}',
+              ),
+            ],
+          ),
+        ),
+      ),
+    );
+  }
+
   List<Widget> _buildDashboardButtons(BuildContext context) {
     List<Map<String, dynamic>> buttons = [
       {'label': 'Incoming Material Entry', 'route': '/incoming-material-entry'},
@@ -17,6 +17,22 @@ class _LoginScreenState extends State<LoginScreen> {
   bool _isLoading = false;
   String? _error;
 
+  @override
+  void initState() {
+    super.initState();
+    _resumeSession();
+  }
+
+  // Skip the login form when the saved session token is still valid
+  Future<void> _resumeSession() async {
+    final user = await ApiService.resumeSession();
+    if (user == null || !mounted) return;
+    final prefs = await SharedPreferences.getInstance();
+    await prefs.setString('username', user['username']);
+    await prefs.setString('role', user['role']);
+    if (mounted) context.go('/dashboard');
+  }
+
   void _login() async {
     setState(() {
       _isLoading = true;
@@ -26,7 +26,6 @@ class _MaterialIncomingScreenState extends State<MaterialIncomingScreen> {
 
   List<Map<String, dynamic>> _materialsRaw = [];
   List<String> _materials = [];
-  List<String> _jobNumbers = [];
   List<Map<String, dynamic>> _entries = [];
 
   String _role = '';
@@ -69,7 +68,6 @@ class _MaterialIncomingScreenState extends State<MaterialIncomingScreen> {
 
   Future<void> _loadData() async {
     final materials = await ApiService.getMaterials();
-    final jobs = await ApiService.getOpenJobs();
     setState(() {
       _materialsRaw = List<Map<String, dynamic>>.from(materials);
       _materials =
@@ -81,13 +79,15 @@ class _MaterialIncomingScreenState extends State<MaterialIncomingScreen> {
               .toSet()
               .toList()
             ..sort((a, b) => a.toLowerCase().compareTo(b.toLowerCase()));
-
-      _jobNumbers =
-          jobs.map<String>((job) => job['serialNo'].toString()).toList()
-            ..sort();
     });
   }
 
+  // Job pickers search on the server as the user types
+  Future<List<String>> _searchOpenJobNumbers(String filter) async {
+    final jobs = await ApiService.searchJobs(filter, openOnly: true);
+    return jobs.map<String>((job) => job['serialNo'].toString()).toList();
+  }
+
   Future<void> _loadEntries() async {
     final data = await ApiService.getMaterialIncomingEntries();
     List<Map<String, dynamic>> entries = List<Map<String, dynamic>>.from(data);
@@ -230,7 +230,7 @@ class _MaterialIncomingScreenState extends State<MaterialIncomingScreen> {
                 const SizedBox(height: 8),
                 if (entry['jobSpecific'] == true)
                   DropdownSearch<String>(
-                    items: List<String>.from(_jobNumbers),
+                    asyncItems: _searchOpenJobNumbers,
                     selectedItem: selectedJob,
                     dropdownDecoratorProps: const DropDownDecoratorProps(
                       dropdownSearchDecoration: InputDecoration(
@@ -240,6 +240,7 @@ class _MaterialIncomingScreenState extends State<MaterialIncomingScreen> {
                     ),
                     popupProps: const PopupProps.menu(
                       showSearchBox: true,
+                      isFilterOnline: true,
                       searchFieldProps: TextFieldProps(
                         decoration: InputDecoration(
                           hintText: "Search...",
@@ -386,7 +387,7 @@ class _MaterialIncomingScreenState extends State<MaterialIncomingScreen> {
                         Expanded(
                           child: DropdownSearch<String>(
                             selectedItem: _selectedJob,
-                            items: List<String>.from(_jobNumbers),
+                            asyncItems: _searchOpenJobNumbers,
                             dropdownDecoratorProps:
                                 const DropDownDecoratorProps(
                                   dropdownSearchDecoration: InputDecoration(
@@ -396,6 +397,7 @@ class _MaterialIncomingScreenState extends State<MaterialIncomingScreen> {
                                 ),
                             popupProps: const PopupProps.menu(
                               showSearchBox: true,
+                              isFilterOnline: true,
                               searchFieldProps: TextFieldProps(
                                 decoration: InputDecoration(
                                   hintText: "Search...",
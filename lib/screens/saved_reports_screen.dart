@@ -129,28 +129,36 @@ class _SavedReportsScreenState extends State<SavedReportsScreen> {
                         children: [
                           IconButton(
                             icon: const Icon(Icons.picture_as_pdf),
-                            onPressed: () {
-                              context.push('/preview', extra: report);
+                            onPressed: () async {
+                              final full = await ApiService.getReport(
+                                report['id'],
+                              );
+                              if (!context.mounted) return;
+                              context.push('/preview', extra: full);
                             },
                           ),
                           // EDIT: All users (including non-admins) can edit
                           if (savedBy == _username || _userRole == 'admin')
                             IconButton(
                               icon: const Icon(Icons.edit),
-                              onPressed: () {
-                                final max = report['tappingRangeMax'];
-                                final min = report['tappingRangeMin'];
-                                final step = report['stepVoltage'];
+                              onPressed: () async {
+                                final full = await ApiService.getReport(
+                                  report['id'],
+                                );
+                                if (!context.mounted) return;
+                                final max = full['tappingRangeMax'];
+                                final min = full['tappingRangeMin'];
+                                final step = full['stepVoltage'];
                                 final tapCount =
                                     ((max - min) / step).round() + 1;
 
                                 context.push(
                                   '/test_input_form',
                                   extra: {
-                                    'generalData': report,
+                                    'generalData': full,
                                     'tapCount': tapCount,
                                     'isEdit': true,
-                                    'testData': report['testData'],
+                                    'testData': full['testData'],
                                   },
                                 );
                               },
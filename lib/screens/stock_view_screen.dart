@@ -1,6 +1,7 @@
 import 'package:flutter/material.dart';
 import 'package:shared_preferences/shared_preferences.dart';
 import '../services/api_service.dart';
+import 'dart:async';
 import 'dart:convert';
 
 class StockViewScreen extends StatefulWidget {
@@ -24,24 +25,57 @@ class _StockViewScreenState extends State<StockViewScreen> {
   String _searchQuery = '';
   bool _indentSortByValue = true;
   bool _indentSortAsc = true;
+  Map<String, dynamic>? _summary;
+
+  StreamSubscription<Map<String, dynamic>>? _changes;
+  Timer? _reloadTimer;
 
   @override
   void initState() {
     super.initState();
     _initializeData();
+    // Refresh when another storekeeper changes stock or indents
+    _changes = ApiService.changes(
+      tables: ['stock', 'indent_stock', 'job_indents'],
+    ).listen((_) => _scheduleReload());
   }
 
   @override
   void dispose() {
+    _changes?.cancel();
+    _reloadTimer?.cancel();
     _searchController.dispose();
     super.dispose();
   }
 
+  // A bulk save arrives as a burst of events; reload once it settles.
+  void _scheduleReload() {
+    _reloadTimer?.cancel();
+    _reloadTimer = Timer(const Duration(seconds: 1), () async {
+      if (!mounted) return;
+      await _loadStock();
+      await _loadIndentQtys();
+      await _loadSummary();
+    });
+  }
+
   Future<void> _initializeData() async {
     await _loadUser();
     await _loadStock();
     await _loadJobs();
     await _loadIndentQtys();
+    await _loadSummary();
+  }
+
+  // Stock totals from /dashboard/summary, so they are not summed on the
+  // device; the lists are only summed while a search narrows them.
+  Future<void> _loadSummary() async {
+    try {
+      final summary = await ApiService.getDashboardSummary();
+      if (mounted) setState(() => _summary = summary);
+    } catch (e) {
+      if (mounted) setState(() => _summary = null);
+    }
   }
 
   Future<void> _loadUser() async {
@@ -53,12 +87,18 @@ class _StockViewScreenState extends State<StockViewScreen> {
 
   Future<void> _loadStock() async {
     setState(() => _isLoading = true);
-    final general = await ApiService.getStock(false);
-    final job = await ApiService.getStock(true);
+    final responses = await ApiService.batch([
+      {'path': '/stock', 'params': {'isJobSpecific': 'false'}},
+      {'path': '/stock', 'params': {'isJobSpecific': 'true'}},
+    ]);
 
     setState(() {
-      _generalStock = List<Map<String, dynamic>>.from(general);
-      _jobStock = List<Map<String, dynamic>>.from(job);
+      _generalStock = List<Map<String, dynamic>>.from(
+        ApiService.batchBody(responses[0]),
+      );
+      _jobStock = List<Map<String, dynamic>>.from(
+        ApiService.batchBody(responses[1]),
+      );
     });
   }
 
@@ -68,9 +108,16 @@ class _StockViewScreenState extends State<StockViewScreen> {
         .map<String>((job) => job['serialNo'].toString())
         .toList();
     setState(() => _jobNumbers = nonFinalizedJobs);
-    for (var jobNo in nonFinalizedJobs) {
-      final indents = await ApiService.getIndentsForJob(jobNo);
-      _allIndentStocks[jobNo] = List<Map<String, dynamic>>.from(indents);
+    for (var i = 0; i < nonFinalizedJobs.length; i += ApiService.batchLimit) {
+      final chunk = nonFinalizedJobs.skip(i).take(ApiService.batchLimit).toList();
+      final responses = await ApiService.batch(
+        chunk.map((jobNo) => '/job_indents/${Uri.encodeComponent(jobNo)}').toList(),
+      );
+      for (var j = 0; j < chunk.length; j++) {
+        _allIndentStocks[chunk[j]] = List<Map<String, dynamic>>.from(
+          ApiService.batchBody(responses[j]),
+        );
+      }
     }
   }
 
@@ -251,6 +298,7 @@ class _StockViewScreenState extends State<StockViewScreen> {
       await _loadStock();
       await _loadJobs();
       await _loadIndentQtys();
+      await _loadSummary();
     }
   }
 
@@ -260,11 +308,8 @@ class _StockViewScreenState extends State<StockViewScreen> {
     required bool isJobStock,
     required Map<String, bool> expandedKeys,
     required void Function(String) onToggleExpand,
+    required double total,
   }) {
-    double total = grouped.values.fold<double>(
-      0.0,
-      (a, b) => a + (b['finalValue'] as double),
-    );
 
     return ExpansionTile(
       title: Text(
@@ -592,14 +637,20 @@ class _StockViewScreenState extends State<StockViewScreen> {
     final groupedGeneral = _filterGrouped(_groupGeneralStock());
     final groupedJob = _filterGrouped(_groupJobStock());
     final indentTotal = _calculateTotalIndentAllJobs();
-    final generalTotal = groupedGeneral.values.fold<double>(
-      0.0,
-      (a, b) => a + (b['finalValue'] as double),
-    );
-    final jobTotal = groupedJob.values.fold<double>(
-      0.0,
-      (a, b) => a + (b['finalValue'] as double),
-    );
+    final stockSummary = _searchQuery.isEmpty ? _summary?['stock'] : null;
+    final double generalTotal = stockSummary != null
+        ? (stockSummary['value'] as num).toDouble() -
+              (stockSummary['job_specific_value'] as num).toDouble()
+        : groupedGeneral.values.fold<double>(
+            0.0,
+            (a, b) => a + (b['finalValue'] as double),
+          );
+    final double jobTotal = stockSummary != null
+        ? (stockSummary['job_specific_value'] as num).toDouble()
+        : groupedJob.values.fold<double>(
+            0.0,
+            (a, b) => a + (b['finalValue'] as double),
+          );
     final grandTotal = generalTotal + jobTotal + indentTotal;
 
     return Scaffold(
@@ -610,6 +661,7 @@ class _StockViewScreenState extends State<StockViewScreen> {
               onRefresh: () async {
                 await _loadStock();
                 await _loadIndentQtys();
+                await _loadSummary();
               },
               child: ListView(
                 padding: const EdgeInsets.all(10),
@@ -660,6 +712,7 @@ class _StockViewScreenState extends State<StockViewScreen> {
                     sectionTitle: "General Stock",
                     grouped: groupedGeneral,
                     isJobStock: false,
+                    total: generalTotal,
                     expandedKeys: _expandedGeneralKeys,
                     onToggleExpand: (key) => setState(() {
                       _expandedGeneralKeys[key] =
@@ -671,6 +724,7 @@ class _StockViewScreenState extends State<StockViewScreen> {
                     sectionTitle: "Job-Specific Stock",
                     grouped: groupedJob,
                     isJobStock: true,
+                    total: jobTotal,
                     expandedKeys: _expandedJobKeys,
                     onToggleExpand: (key) => setState(() {
                       _expandedJobKeys[key] = !(_expandedJobKeys[key] ?? false);
@@ -5,6 +5,7 @@ import 'dart:convert';
 import 'package:http/http.dart' as http;
 import 'package:uuid/uuid.dart';
 import 'package:package_info_plus/package_info_plus.dart';
+import 'package:shared_preferences/shared_preferences.dart';
 
 class ApiService {
   //static const String lanUrl = 'http://192.168.2.205:5000';
@@ -23,6 +24,37 @@ class ApiService {
     return await _send(method, uri, body);
   }
 
+  // Last 200 response per GET URL, replayed when the server answers 304.
+  // Least recently used first (map insertion order), capped because every
+  // search query and page cursor is a URL of its own.
+  static const int _etagCacheMax = 64;
+  static final Map<Uri, http.Response> _etagCache = {};
+
+  static Future<http.Response> _get(Uri uri) async {
+    final cached = _etagCache[uri];
+    final etag = cached?.headers['etag'];
+    final res = await http.get(
+      uri,
+      headers: etag != null ? {'If-None-Match': etag} : null,
+    );
+    if (res.statusCode == 304 && cached != null) {
+      _remember(uri, cached);
+      return cached;
+    }
+    if (res.statusCode == 200 && res.headers['etag'] != null) {
+      _remember(uri, res);
+    }
+    return res;
+  }
+
+  static void _remember(Uri uri, http.Response res) {
+    _etagCache.remove(uri);
+    _etagCache[uri] = res;
+    while (_etagCache.length > _etagCacheMax) {
+      _etagCache.remove(_etagCache.keys.first);
+    }
+  }
+
   static Future<http.Response> _send(
     String method,
     Uri uri,
@@ -30,7 +62,7 @@ class ApiService {
   ) async {
     switch (method) {
       case 'GET':
-        return await http.get(uri);
+        return await _get(uri);
       case 'POST':
         return await http.post(
           uri,
@@ -48,6 +80,11 @@ class ApiService {
 
   static Map<String, String> _headers() => {'Content-Type': 'application/json'};
 
+  // Signed session token from the last login, used by resumeSession().
+  // Kept in SharedPreferences next to username/role so it survives restarts.
+  static const String _sessionTokenKey = 'sessionToken';
+  static String? sessionToken;
+
   static Future<Map<String, dynamic>?> login(
     String username,
     String password,
@@ -57,7 +94,63 @@ class ApiService {
       '/users/login',
       body: {'username': username, 'password': password},
     );
-    return res.statusCode == 200 ? jsonDecode(res.body) : null;
+    if (res.statusCode != 200) return null;
+    final user = jsonDecode(res.body);
+    await _saveSessionToken(user['token']);
+    return user;
+  }
+
+  /// Re-authenticate on startup or app resume without the password. Returns
+  /// the user, or null. A rejected token (401) is cleared, so afterwards
+  /// [sessionToken] is null; other failures (offline, 503) keep it to retry.
+  static Future<Map<String, dynamic>?> resumeSession() async {
+    if (sessionToken == null) {
+      final prefs = await SharedPreferences.getInstance();
+      sessionToken = prefs.getString(_sessionTokenKey);
+    }
+    if (sessionToken == null) return null;
+    final http.Response res;
+    try {
+      res = await _sendRequest(
+        'POST',
+        '/users/session',
+        body: {'token': sessionToken},
+      );
+    } catch (_) {
+      return null;
+    }
+    if (res.statusCode == 401) {
+      await clearSession();
+      return null;
+    }
+    if (res.statusCode != 200) return null;
+    final user = jsonDecode(res.body);
+    await _saveSessionToken(user['token']);
+    return user;
+  }
+
+  /// Whether a session token is saved (servers without SECRET_KEY issue none).
+  static Future<bool> hasSessionToken() async {
+    if (sessionToken != null) return true;
+    final prefs = await SharedPreferences.getInstance();
+    return prefs.getString(_sessionTokenKey) != null;
+  }
+
+  /// Forget the session token; called on logout.
+  static Future<void> clearSession() async {
+    sessionToken = null;
+    final prefs = await SharedPreferences.getInstance();
+    await prefs.remove(_sessionTokenKey);
+  }
+
+  static Future<void> _saveSessionToken(String? token) async {
+    sessionToken = token;
+    final prefs = await SharedPreferences.getInstance();
+    if (token == null) {
+      await prefs.remove(_sessionTokenKey);
+    } else {
+      await prefs.setString(_sessionTokenKey, token);
+    }
   }
 
   static Future<Map<String, dynamic>?> fetchVersionInfo() async {
@@ -115,11 +208,21 @@ class ApiService {
     return res.statusCode == 200;
   }
 
+  // Report metadata only (id, serialNo, savedBy, remark, timestamp, size);
+  // fetch the full report with getReport() when it is opened.
   static Future<List<dynamic>> getReports() async {
     final res = await _sendRequest('GET', '/reports');
     return jsonDecode(res.body);
   }
 
+  static Future<Map<String, dynamic>> getReport(int id) async {
+    final res = await _sendRequest('GET', '/reports/$id');
+    if (res.statusCode != 200) {
+      throw Exception('Failed to load report: ${_extractError(res)}');
+    }
+    return Map<String, dynamic>.from(jsonDecode(res.body));
+  }
+
   static Future<void> saveJob(Map<String, dynamic> job) async {
     await _sendRequest('POST', '/jobs', body: job);
   }
@@ -127,8 +230,129 @@ class ApiService {
   static Future<void> updateJob(Map<String, dynamic> job) async =>
       await saveJob(job);
 
-  static Future<List<Map<String, dynamic>>> getJobs() async {
-    final res = await _sendRequest('GET', '/jobs');
+  // Jobs come from a local copy kept current through /sync, so repeat
+  // calls only download the jobs changed since the last one.
+  static Future<List<Map<String, dynamic>>> getJobs() async =>
+      await _syncedRows('jobs');
+
+  // Row changes ({'event': 'change', 'table', 'op', 'key', 'serial_no'})
+  // from the server's /changes stream. Reconnects whenever the stream
+  // drops, backing off while the server keeps failing; {'event': 'resync'}
+  // means changes may have been missed and follows each reconnect.
+  static Stream<Map<String, dynamic>> changes({List<String>? tables}) async* {
+    final uri = Uri.parse('$lanUrl/changes').replace(
+      queryParameters: tables == null ? null : {'tables': tables.join(',')},
+    );
+    const minDelay = Duration(seconds: 5);
+    const maxDelay = Duration(minutes: 2);
+    var delay = minDelay;
+    var missed = false;
+    while (true) {
+      final client = http.Client();
+      var connected = false;
+      try {
+        final res = await client.send(
+          http.Request('GET', uri)..headers['Accept'] = 'text/event-stream',
+        );
+        final contentType = res.headers['content-type'] ?? '';
+        // A 503 (subscriber cap) or a proxy's error page is not a stream
+        if (res.statusCode == 200 &&
+            contentType.startsWith('text/event-stream')) {
+          connected = true;
+          delay = minDelay;
+          if (missed) {
+            yield {'event': 'resync'};
+          }
+          var event = 'message';
+          await for (final line
+              in res.stream.transform(utf8.decoder).transform(const LineSplitter())) {
+            if (line.startsWith('event:')) {
+              event = line.substring(6).trim();
+            } else if (line.startsWith('data:')) {
+              yield {...jsonDecode(line.substring(5)), 'event': event};
+              event = 'message';
+            }
+          }
+        }
+      } catch (_) {
+        // Server restart or network drop: retry below
+      } finally {
+        client.close();
+      }
+      if (!connected) {
+        delay = delay * 2 > maxDelay ? maxDelay : delay * 2;
+      }
+      missed = true;
+      await Future.delayed(delay);
+    }
+  }
+
+  // Local copies of synced tables (key -> row data) and their sync tokens.
+  static final Map<String, Map<String, Map<String, dynamic>>> _replicas = {};
+  static final Map<String, String> _syncTokens = {};
+
+  static Future<List<Map<String, dynamic>>> _syncedRows(String table) async {
+    final token = _syncTokens[table];
+    final res = await _sendRequest(
+      'GET',
+      '/sync',
+      queryParams: {'tables': table, if (token != null) 'since': token},
+    );
+    if (res.statusCode != 200) {
+      throw Exception('Failed to sync $table: ${_extractError(res)}');
+    }
+    final body = jsonDecode(res.body);
+    final changes = body['tables'][table];
+    final rows = body['full'] == true
+        ? <String, Map<String, dynamic>>{}
+        : (_replicas[table] ?? <String, Map<String, dynamic>>{});
+    for (final key in changes['deleted']) {
+      rows.remove(key);
+    }
+    for (final row in changes['changed']) {
+      rows[row['key']] = Map<String, dynamic>.from(row['data']);
+    }
+    _replicas[table] = rows;
+    _syncTokens[table] = body['token'];
+
+    final keys = rows.keys.toList()..sort();
+    return [for (final key in keys) Map<String, dynamic>.from(rows[key]!)];
+  }
+
+  // Server-side type-ahead: best matches for [query] (serial no, purchaser,
+  // reference, type, kVA), at most [limit]. An empty query lists the first jobs.
+  static Future<List<Map<String, dynamic>>> searchJobs(
+    String query, {
+    bool openOnly = false,
+    int limit = 20,
+  }) async {
+    final res = await _sendRequest(
+      'GET',
+      '/search/jobs',
+      queryParams: {
+        'q': query,
+        'limit': '$limit',
+        if (openOnly) 'open': 'true',
+      },
+    );
+    if (res.statusCode != 200) {
+      throw Exception('Failed to search jobs: ${_extractError(res)}');
+    }
+    return List<Map<String, dynamic>>.from(jsonDecode(res.body));
+  }
+
+  static Future<List<Map<String, dynamic>>> searchMaterials(
+    String query, {
+    int limit = 20,
+  }) async {
+    final res = await _sendRequest(
+      'GET',
+      '/search/materials',
+      queryParams: {'q': query, 'limit': '$limit'},
+    );
+    if (res.statusCode != 200) {
+      throw Exception('Failed to search materials: ${_extractError(res)}');
+    }
     return List<Map<String, dynamic>>.from(jsonDecode(res.body));
   }
 
@@ -137,6 +361,44 @@ class ApiService {
     return List<Map<String, dynamic>>.from(jsonDecode(res.body));
   }
 
+  // Job counts, stock value by type, pending indents and recent movements,
+  // aggregated on the server.
+  static Future<Map<String, dynamic>> getDashboardSummary() async {
+    final res = await _sendRequest('GET', '/dashboard/summary');
+    if (res.statusCode != 200) {
+      throw Exception('Failed to load dashboard summary: ${_extractError(res)}');
+    }
+    return Map<String, dynamic>.from(jsonDecode(res.body));
+  }
+
+  // Several GETs in one round trip, read from one consistent snapshot.
+  // Each request is a path or {'path': ..., 'params': {...}}; results come
+  // back in order as {'path', 'status', 'etag', 'body'}.
+  static const int batchLimit = 50; // BATCH_MAX_REQUESTS on the server
+
+  static Future<List<Map<String, dynamic>>> batch(List<dynamic> requests) async {
+    final res = await _sendRequest(
+      'POST',
+      '/batch',
+      body: {'requests': requests},
+    );
+    if (res.statusCode != 200) {
+      throw Exception('Batch request failed: ${_extractError(res)}');
+    }
+    final responses = jsonDecode(res.body)['responses'] as List;
+    return responses.map((r) => Map<String, dynamic>.from(r)).toList();
+  }
+
+  // Body of one batch result, or an exception carrying its error.
+  static dynamic batchBody(Map<String, dynamic> response) {
+    if (response['status'] != 200) {
+      final body = response['body'];
+      final error = body is Map ? body['error'] : body;
+      throw Exception('${response['path']} failed: $error');
+    }
+    return response['body'];
+  }
+
   static Future<void> addMaterial(Map<String, dynamic> data) async {
     data['id'] ??= const Uuid().v4();
     await _sendRequest('POST', '/materials', body: data);